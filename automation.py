@@ -3,22 +3,65 @@ BPJS AUTOMATION - REAL AUTOMATION ENGINE
 Untuk automate browser setelah login manual ke BPJS
 """
 
+import re
 import time
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from config import (
     SIPP_URL, DPT_URL, LAPAK_URL,
-    MAX_RETRIES, RETRY_DELAY
+    MAX_RETRIES, RETRY_DELAY,
+    PIPELINE_PORTALS, PIPELINE_STAGE_RATE, PIPELINE_SEARCH_FIELDS, PARALLEL_MAX_WORKERS,
+    get_all_urls
 )
 from logger import log_info, log_warning, log_error
-from validator import validate_kpj
+from validator import validate_kpj, DataValidator
+from memory_monitor import memory_monitor
+from result_cache import result_cache
+from session_monitor import get_session_monitor, SESSION_EXPIRED_ERROR
+from request_policy import request_policy
+from http_fast_path import http_fast_path
+from pipeline import PipelineStage, PortalPipeline
+from rate_estimator import RateEstimator
 
-try:
-    from web_automator import web_automator
-    HAS_WEB_AUTOMATOR = True
-except ImportError:
-    HAS_WEB_AUTOMATOR = False
-    log_error("❌ web_automator.py tidak ditemukan!")
+# Web automator di-import saat pertama dibutuhkan (bukan saat import modul),
+# karena import jnius/autoclass dan pembuatan WebView memperlambat startup
+web_automator = None
+HAS_WEB_AUTOMATOR = None  # None = belum dicoba
+
+# Fast path tidak menemukan KPJ dan tidak ada WebView untuk fallback:
+# gagal permanen untuk run ini (tidak diulang, tidak di-cache)
+WEBVIEW_UNAVAILABLE = "unavailable"
+
+def _load_web_automator():
+    """Import web_automator sekali saja, Returns: True jika tersedia"""
+    global web_automator, HAS_WEB_AUTOMATOR
+    
+    if HAS_WEB_AUTOMATOR is None:
+        try:
+            from web_automator import web_automator as automator_instance
+            web_automator = automator_instance
+            HAS_WEB_AUTOMATOR = True
+        except ImportError:
+            HAS_WEB_AUTOMATOR = False
+            log_error("❌ web_automator.py tidak ditemukan!")
+    
+    return HAS_WEB_AUTOMATOR
+
+# NIK 16 digit di hasil SIPP (input pencarian DPT)
+NIK_PATTERN = re.compile(r"(?<!\d)\d{16}(?!\d)")
+
+def _find_nik(sipp_result):
+    """NIK valid pertama di data hasil SIPP, None jika tidak ada"""
+    if not sipp_result or sipp_result.get("status") not in ["success", "completed"]:
+        return None
+    
+    text = json.dumps(sipp_result.get("data"), ensure_ascii=False)
+    for nik in NIK_PATTERN.findall(text):
+        if DataValidator.validate_nik(nik)[0]:
+            return nik
+    return None
 
 class RealAutomationEngine:
     """Engine untuk REAL automation setelah login manual"""
@@ -31,17 +74,36 @@ class RealAutomationEngine:
             "skipped": 0,
             "failed": 0,
             "start_time": None,
-            "end_time": None
+            "end_time": None,
+            "cache_hits": 0
         }
         self.current_kpj = None
+        self.last_batch_summary = None
+        self._progress_callback = None
+        self.pipeline = None
+        self.estimator = RateEstimator()
+        self._batch_started = None  # time.monotonic() saat batch dimulai
+        self._stats_lock = threading.Lock()  # process_parallel: banyak thread KPJ
+    
+    def ensure_web_automator(self):
+        """Siapkan WebView saat batch benar-benar dimulai"""
+        if not _load_web_automator():
+            return False
         
-        # Initialize web automator
-        if HAS_WEB_AUTOMATOR:
-            try:
-                web_automator.init_webview()
-                log_info("✅ Web automator siap untuk REAL automation")
-            except Exception as e:
-                log_error(f"❌ Gagal init web automator: {str(e)}")
+        try:
+            web_automator.ensure_webview()
+            
+            # Fast path HTTP memakai cookie login dari WebView
+            http_fast_path.cookie_provider = web_automator.get_cookies
+            http_fast_path.user_agent = web_automator.user_agent
+            return True
+        except Exception as e:
+            log_error(f"❌ Gagal init web automator: {str(e)}")
+            return False
+    
+    def _count(self, field):
+        with self._stats_lock:
+            self.stats[field] += 1
     
     def _change_state(self, new_state):
         """Update state mesin"""
@@ -54,29 +116,53 @@ class RealAutomationEngine:
         if not is_valid:
             return False, message
         
-        if not HAS_WEB_AUTOMATOR:
-            return False, "Web automator tidak tersedia"
+        # Tanpa WebView (mis. server headless) hanya fast path HTTP yang bisa dipakai;
+        # KPJ yang lolos dari fast path (redirect login, parse gagal) tidak punya fallback
+        if not self.ensure_web_automator():
+            if not http_fast_path.supports("sipp"):
+                return False, "Web automator tidak tersedia"
+            return True, "KPJ valid (fast path HTTP saja, WebView tidak tersedia)"
         
         return True, "KPJ valid"
     
     def process_sipp_real(self, kpj):
         """Proses REAL automation untuk SIPP"""
-        log_info(f"🔧 Memulai REAL automation untuk KPJ: {kpj}")
+        return self.process_portal_real(kpj, "sipp")
+    
+    def process_portal_real(self, kpj, portal, query=None, automator=None):
+        """
+        Proses REAL automation untuk satu portal
+        query: nilai yang dicari (default KPJ, mis. NIK untuk DPT)
+        automator: WebAutomator portal (default web_automator global untuk SIPP;
+        None untuk portal lain = hanya fast path HTTP)
+        """
+        query = kpj if query is None else query
+        if automator is None and portal == "sipp":
+            automator = web_automator
+        session = get_session_monitor(portal)
+        tab = portal.upper()
+        log_info(f"🔧 Memulai REAL automation {tab} untuk KPJ: {kpj}")
         
         result = {
             "kpj": kpj,
             "status": "processing",
-            "tab": "SIPP",
+            "tab": tab,
             "start_time": datetime.now().strftime('%H:%M:%S')
         }
         
         def automation_callback(success, data):
-            if success:
+            if not success and data == SESSION_EXPIRED_ERROR:
+                result.update({
+                    "status": "session_expired",
+                    "error": "Sesi login berakhir",
+                    "end_time": datetime.now().strftime('%H:%M:%S')
+                })
+            elif success:
                 result.update({
                     "status": "success",
                     "data": data,
                     "end_time": datetime.now().strftime('%H:%M:%S'),
-                    "message": "Data berhasil diambil dari SIPP"
+                    "message": f"Data berhasil diambil dari {tab}"
                 })
                 log_info(f"✅ Berhasil ambil data untuk KPJ: {kpj}")
             else:
@@ -88,15 +174,40 @@ class RealAutomationEngine:
                 })
                 log_error(f"❌ Gagal untuk KPJ {kpj}: {data}")
         
+        # Fast path HTTP (tanpa render WebView), None = lanjut alur WebView
+        fast_data = http_fast_path.search(portal, query)
+        if fast_data is not None:
+            automation_callback(True, fast_data)
+            return result
+        
+        if automator is None:
+            result.update({
+                "status": WEBVIEW_UNAVAILABLE,
+                "error": "Fast path miss, WebView tidak tersedia",
+                "end_time": datetime.now().strftime('%H:%M:%S')
+            })
+            log_warning(f"⚠️ KPJ {kpj} ({tab}): fast path gagal dan WebView tidak tersedia")
+            return result
+        
         # Jalankan REAL automation
         try:
-            web_automator.simulate_sipp_automation(kpj, automation_callback)
+            automator.simulate_sipp_automation(
+                query, automation_callback, PIPELINE_SEARCH_FIELDS.get(portal, "kpj")
+            )
             
             # Tunggu hasil maksimal 45 detik
             timeout = 45
             start_wait = time.time()
             
             while result["status"] == "processing" and (time.time() - start_wait) < timeout:
+                # Sesi habis terdeteksi (redirect login): jangan tunggu sampai timeout
+                if session.is_expired():
+                    result.update({
+                        "status": "session_expired",
+                        "error": "Sesi login berakhir",
+                        "end_time": datetime.now().strftime('%H:%M:%S')
+                    })
+                    break
                 time.sleep(0.5)
             
             if result["status"] == "processing":
@@ -123,7 +234,12 @@ class RealAutomationEngine:
         self._change_state(f"PROCESSING_{kpj}")
         
         start_time = datetime.now()
-        self.stats["start_time"] = start_time.strftime('%Y-%m-%d %H:%M:%S')
+        started = time.monotonic()
+        
+        # Cek cache hasil sebelum membuka portal
+        cached_result = result_cache.get(kpj, "sipp")
+        if cached_result is not None:
+            return self._use_cached_result(kpj, cached_result)
         
         # Validasi KPJ
         is_valid, message = self.validate_and_prepare(kpj)
@@ -135,7 +251,7 @@ class RealAutomationEngine:
                 "processing_time": "0s",
                 "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
-            self.stats["failed"] += 1
+            self._count("failed")
             return error_result
         
         # Proses dengan retry logic
@@ -147,14 +263,21 @@ class RealAutomationEngine:
                 # REAL automation untuk SIPP
                 sipp_result = self.process_sipp_real(kpj)
                 
+                # Sesi habis bukan kegagalan KPJ: jeda, tunggu login ulang, ulangi
+                while sipp_result["status"] == "session_expired":
+                    if not self.wait_for_session(kpj):
+                        break
+                    sipp_result = self.process_sipp_real(kpj)
+                
                 if sipp_result["status"] not in ["success", "completed"]:
-                    if attempt < MAX_RETRIES - 1:
+                    # Tanpa WebView percobaan ulang hasilnya sama: langsung gagal
+                    if attempt < MAX_RETRIES - 1 and sipp_result["status"] != WEBVIEW_UNAVAILABLE:
                         log_info(f"Retry {attempt + 1} dalam {RETRY_DELAY} detik...")
                         time.sleep(RETRY_DELAY)
                         continue
                     else:
                         final_result = sipp_result
-                        self.stats["failed"] += 1
+                        self._count("failed")
                         break
                 
                 # Jika berhasil
@@ -162,7 +285,7 @@ class RealAutomationEngine:
                 final_result["overall_status"] = "completed"
                 final_result["process_attempt"] = attempt + 1
                 
-                self.stats["successful"] += 1
+                self._count("successful")
                 break
                 
             except Exception as e:
@@ -176,11 +299,11 @@ class RealAutomationEngine:
                         "status": "failed",
                         "retry_attempts": attempt + 1
                     }
-                    self.stats["failed"] += 1
+                    self._count("failed")
         
         # Hitung waktu proses
         end_time = datetime.now()
-        processing_duration = (end_time - start_time).total_seconds()
+        processing_duration = time.monotonic() - started
         
         if final_result:
             final_result.update({
@@ -190,8 +313,12 @@ class RealAutomationEngine:
                 "batch_timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             })
         
-        self.stats["total_processed"] += 1
-        self.stats["end_time"] = end_time.strftime('%Y-%m-%d %H:%M:%S')
+            # Simpan ke cache (TTL negatif lebih pendek untuk hasil gagal)
+            is_success = final_result.get("status") in ["success", "completed"]
+            if final_result.get("status") not in ["session_expired", WEBVIEW_UNAVAILABLE]:
+                result_cache.put(kpj, "sipp", final_result, positive=is_success)
+        
+        self._count("total_processed")
         
         log_info(f"✅ Selesai KPJ {kpj} dalam {processing_duration:.1f} detik")
         self._change_state("IDLE")
@@ -202,13 +329,217 @@ class RealAutomationEngine:
             "status": "unknown_error"
         }
     
+    def wait_for_session(self, kpj=None, portal="sipp"):
+        """
+        Jeda selama sesi login portal habis (portal lain tetap jalan)
+        Returns: True jika sesi aktif kembali, False jika timeout
+        """
+        session = get_session_monitor(portal)
+        if not session.is_expired():
+            return True
+        
+        previous_state = self.current_state
+        self._change_state("WAITING_RELOGIN")
+        
+        if self._progress_callback:
+            self._progress_callback({
+                "kpj": kpj,
+                "status": "login_required",
+                "portal": portal,
+                "reason": session.reason
+            })
+        
+        restored = session.wait_until_active()
+        
+        if self._progress_callback:
+            self._progress_callback({
+                "kpj": kpj,
+                "status": "session_restored" if restored else "relogin_timeout",
+                "portal": portal
+            })
+        
+        if not restored:
+            log_error("❌ Login ulang tidak dilakukan dalam batas waktu")
+        
+        self._change_state(previous_state)
+        return restored
+    
+    def _use_cached_result(self, kpj, cached_result):
+        """Pakai hasil dari cache tanpa dispatch ke WebView"""
+        result = dict(cached_result)
+        result.update({
+            "cache_hit": True,
+            "cached_batch_timestamp": cached_result.get("batch_timestamp"),
+            "batch_timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+        
+        if result.get("status") in ["success", "completed"]:
+            self._count("successful")
+        else:
+            self._count("failed")
+        self._count("total_processed")
+        self._count("cache_hits")
+        
+        log_info(f"💾 KPJ {kpj} diambil dari cache")
+        self._change_state("IDLE")
+        return result
+    
     def process_batch(self, kpj_list, progress_callback=None):
         """Process batch KPJ"""
         total = len(kpj_list)
-        results = []
+        results = list(self.process_stream(kpj_list, total, progress_callback))
         
-        log_info(f"🚀 Memulai REAL batch processing: {total} KPJ")
+        # Tambah summary ke setiap result
+        for result in results:
+            result["batch_summary"] = self.last_batch_summary
+        
+        return results
+    
+    def process_stream(self, kpj_iterable, size_hint=None, progress_callback=None):
+        """
+        Process KPJ dari iterator apa pun (generator file, list, dll)
+        size_hint: perkiraan jumlah KPJ untuk progress (boleh None)
+        Yields: result per KPJ (tidak disimpan di memori engine)
+        """
+        total = size_hint
+        success_count = 0
+        processed = 0
+        
+        self._begin_batch(total, progress_callback)
+        previous_from_cache = True
+        
+        # Summary dan stop diagnostik tetap jalan walau stream ditutup lebih awal
+        # (cancel worker, Ctrl+C) atau error
+        try:
+            for index, kpj in enumerate(kpj_iterable, 1):
+                # Delay antar KPJ (tidak perlu setelah hasil dari cache)
+                if not previous_from_cache:
+                    time.sleep(1.0)
+                
+                # Jangan dispatch KPJ selama sesi login habis
+                self.wait_for_session(kpj)
+                
+                # Update progress
+                progress = (index / total) * 100 if total else None
+                
+                if progress_callback:
+                    progress_callback({
+                        "current": index,
+                        "total": total,
+                        "percent": progress,
+                        "kpj": kpj,
+                        "status": "processing"
+                    })
+                
+                if progress is not None:
+                    log_info(f"📊 Progress: {index}/{total} ({progress:.1f}%) - KPJ: {kpj}")
+                else:
+                    log_info(f"📊 Progress: {index} - KPJ: {kpj}")
+                
+                # Process KPJ
+                started = time.monotonic()
+                result = self.process_single_kpj(kpj)
+                result["sequence"] = index
+                result["total_in_batch"] = total
+                previous_from_cache = result.get("cache_hit", False)
+                
+                processed = index
+                is_success = result.get("status") in ["success", "completed"]
+                if is_success:
+                    success_count += 1
+                self.estimator.record(time.monotonic() - started, is_success)
+                memory_monitor.on_kpj_processed()
+                
+                if progress_callback:
+                    progress_callback({
+                        "current": index,
+                        "total": total,
+                        "percent": progress,
+                        "kpj": kpj,
+                        "status": "completed",
+                        "result": result
+                    })
+                
+                yield result
+        finally:
+            self._finish_batch(processed, success_count)
+    
+    def process_parallel(self, kpj_iterable, size_hint=None, progress_callback=None,
+                         concurrency=PARALLEL_MAX_WORKERS):
+        """
+        Proses beberapa KPJ sekaligus lewat fast path HTTP (tanpa WebView)
+        WebView hanya satu halaman, jadi jika tersedia diproses berurutan (process_stream)
+        Yields: result per KPJ (urutan selesai)
+        """
+        if concurrency <= 1 or _load_web_automator():
+            if concurrency > 1:
+                log_warning("WebView aktif: KPJ diproses berurutan")
+            yield from self.process_stream(kpj_iterable, size_hint, progress_callback)
+            return
+        
+        total = size_hint
+        success_count = 0
+        processed = 0
+        self._begin_batch(total, progress_callback)
+        
+        def run(sequence, kpj):
+            self.wait_for_session(kpj)
+            started = time.monotonic()
+            result = self.process_single_kpj(kpj)
+            result["sequence"] = sequence
+            result["total_in_batch"] = total
+            return result, time.monotonic() - started
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="kpj")
+        try:
+            pending = set()
+            kpj_iterator = enumerate(kpj_iterable, 1)
+            exhausted = False
+            
+            while pending or not exhausted:
+                # Isi sampai 2x concurrency KPJ dalam proses (input tidak dibaca semua)
+                while not exhausted and len(pending) < concurrency * 2:
+                    try:
+                        sequence, kpj = next(kpj_iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(executor.submit(run, sequence, kpj))
+                
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    result, latency = future.result()
+                    processed += 1
+                    is_success = result.get("status") in ["success", "completed"]
+                    if is_success:
+                        success_count += 1
+                    self.estimator.record(latency, is_success)
+                    memory_monitor.on_kpj_processed()
+                    
+                    if progress_callback:
+                        progress_callback({
+                            "current": processed,
+                            "total": total,
+                            "percent": (processed / total) * 100 if total else None,
+                            "kpj": result.get("kpj"),
+                            "status": "completed",
+                            "result": result
+                        })
+                    
+                    yield result
+        finally:
+            # Stream ditutup/error: KPJ yang belum mulai dibatalkan, yang sedang jalan ditunggu
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._finish_batch(processed, success_count)
+    
+    def _begin_batch(self, total, progress_callback):
+        """Reset stats dan siapkan WebView untuk batch baru"""
+        log_info(f"🚀 Memulai REAL batch processing: {total if total is not None else '?'} KPJ")
         self._change_state("BATCH_PROCESSING")
+        self.ensure_web_automator()
         
         # Reset stats untuk batch baru
         self.stats = {
@@ -218,88 +549,230 @@ class RealAutomationEngine:
             "failed": 0,
             "start_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             "end_time": None,
-            "total_kpj": total
+            "total_kpj": total,
+            "cache_hits": 0
         }
+        self.last_batch_summary = None
+        self._progress_callback = progress_callback
+        self._batch_started = time.monotonic()
+        self.estimator.start(total)
         
-        for index, kpj in enumerate(kpj_list, 1):
-            # Update progress
-            progress = (index / total) * 100
-            
-            if progress_callback:
-                progress_callback({
-                    "current": index,
-                    "total": total,
-                    "percent": progress,
-                    "kpj": kpj,
-                    "status": "processing"
-                })
-            
-            log_info(f"📊 Progress: {index}/{total} ({progress:.1f}%) - KPJ: {kpj}")
-            
-            # Process KPJ
-            result = self.process_single_kpj(kpj)
-            result["sequence"] = index
-            result["total_in_batch"] = total
-            
-            results.append(result)
-            
-            if progress_callback:
-                progress_callback({
-                    "current": index,
-                    "total": total,
-                    "percent": progress,
-                    "kpj": kpj,
-                    "status": "completed",
-                    "result": result
-                })
-            
-            # Delay antar KPJ
-            if index < total:
-                time.sleep(1.0)
-        
-        # Batch selesai
+        # Diagnostik memori (opsional)
+        memory_monitor.start()
+    
+    def _finish_batch(self, processed, success_count):
+        """Tutup batch dan buat summary"""
+        self._progress_callback = None
+        try:
+            memory_monitor.stop()
+        except Exception as e:
+            log_warning(f"Laporan memori akhir gagal: {str(e)}")
         self._change_state("BATCH_COMPLETED")
         self.stats["end_time"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        success_count = len([r for r in results if r.get("status") in ["success", "completed"]])
-        success_rate = (success_count / total * 100) if total > 0 else 0
+        success_rate = (success_count / processed * 100) if processed > 0 else 0
+        duration = time.monotonic() - self._batch_started
+        live = self.estimator.snapshot()
         
-        batch_summary = {
-            "total_kpj": total,
+        self.last_batch_summary = {
+            "total_kpj": processed,
             "successful": success_count,
-            "failed": total - success_count,
+            "failed": processed - success_count,
             "success_rate": f"{success_rate:.1f}%",
             "start_time": self.stats["start_time"],
             "end_time": self.stats["end_time"],
-            "duration": f"{(datetime.strptime(self.stats['end_time'], '%Y-%m-%d %H:%M:%S') - datetime.strptime(self.stats['start_time'], '%Y-%m-%d %H:%M:%S')).total_seconds():.1f}s"
+            "duration": f"{duration:.1f}s",
+            "per_minute": live["per_minute"],
+            "p50_latency": live["p50_latency"]
         }
         
-        log_info(f"🎉 Batch selesai! Summary: {batch_summary}")
+        log_info(f"🎉 Batch selesai! Summary: {self.last_batch_summary}")
+        request_policy.log_summary()
         
-        # Tambah summary ke setiap result
-        for result in results:
-            result["batch_summary"] = batch_summary
+        for portal, load_stats in self.get_load_stats().items():
+            for url, stats in load_stats.items():
+                log_info(f"⏱️ Muat halaman {portal.upper()} {url}: {stats['count']}x, "
+                         f"p50 {stats['p50']} detik, maks {stats['max']} detik")
+    
+    def process_pipeline(self, kpj_iterable, size_hint=None, progress_callback=None,
+                         portals=PIPELINE_PORTALS):
+        """
+        Proses KPJ lewat beberapa portal sekaligus (pipeline per portal)
+        Saat ini hanya dipakai batch_cli (--engine pipeline); app memakai process_stream
+        Yields: result portal pertama + result["portals"] untuk portal lainnya
+        """
+        total = size_hint
+        success_count = 0
+        processed = 0
         
-        return results
+        self._begin_batch(total, progress_callback)
+        self.pipeline = PortalPipeline([
+            PipelineStage(portal, self._make_stage_handler(portal), PIPELINE_STAGE_RATE.get(portal, 1.0))
+            for portal in portals
+        ])
+        
+        try:
+            for item in self.pipeline.run(kpj_iterable):
+                result = dict(item["stages"][portals[0]])
+                result["portals"] = {portal: item["stages"].get(portal) for portal in portals[1:]}
+                result["sequence"] = item["sequence"]
+                result["total_in_batch"] = total
+                
+                processed += 1
+                is_success = result.get("status") in ["success", "completed"]
+                if is_success:
+                    success_count += 1
+                self.estimator.record(time.monotonic() - item["queued_at"], is_success)
+                memory_monitor.on_kpj_processed()
+                
+                if progress_callback:
+                    progress_callback({
+                        "current": processed,
+                        "total": total,
+                        "percent": (processed / total) * 100 if total else None,
+                        "kpj": item["kpj"],
+                        "status": "completed",
+                        "result": result,
+                        "pipeline": self.pipeline.get_stats()
+                    })
+                
+                yield result
+        finally:
+            self.pipeline.cancel()  # no-op jika pipeline sudah selesai
+            self._finish_batch(processed, success_count)
+    
+    def _make_stage_handler(self, portal):
+        """Handler stage pipeline untuk satu portal"""
+        if portal == "sipp":
+            def sipp_handler(item):
+                self.wait_for_session(item["kpj"])
+                return self.process_single_kpj(item["kpj"])
+            return sipp_handler
+        
+        automators = {}
+        
+        def portal_handler(item):
+            kpj = item["kpj"]
+            query = kpj
+            if PIPELINE_SEARCH_FIELDS.get(portal) == "nik":
+                query = _find_nik(item["stages"].get("sipp"))
+                if not query:
+                    return {
+                        "kpj": kpj,
+                        "tab": portal.upper(),
+                        "status": "skipped",
+                        "error": "NIK tidak ditemukan di hasil SIPP"
+                    }
+            
+            cached_result = result_cache.get(query, portal)
+            if cached_result is not None:
+                return dict(cached_result, cache_hit=True)
+            
+            if portal not in automators:
+                automators[portal] = self._prepare_portal(portal)
+            if automators[portal] is None and not http_fast_path.supports(portal):
+                # Tidak ada driver sama sekali: gagal jelas tanpa mencoba (sudah dilog sekali)
+                return {
+                    "kpj": kpj,
+                    "tab": portal.upper(),
+                    "status": WEBVIEW_UNAVAILABLE,
+                    "error": f"Portal {portal.upper()}: WebView tidak tersedia dan fast path belum dipetakan"
+                }
+            
+            self.wait_for_session(kpj, portal)
+            result = self.process_portal_real(kpj, portal, query, automators[portal])
+            while result["status"] == "session_expired" and self.wait_for_session(kpj, portal):
+                result = self.process_portal_real(kpj, portal, query, automators[portal])
+            
+            if result["status"] not in ["session_expired", WEBVIEW_UNAVAILABLE]:
+                result_cache.put(query, portal, result, positive=result["status"] == "success")
+            return result
+        
+        return portal_handler
+    
+    def _prepare_portal(self, portal):
+        """
+        Buat WebView sendiri untuk portal dan buka halamannya
+        Returns: WebAutomator, None jika WebView tidak tersedia (mis. batch_cli)
+        """
+        if not _load_web_automator():
+            if http_fast_path.supports(portal):
+                log_info(f"⚡ Portal {portal.upper()}: tanpa WebView, hanya fast path HTTP")
+            else:
+                log_warning(f"⚠️ Portal {portal.upper()} dilewati: WebView tidak tersedia dan "
+                            f"HTTP_FAST_PATH_FORMS['{portal}'] belum punya search_url")
+            return None
+        
+        from web_automator import get_portal_automator
+        
+        automator = get_portal_automator(portal)
+        try:
+            automator.ensure_webview()
+        except Exception as e:
+            log_warning(f"⚠️ WebView portal {portal.upper()} gagal dibuat: {str(e)}")
+            return None
+        
+        try:
+            load = automator.navigate(get_all_urls()[portal]).result()
+            log_info(f"🌐 Portal {portal.upper()} siap ({load['load_time']} detik)")
+        except Exception as e:
+            log_warning(f"Portal {portal.upper()} belum siap: {str(e)}")
+        return automator
+    
+    def get_load_stats(self):
+        """Waktu muat halaman per portal/URL (kosong jika WebView tidak dipakai)"""
+        if not HAS_WEB_AUTOMATOR:
+            return {}
+        from web_automator import get_all_load_stats
+        return get_all_load_stats()
     
     def get_stats(self):
         """Get statistics"""
-        return self.stats.copy()
+        stats = self.stats.copy()
+        stats["current_kpj"] = self.current_kpj
+        stats["live"] = self.estimator.snapshot()
+        stats["page_loads"] = self.get_load_stats()
+        if self.pipeline is not None:
+            stats["pipeline"] = self.pipeline.get_stats()
+        return stats
+
+# Global instance (dibuat saat pertama dipakai)
+_real_engine = None
 
-# Global instance
-real_engine = RealAutomationEngine()
+def get_engine():
+    """Ambil engine global, buat jika belum ada"""
+    global _real_engine
+    if _real_engine is None:
+        _real_engine = RealAutomationEngine()
+    return _real_engine
+
+def __getattr__(name):
+    # Kompatibilitas untuk `from automation import real_engine`
+    if name == "real_engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Convenience functions
 def process_kpj(kpj):
-    return real_engine.process_single_kpj(kpj)
+    return get_engine().process_single_kpj(kpj)
 
 def process_kpj_list(kpj_list, callback=None):
-    return real_engine.process_batch(kpj_list, callback)
+    return get_engine().process_batch(kpj_list, callback)
+
+def process_kpj_stream(kpj_iterable, size_hint=None, callback=None):
+    return get_engine().process_stream(kpj_iterable, size_hint, callback)
+
+def process_kpj_pipeline(kpj_iterable, size_hint=None, callback=None):
+    return get_engine().process_pipeline(kpj_iterable, size_hint, callback)
+
+def process_kpj_parallel(kpj_iterable, size_hint=None, callback=None, concurrency=PARALLEL_MAX_WORKERS):
+    return get_engine().process_parallel(kpj_iterable, size_hint, callback, concurrency)
 
 def get_engine_stats():
-    return real_engine.get_stats()
+    return get_engine().get_stats()
 
 def reset_engine():
-    global real_engine
-    real_engine = RealAutomationEngine()
+    # Engine baru dibuat lazy saat dipakai lagi; WebView yang ada tetap dipakai ulang
+    global _real_engine
+    _real_engine = None
     return "Engine direset"
\ No newline at end of file
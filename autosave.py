@@ -0,0 +1,142 @@
+"""
+BPJS AUTOMATION - INCREMENTAL AUTOSAVE
+Simpan berkala hanya record baru sejak autosave terakhir (export cursor),
+pindah ke part file baru saat ukuran file mencapai batas
+"""
+
+import csv
+import os
+import threading
+from datetime import datetime
+from config import (
+    CSV_ENCODING, AUTOSAVE_FOLDER, AUTOSAVE_PREFIX, AUTOSAVE_MAX_PART_BYTES
+)
+from logger import log_info, log_error
+from exporter import CSV_DIALECT, cell_value, export_worker
+
+class IncrementalAutosaver:
+    """Append record CSVHandler.data[export_cursor:] ke part file CSV"""
+    
+    def __init__(self, handler, folder=AUTOSAVE_FOLDER, max_part_bytes=AUTOSAVE_MAX_PART_BYTES):
+        self.handler = handler
+        self.folder = folder
+        self.max_part_bytes = max_part_bytes
+        self.session = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.part = 1
+        self.saved_total = 0
+        self._generation = handler.generation
+        self._part_columns = None  # header part file sekarang
+        self.trim_after_save = False  # batch file: record tersimpan dibuang dari memori
+        self.run_paths = []  # part file yang ditulis sejak start_run()
+        self._lock = threading.Lock()  # satu penulisan pada satu waktu
+        self._pending = False
+    
+    def current_path(self):
+        return os.path.join(self.folder, f"{AUTOSAVE_PREFIX}{self.session}_part{self.part:03d}.csv")
+    
+    def _roll(self):
+        """Pindah ke part berikutnya jika part sekarang sudah ada"""
+        if os.path.exists(self.current_path()):
+            self.part += 1
+            log_info(f"📂 Autosave pindah ke part {self.part}")
+    
+    def save_increment(self):
+        """
+        Tulis record baru sejak cursor
+        Returns: (jumlah record yang ditulis, path part file; None jika tidak ada yang ditulis)
+        """
+        with self._lock:
+            handler = self.handler
+            data = handler.data
+            generation = handler.generation
+            start = min(handler.export_cursor, len(data))
+            end = len(data)
+            if start >= end:
+                return 0, None
+            
+            # Data diurutkan ulang/dedupe sejak simpan terakhir: tulis ulang ke part baru
+            if generation != self._generation:
+                self._roll()
+                self._generation = generation
+            
+            # Kolom sama dengan ekspor biasa (rencana kolom atau semua field)
+            export_kwargs = handler._export_kwargs(self.current_path(), "csv")
+            plan = export_kwargs.get("plan")
+            columns = plan.columns if plan is not None else export_kwargs["columns"]
+            if self._part_columns is not None and columns != self._part_columns:
+                self._roll()  # field baru: header part lama tidak cocok lagi
+            
+            records = data[start:end]
+            path = self.current_path()
+            os.makedirs(self.folder, exist_ok=True)
+            new_file = not os.path.exists(path)
+            
+            with open(path, "a", newline="", encoding=CSV_ENCODING) as f:
+                writer = csv.writer(f, **CSV_DIALECT)
+                if new_file:
+                    writer.writerow(columns)
+                if plan is not None:
+                    rows = plan.rows
+                    for record in records:
+                        writer.writerows(rows(record))
+                else:
+                    for record in records:
+                        writer.writerow([cell_value(record.get(column, "")) for column in columns])
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            self._part_columns = columns
+            
+            # Cursor hanya maju setelah data benar-benar tertulis
+            # (kecuali data diganti/dikosongkan/diurutkan ulang selama penulisan)
+            if handler.data is data and handler.generation == generation:
+                handler.export_cursor = end
+                if self.trim_after_save:
+                    handler.trim_saved()
+            if path not in self.run_paths:
+                self.run_paths.append(path)
+            self.saved_total += end - start
+            log_info(f"💾 Autosave: {end - start} record baru -> {os.path.basename(path)}")
+            
+            if size >= self.max_part_bytes:
+                self._roll()
+            
+            return end - start, path
+    
+    def start_run(self):
+        """
+        Mulai part file baru untuk satu run pemrosesan
+        (record lama disimpan dulu ke part sebelumnya)
+        """
+        self.save_increment()
+        with self._lock:
+            self._roll()
+            self.run_paths = []
+    
+    def finish_run(self):
+        """
+        Simpan sisa record dan tutup run
+        Returns: part file yang ditulis selama run
+        """
+        self.save_increment()
+        with self._lock:
+            paths, self.run_paths = self.run_paths, []
+            self.trim_after_save = False
+        return paths
+    
+    def save_in_background(self):
+        """Jadwalkan save_increment di thread ekspor (dilewati jika masih ada yang antri)"""
+        if self._pending:
+            return None
+        self._pending = True
+        
+        def run():
+            try:
+                return self.save_increment()
+            except Exception as e:
+                log_error(f"❌ Autosave gagal: {str(e)}")
+                raise
+            finally:
+                self._pending = False
+        
+        return export_worker.run(run)
@@ -0,0 +1,150 @@
+"""
+BPJS AUTOMATION - BATCH CLI
+Jalankan batch KPJ tanpa Kivy (server / benchmark):
+
+    python batch_cli.py kpj.txt --engine stream --concurrency 4 --format csv
+    python setup.py batch kpj.txt ...
+
+Hasil ditulis streaming ke file output, throughput dicetak berkala
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from datetime import datetime
+from config import CSV_FOLDER, PIPELINE_PORTALS, PARALLEL_MAX_WORKERS, LIVE_STATS_INTERVAL
+from rate_estimator import format_duration
+
+ENGINES = ("stream", "pipeline")
+DRIVERS = ("auto", "http")
+FORMATS = ("csv", "jsonl", "xlsx")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="BPJS batch runner tanpa UI")
+    parser.add_argument("input", help="file KPJ (TXT/CSV/XLSX)")
+    parser.add_argument("--output", help="file hasil (default: CSV_FOLDER/hasil_real_<waktu>.<format>)")
+    parser.add_argument("--format", choices=FORMATS, default=None,
+                        help="format hasil (default: dari ekstensi --output, atau csv)")
+    parser.add_argument("--engine", choices=ENGINES, default="stream",
+                        help="stream: SIPP per KPJ; pipeline: SIPP -> DPT -> LAPAK")
+    parser.add_argument("--portals", default=",".join(PIPELINE_PORTALS),
+                        help="portal untuk --engine pipeline (dipisah koma)")
+    parser.add_argument("--driver", choices=DRIVERS, default="auto",
+                        help="auto: WebView jika ada + fast path sesuai config; http: paksa fast path HTTP")
+    parser.add_argument("--cookie", default=None, help="header Cookie sesi login untuk fast path HTTP")
+    parser.add_argument("--search-url", action="append", default=[], metavar="[PORTAL=]URL",
+                        help="URL pencarian fast path HTTP (tanpa PORTAL= untuk SIPP), boleh diulang "
+                             "mis. --search-url dpt=https://.../cari")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help=f"KPJ sekaligus (hanya tanpa WebView, mis. {PARALLEL_MAX_WORKERS})")
+    parser.add_argument("--no-cache", action="store_true", help="abaikan cache hasil")
+    parser.add_argument("--no-dedupe", action="store_true", help="jangan buang KPJ duplikat di input")
+    parser.add_argument("--report-interval", type=float, default=max(LIVE_STATS_INTERVAL, 10.0),
+                        help="detik antar baris throughput")
+    parser.add_argument("--quiet", action="store_true", help="hanya baris throughput dan ringkasan")
+    return parser
+
+def _default_output(fmt):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(CSV_FOLDER, f"hasil_real_{timestamp}.{fmt or 'csv'}")
+
+def _configure(args):
+    """Terapkan opsi driver/cache ke komponen global engine"""
+    from http_fast_path import http_fast_path
+    from result_cache import result_cache
+    from logger import logger
+    
+    if args.quiet:
+        logger.log_to_console = False
+    if args.no_cache:
+        result_cache.enabled = False
+    if args.driver == "http":
+        http_fast_path.enabled = True
+    if args.cookie:
+        cookie = args.cookie
+        http_fast_path.cookie_provider = lambda url: cookie
+    if args.search_url:
+        http_fast_path.forms = dict(http_fast_path.forms)
+        for entry in args.search_url:
+            portal, sep, url = entry.partition("=")
+            if not sep or portal not in http_fast_path.forms:
+                portal, url = "sipp", entry  # URL saja (boleh mengandung "=" di query)
+            http_fast_path.forms[portal] = dict(http_fast_path.forms[portal], search_url=url)
+
+def _throughput_line(snapshot):
+    total = snapshot["total"] or "?"
+    line = (f"[batch] {snapshot['processed']}/{total}"
+            f" | {snapshot['per_minute']:.1f} KPJ/min"
+            f" | sukses {snapshot['success_rate']:.1f}%"
+            f" | {format_duration(snapshot['elapsed'])}")
+    if snapshot["p50_latency"] is not None:
+        line += f" | p50 {snapshot['p50_latency']:.1f}s"
+    if snapshot["eta_seconds"] is not None:
+        line += f" | ETA {format_duration(snapshot['eta_seconds'])} ({snapshot['finish_at']})"
+    return line
+
+def _report_periodically(estimator, interval, stop_event):
+    while not stop_event.wait(interval):
+        print(_throughput_line(estimator.snapshot()), flush=True)
+
+def run(args):
+    """Returns: exit code"""
+    _configure(args)
+    
+    from automation import get_engine
+    from kpj_importer import open_kpj_file
+    from exporter import export_records, detect_format
+    from flattener import get_default_plan
+    from config import EXPORT_USE_COLUMN_PLAN
+    
+    if not os.path.exists(args.input):
+        print(f"File tidak ditemukan: {args.input}", file=sys.stderr)
+        return 2
+    
+    output = args.output or _default_output(args.format)
+    fmt = args.format or detect_format(output)
+    plan = get_default_plan() if EXPORT_USE_COLUMN_PLAN and fmt != "jsonl" else None
+    
+    importer, size_hint = open_kpj_file(args.input, dedupe=not args.no_dedupe)
+    engine = get_engine()
+    
+    if args.engine == "pipeline":
+        portals = [portal.strip() for portal in args.portals.split(",") if portal.strip()]
+        results = engine.process_pipeline(importer, size_hint, portals=portals)
+    else:
+        results = engine.process_parallel(importer, size_hint, concurrency=args.concurrency)
+    
+    print(f"[batch] {args.input} -> {output} ({fmt}, engine={args.engine}, "
+          f"driver={args.driver}, concurrency={args.concurrency}, ±{size_hint or '?'} KPJ)", flush=True)
+    
+    stop_event = threading.Event()
+    reporter = threading.Thread(
+        target=_report_periodically, args=(engine.estimator, args.report_interval, stop_event),
+        name="batch-report", daemon=True
+    )
+    reporter.start()
+    
+    started = time.monotonic()
+    exit_code = 0
+    try:
+        # Tulis langsung per chunk (tidak atomik): hasil parsial tetap ada jika dihentikan
+        export_records(results, output, fmt, plan=plan)
+    except KeyboardInterrupt:
+        print("[batch] Dihentikan (Ctrl+C), hasil parsial tersimpan", file=sys.stderr)
+        exit_code = 130
+    finally:
+        stop_event.set()
+    
+    snapshot = engine.estimator.snapshot()
+    print(_throughput_line(snapshot), flush=True)
+    print(f"[batch] Selesai: {snapshot['processed']} KPJ, {snapshot['successful']} sukses, "
+          f"{snapshot['failed']} gagal dalam {time.monotonic() - started:.1f} detik -> {output}", flush=True)
+    return exit_code
+
+def main(argv=None):
+    return run(build_parser().parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+BPJS AUTOMATION - BATCH SCHEDULER
+Beberapa batch KPJ antri sekaligus dengan prioritas dan deadline,
+dijalankan bergantian (weighted fair queuing) lewat satu engine,
+progress dilaporkan per batch
+"""
+
+import time
+import itertools
+import threading
+from config import SCHEDULER_PRIORITY_WEIGHTS, SCHEDULER_DEFAULT_PRIORITY
+from logger import log_info, log_warning
+from rate_estimator import RateEstimator
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+
+class ScheduledBatch:
+    """Satu batch: iterator KPJ + progress sendiri"""
+    
+    def __init__(self, batch_id, kpj_iterable, size_hint, priority, weight, deadline, order):
+        self.batch_id = batch_id
+        self.iterator = iter(kpj_iterable)
+        self.total = size_hint
+        self.priority = priority
+        self.weight = weight
+        self.deadline = deadline  # time.monotonic() batas selesai, atau None
+        self.order = order
+        self.state = QUEUED
+        self.virtual_time = 0.0
+        self.dispatched = 0
+        self.processed = 0
+        self.successful = 0
+        self.exhausted = False
+        self.estimator = RateEstimator()
+        self.estimator.start(size_hint)
+    
+    @property
+    def in_flight(self):
+        return self.dispatched - self.processed
+    
+    def is_active(self):
+        return self.state in (QUEUED, RUNNING) and not self.exhausted
+    
+    def remaining(self):
+        if self.total:
+            return max(self.total - self.dispatched, 1)
+        return 1  # ukuran tidak diketahui: anggap minimal satu KPJ lagi
+    
+    def get_status(self):
+        live = self.estimator.snapshot()
+        deadline_in = round(self.deadline - time.monotonic()) if self.deadline is not None else None
+        return {
+            "batch_id": self.batch_id,
+            "priority": self.priority,
+            "state": self.state,
+            "processed": self.processed,
+            "successful": self.successful,
+            "total": self.total,
+            "percent": round(self.processed / self.total * 100, 1) if self.total else None,
+            "per_minute": live["per_minute"],
+            "eta_seconds": live["eta_seconds"],
+            "deadline_in": deadline_in
+        }
+
+class BatchScheduler:
+    """
+    Antrian batch di depan engine:
+    - tiap batch dapat giliran sebanding bobot prioritasnya (virtual time)
+    - batch dengan deadline yang terancam lewat didahulukan (deadline terdekat)
+    - engine menarik KPJ satu per satu, jadi batch baru langsung ikut bergiliran
+    """
+    
+    def __init__(self, engine_fn=None, on_result=None, on_batch_done=None, on_idle=None,
+                 progress_callback=None):
+        """
+        engine_fn(kpj_iterable, size_hint, progress_callback) -> iterator result
+        on_result(batch, result), on_batch_done(batch), on_idle() dipanggil dari thread scheduler
+        """
+        self.engine_fn = engine_fn
+        self.on_result = on_result
+        self.on_batch_done = on_batch_done
+        self.on_idle = on_idle
+        self.progress_callback = progress_callback
+        self.batches = []
+        self.estimator = RateEstimator()  # kecepatan + ETA engine (cek deadline, StatsPanel)
+        self._dispatched = {}  # nomor urut engine -> batch
+        self._sequence = 0
+        self._virtual_clock = 0.0
+        self._order = itertools.count(1)
+        self._running = False
+        self._lock = threading.Lock()
+    
+    def submit(self, kpj_iterable, size_hint=None, priority=SCHEDULER_DEFAULT_PRIORITY,
+               deadline=None, batch_id=None):
+        """
+        Tambah batch ke antrian
+        deadline: detik dari sekarang (opsional)
+        Returns: batch_id
+        """
+        if priority not in SCHEDULER_PRIORITY_WEIGHTS:
+            raise ValueError(f"Prioritas tidak dikenal: {priority}")
+        
+        with self._lock:
+            order = next(self._order)
+            batch = ScheduledBatch(
+                batch_id or f"{priority}_{order}", kpj_iterable, size_hint, priority,
+                SCHEDULER_PRIORITY_WEIGHTS[priority],
+                time.monotonic() + deadline if deadline is not None else None, order
+            )
+            # Mulai dari virtual clock saat ini: tidak "menagih" giliran yang terlewat
+            batch.virtual_time = self._virtual_clock
+            self.batches.append(batch)
+            
+            start = not self._running
+            self._running = True
+        
+        self._refresh_total()
+        log_info(f"🗓️ Batch {batch.batch_id} masuk antrian ({priority}, ±{size_hint or '?'} KPJ"
+                 f"{f', deadline {deadline:.0f} detik' if deadline is not None else ''})")
+        if start:
+            threading.Thread(target=self._run, name="batch-scheduler", daemon=True).start()
+        return batch.batch_id
+    
+    def cancel(self, batch_id=None):
+        """Batalkan satu batch (atau semua jika batch_id None); KPJ yang sedang jalan tetap selesai"""
+        finished = []
+        with self._lock:
+            for batch in self.batches:
+                if batch_id is None or batch.batch_id == batch_id:
+                    if batch.state in (QUEUED, RUNNING):
+                        batch.state = CANCELLED
+                        if batch.in_flight == 0:
+                            finished.append(batch)
+        for batch in finished:
+            self._batch_finished(batch)
+        self._refresh_total()
+        return len(finished)
+    
+    def is_busy(self):
+        with self._lock:
+            return self._running
+    
+    def _refresh_total(self):
+        """
+        Total engine untuk ETA: KPJ selesai + sisa semua batch di antrian
+        (engine sendiri dipanggil tanpa size_hint; None jika ada ukuran yang tidak diketahui)
+        """
+        remaining = 0
+        with self._lock:
+            for batch in self.batches:
+                if batch.state == CANCELLED or batch.exhausted:
+                    remaining += batch.in_flight
+                elif batch.total is None:
+                    remaining = None
+                    break
+                else:
+                    remaining += max(batch.total - batch.processed, batch.in_flight)
+        self.estimator.set_total(self.estimator.processed + remaining if remaining is not None else None)
+    
+    # ---------------------------------------------
+    # Pemilihan KPJ berikutnya
+    # ---------------------------------------------
+    
+    def _seconds_per_kpj(self):
+        per_minute = self.estimator.snapshot()["per_minute"]
+        return 60 / per_minute if per_minute > 0 else 0.0
+    
+    def _pick(self):
+        active = [batch for batch in self.batches if batch.is_active()]
+        if not active:
+            return None
+        
+        now = time.monotonic()
+        seconds_per_kpj = self._seconds_per_kpj()
+        at_risk = [
+            batch for batch in active
+            if batch.deadline is not None and batch.remaining() * seconds_per_kpj >= batch.deadline - now
+        ]
+        if at_risk:
+            return min(at_risk, key=lambda batch: batch.deadline)
+        return min(active, key=lambda batch: (batch.virtual_time, batch.order))
+    
+    def _source(self):
+        """Iterator KPJ untuk engine; selesai jika tidak ada batch aktif"""
+        while True:
+            exhausted = []
+            with self._lock:
+                item = None
+                while item is None:
+                    batch = self._pick()
+                    if batch is None:
+                        break
+                    try:
+                        kpj = next(batch.iterator)
+                    except StopIteration:
+                        batch.exhausted = True
+                        if batch.in_flight == 0:
+                            exhausted.append(batch)
+                        continue
+                    except Exception as e:
+                        log_warning(f"Input batch {batch.batch_id} error: {str(e)}")
+                        batch.exhausted = True
+                        if batch.in_flight == 0:
+                            exhausted.append(batch)
+                        continue
+                    
+                    batch.state = RUNNING
+                    batch.dispatched += 1
+                    batch.virtual_time += 1.0 / batch.weight
+                    self._virtual_clock = batch.virtual_time
+                    self._sequence += 1
+                    self._dispatched[self._sequence] = batch
+                    item = kpj
+            
+            for batch in exhausted:
+                self._batch_finished(batch)
+            if item is None:
+                return
+            yield item
+    
+    # ---------------------------------------------
+    # Eksekusi
+    # ---------------------------------------------
+    
+    def _engine_progress(self, progress):
+        if self.progress_callback is None:
+            return
+        batch = self._dispatched.get(progress.get("current"))
+        progress = dict(progress, batch_id=batch.batch_id if batch else None)
+        self.progress_callback(progress)
+    
+    def _run(self):
+        engine_fn = self.engine_fn
+        if engine_fn is None:
+            from automation import process_kpj_stream
+            engine_fn = process_kpj_stream
+        
+        self.estimator.start()
+        self._refresh_total()
+        while True:
+            with self._lock:
+                self._sequence = 0  # nomor urut engine mulai dari 1 lagi
+            for result in engine_fn(self._source(), None, self._engine_progress):
+                self._collect(result)
+            
+            with self._lock:
+                if not any(batch.is_active() for batch in self.batches):
+                    self._running = False
+                    self._dispatched.clear()
+                    break
+        
+        log_info("🗓️ Semua batch di antrian selesai")
+        if self.on_idle:
+            self.on_idle()
+    
+    def _collect(self, result):
+        with self._lock:
+            batch = self._dispatched.pop(result.get("sequence"), None)
+        if batch is None:
+            log_warning(f"Hasil tanpa batch: KPJ {result.get('kpj')}")
+            return
+        
+        is_success = result.get("status") in ["success", "completed"]
+        latency = result.get("processing_duration_seconds")
+        batch.processed += 1
+        if is_success:
+            batch.successful += 1
+        batch.estimator.record(latency, is_success)
+        self.estimator.record(latency, is_success)
+        result["scheduled_batch"] = batch.batch_id
+        
+        if self.on_result:
+            self.on_result(batch, result)
+        
+        if batch.in_flight == 0 and (batch.exhausted or batch.state == CANCELLED):
+            self._batch_finished(batch)
+    
+    def _batch_finished(self, batch):
+        with self._lock:
+            if batch in self.batches:
+                self.batches.remove(batch)
+            if batch.state != CANCELLED:
+                batch.state = DONE
+        self._refresh_total()
+        
+        log_info(f"🗓️ Batch {batch.batch_id} {batch.state}: {batch.processed} KPJ, {batch.successful} sukses")
+        if self.on_batch_done:
+            self.on_batch_done(batch)
+    
+    def get_status(self):
+        """Progress per batch yang masih di antrian"""
+        with self._lock:
+            batches = list(self.batches)
+        return [batch.get_status() for batch in batches]
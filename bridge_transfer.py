@@ -0,0 +1,142 @@
+"""
+BPJS AUTOMATION - BRIDGE TRANSFER
+Transfer hasil JS besar lewat BPJSBridge dalam potongan bernomor urut,
+di-decode per baris JSON (NDJSON) selama potongan datang
+
+Protokol (dikirim STREAM_RESULT_JS):
+    {"head": {...}}            field non-array dari hasil
+    {"k": key, "v": item}      satu elemen array (mis. satu tabel)
+    {"end": true, "dropped": {key: jumlah}}   penanda selesai/terpotong
+Teks NDJSON dipecah per JS_CHUNK_SIZE karakter -> jsChunk(id, seq, fragment),
+lalu jsResult(id, 'chunked', jumlah_potongan)
+"""
+
+import json
+from config import JS_CHUNK_SIZE, JS_MAX_PAYLOAD
+from logger import log_warning
+
+# Fungsi JS: function(id, result, chunkSize, maxPayload)
+STREAM_RESULT_JS = """
+function(id, result, chunkSize, maxPayload) {
+    var isObject = result !== null && typeof result === 'object' && !Array.isArray(result);
+    var source = isObject ? result : {'__value': result};
+    var head = {};
+    var lines = [];
+    var dropped = {};
+    var used = 0;
+    
+    for(var key in source) {
+        if(!source.hasOwnProperty(key)) continue;
+        var value = source[key];
+        
+        if(Array.isArray(value)) {
+            head[key] = [];
+            for(var i = 0; i < value.length; i++) {
+                var line = JSON.stringify({k: key, v: value[i]});
+                if(used + line.length > maxPayload) {
+                    dropped[key] = (dropped[key] || 0) + 1;
+                    continue;
+                }
+                used += line.length + 1;
+                lines.push(line);
+            }
+        } else if(typeof value === 'string' && value.length > maxPayload) {
+            head[key] = value.substring(0, maxPayload);
+            dropped[key] = value.length - maxPayload;
+        } else {
+            head[key] = value;
+        }
+    }
+    
+    lines.unshift(JSON.stringify({head: head}));
+    lines.push(JSON.stringify({end: true, dropped: dropped}));
+    var text = lines.join('\\n') + '\\n';
+    
+    var seq = 0;
+    for(var pos = 0; pos < text.length; pos += chunkSize) {
+        BPJSBridge.jsChunk(id, seq, text.substring(pos, pos + chunkSize));
+        seq++;
+    }
+    BPJSBridge.jsResult(id, 'chunked', String(seq));
+}
+"""
+
+class ChunkedResult:
+    """Susun ulang potongan (urut seq) dan decode tiap baris NDJSON segera"""
+    
+    def __init__(self, callback_id, max_chars=JS_MAX_PAYLOAD * 2):
+        self.callback_id = callback_id
+        self.max_chars = max_chars  # batas pengaman di sisi Python
+        self.next_seq = 0
+        self.pending = {}  # potongan yang datang lebih dulu dari urutannya
+        self.partial = []  # bagian baris yang belum lengkap
+        self.received_chars = 0
+        self.duplicates = 0
+        self.head = None
+        self.dropped = {}
+        self.finished = False
+    
+    def add(self, seq, fragment):
+        """Terima satu potongan (urutan bebas, duplikat diabaikan)"""
+        if seq < self.next_seq or seq in self.pending:
+            self.duplicates += 1
+            return
+        
+        self.received_chars += len(fragment)
+        if self.received_chars > self.max_chars:
+            raise ValueError(f"Payload {self.callback_id} melebihi {self.max_chars} karakter")
+        
+        self.pending[seq] = fragment
+        while self.next_seq in self.pending:
+            self._feed(self.pending.pop(self.next_seq))
+            self.next_seq += 1
+    
+    def _feed(self, fragment):
+        start = 0
+        newline = fragment.find("\n")
+        while newline != -1:
+            self.partial.append(fragment[start:newline])
+            line = "".join(self.partial)
+            self.partial = []
+            if line:
+                self._decode(json.loads(line))
+            start = newline + 1
+            newline = fragment.find("\n", start)
+        
+        if start < len(fragment):
+            self.partial.append(fragment[start:])
+    
+    def _decode(self, record):
+        if "head" in record:
+            self.head = record["head"]
+        elif "k" in record:
+            self.head[record["k"]].append(record["v"])
+        elif record.get("end"):
+            self.dropped = record.get("dropped") or {}
+            self.finished = True
+    
+    def finish(self, total):
+        """
+        Semua potongan diterima (total dari jsResult)
+        Returns: hasil ter-decode, dengan "truncated"/"_truncated" jika dipotong
+        """
+        if self.next_seq != total or not self.finished:
+            raise ValueError(
+                f"Transfer {self.callback_id} tidak lengkap: {self.next_seq}/{total} potongan"
+            )
+        
+        result = self.head
+        if list(result) == ["__value"]:
+            result = result["__value"]
+        
+        if self.dropped:
+            log_warning(f"✂️ Hasil JS {self.callback_id} dipotong (maks {JS_MAX_PAYLOAD}): {self.dropped}")
+            if isinstance(result, dict):
+                result["truncated"] = True
+                result["_truncated"] = self.dropped
+        
+        return result
+
+def build_stream_call(callback_id, result_var="result"):
+    """Potongan JS yang mengirim `result_var` lewat STREAM_RESULT_JS"""
+    return f"({STREAM_RESULT_JS})('{callback_id}', {result_var}, {JS_CHUNK_SIZE}, {JS_MAX_PAYLOAD});"
@@ -5,10 +5,11 @@ package.domain = com.bpjs
 source.dir = .
 source.include_exts = py,png,jpg,kv,json,txt
 version = 1.0.0
-requirements = python3,kivy==2.1.0,selenium,beautifulsoup4,pandas,openpyxl,requests
+requirements = python3,kivy==2.1.0,openpyxl,requests
 orientation = portrait
 fullscreen = 0
-android.permissions = INTERNET,WRITE_EXTERNAL_STORAGE,READ_EXTERNAL_STORAGE
+android.permissions = INTERNET,WRITE_EXTERNAL_STORAGE,READ_EXTERNAL_STORAGE,FOREGROUND_SERVICE
+services = Worker:worker_service.py:foreground
 android.api = 33
 android.minapi = 21
 android.sdk = 23
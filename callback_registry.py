@@ -0,0 +1,159 @@
+"""
+BPJS AUTOMATION - JS CALLBACK REGISTRY
+Callback hasil JavaScript dengan ID unik, deadline (timer wheel),
+notifikasi timeout ke pemanggil dan eviksi entri yatim
+"""
+
+import time
+import itertools
+import threading
+from config import (
+    JS_CALLBACK_TIMEOUT, JS_TIMER_TICK, JS_TIMER_WHEEL_SLOTS,
+    JS_ORPHAN_SWEEP_INTERVAL
+)
+from logger import log_error, log_warning
+
+JS_TIMEOUT_ERROR = "JS_TIMEOUT"
+
+class CallbackRegistry:
+    """Registry callback_id -> callback dengan deadline per panggilan"""
+    
+    def __init__(self, default_timeout=JS_CALLBACK_TIMEOUT, tick=JS_TIMER_TICK,
+                 slots=JS_TIMER_WHEEL_SLOTS, sweep_interval=JS_ORPHAN_SWEEP_INTERVAL):
+        self.default_timeout = default_timeout
+        self.tick = tick
+        self.sweep_interval = sweep_interval
+        self.entries = {}  # callback_id -> (callback, deadline)
+        self.wheel = [set() for _ in range(slots)]
+        self.position = 0  # slot yang sedang diproses
+        self.stats = {"registered": 0, "resolved": 0, "timed_out": 0, "orphans": 0, "late_results": 0}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+    
+    def register(self, callback, timeout=None):
+        """
+        Simpan callback, Returns: callback_id unik
+        callback(False, JS_TIMEOUT_ERROR) dipanggil jika hasil tidak datang sebelum deadline
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        ticks = max(1, int(timeout / self.tick + 0.999))
+        
+        with self._lock:
+            callback_id = f"cb{next(self._ids)}"
+            deadline = time.monotonic() + timeout
+            self.entries[callback_id] = (callback, deadline)
+            # Timeout lebih lama dari satu putaran wheel: dicek ulang saat slot lewat
+            self.wheel[(self.position + ticks) % len(self.wheel)].add(callback_id)
+            self.stats["registered"] += 1
+        
+        self._ensure_thread()
+        return callback_id
+    
+    def resolve(self, callback_id):
+        """
+        Ambil callback untuk hasil yang datang
+        Returns: callback or None (ID tidak dikenal / sudah timeout)
+        """
+        with self._lock:
+            entry = self.entries.pop(callback_id, None)
+            if entry is None:
+                self.stats["late_results"] += 1
+            else:
+                self.stats["resolved"] += 1
+        
+        if entry is None:
+            log_warning(f"Hasil JS untuk callback tidak dikenal/kedaluwarsa: {callback_id}")
+            return None
+        return entry[0]
+    
+    def cancel(self, callback_id):
+        with self._lock:
+            return self.entries.pop(callback_id, None) is not None
+    
+    def is_pending(self, callback_id):
+        with self._lock:
+            return callback_id in self.entries
+    
+    def pending_count(self):
+        with self._lock:
+            return len(self.entries)
+    
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="js-callback-wheel", daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        next_sweep = time.monotonic() + self.sweep_interval
+        while not self._stop_event.wait(self.tick):
+            self._advance()
+            if time.monotonic() >= next_sweep:
+                self.evict_orphans()
+                next_sweep = time.monotonic() + self.sweep_interval
+    
+    def _advance(self):
+        """Maju satu slot, kirim timeout untuk entri yang lewat deadline"""
+        now = time.monotonic()
+        expired = []
+        
+        with self._lock:
+            self.position = (self.position + 1) % len(self.wheel)
+            slot = self.wheel[self.position]
+            self.wheel[self.position] = set()
+            
+            for callback_id in slot:
+                entry = self.entries.get(callback_id)
+                if entry is None:
+                    continue  # sudah di-resolve
+                callback, deadline = entry
+                if deadline <= now + self.tick / 2:
+                    del self.entries[callback_id]
+                    expired.append((callback_id, callback))
+                else:
+                    # Belum waktunya (putaran wheel berikutnya)
+                    ticks = max(1, int((deadline - now) / self.tick + 0.999))
+                    self.wheel[(self.position + ticks) % len(self.wheel)].add(callback_id)
+            
+            self.stats["timed_out"] += len(expired)
+        
+        self._deliver_timeouts(expired)
+    
+    def evict_orphans(self):
+        """
+        Buang entri yang lewat deadline tapi tidak ada di wheel
+        (mis. wheel thread sempat mati), tetap kirim timeout ke pemanggil
+        """
+        now = time.monotonic()
+        with self._lock:
+            orphans = [
+                (callback_id, callback) for callback_id, (callback, deadline) in self.entries.items()
+                if deadline + self.sweep_interval <= now
+            ]
+            for callback_id, _ in orphans:
+                del self.entries[callback_id]
+            self.stats["orphans"] += len(orphans)
+        
+        if orphans:
+            log_warning(f"🧹 {len(orphans)} callback JS yatim dibuang")
+        self._deliver_timeouts(orphans)
+        return len(orphans)
+    
+    def _deliver_timeouts(self, expired):
+        for callback_id, callback in expired:
+            log_warning(f"⏱️ Callback JS timeout: {callback_id}")
+            try:
+                callback(False, JS_TIMEOUT_ERROR)
+            except Exception as e:
+                log_error(f"Timeout callback error {callback_id}: {str(e)}")
+    
+    def stop(self):
+        self._stop_event.set()
+    
+    def get_stats(self):
+        with self._lock:
+            stats = self.stats.copy()
+            stats["pending"] = len(self.entries)
+        return stats
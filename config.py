@@ -3,6 +3,8 @@ BPJS AUTOMATION - CONFIGURATION FILE
 Edit URLs and settings according to your needs
 """
 
+import os
+
 # ============================================
 # URL CONFIGURATION - EDIT THESE URLs
 # ============================================
@@ -27,6 +29,7 @@ APP_AUTHOR = "BPJS Automation Team"
 # File paths
 DOWNLOAD_FOLDER = "/storage/emulated/0/Download/"
 LOG_FOLDER = "/storage/emulated/0/Download/bpjs_logs/"
+CSV_FOLDER = DOWNLOAD_FOLDER  # Folder hasil ekspor CSV dari aplikasi
 CSV_PREFIX = "bpjs_result_"
 
 # Processing settings
@@ -34,14 +37,164 @@ MAX_RETRIES = 3
 RETRY_DELAY = 5  # seconds
 REQUEST_TIMEOUT = 30  # seconds
 
+# JavaScript callbacks (WebView -> BPJSBridge.jsResult)
+JS_CALLBACK_TIMEOUT = 15  # seconds before the caller gets JS_TIMEOUT
+JS_TIMER_TICK = 0.1  # timer wheel resolution (seconds)
+JS_TIMER_WHEEL_SLOTS = 512  # one wheel turn = slots * tick seconds
+JS_ORPHAN_SWEEP_INTERVAL = 30  # seconds between orphan sweeps
+JS_CHUNK_SIZE = 32 * 1024  # characters per BPJSBridge.jsChunk call
+JS_MAX_PAYLOAD = 512 * 1024  # characters; array items beyond this are dropped
+
+# Page readiness (replaces fixed sleeps in WebView automation)
+READY_POLL_INTERVAL = 0.2  # seconds between DOM-ready predicate checks
+RESULT_READY_TIMEOUT = 10  # seconds to wait for search results after click
+LOAD_TIME_HISTORY = 50  # load times kept per URL
+
+# Result cache (skip re-fetching recently processed KPJs)
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_FILE = "/storage/emulated/0/Download/bpjs_cache/result_cache.db"
+RESULT_CACHE_TTL_POSITIVE = 24 * 3600  # seconds
+RESULT_CACHE_TTL_NEGATIVE = 15 * 60  # seconds (failed/timeout)
+RESULT_CACHE_MAX_BYTES = 20 * 1024 * 1024  # LRU eviction above this size
+RESULT_CACHE_SWEEP_EVERY = 500  # puts between expiry sweeps (also resyncs the byte total)
+RESULT_CACHE_EVICT_BATCH = 100  # LRU rows fetched per eviction query
+
+# Session expiry detection (manual login session)
+SESSION_EXPIRED_URL_MARKERS = ("/login", "/signin", "/auth/", "/logout", "sso.")
+SESSION_EXPIRED_TEXT_MARKERS = (
+    "sesi anda telah berakhir", "sesi berakhir", "silakan login",
+    "silahkan login", "session expired", "please login",
+)
+SESSION_RELOGIN_TIMEOUT = 30 * 60  # seconds to wait for re-login before giving up
+
+# Hidden WebView request interception (shouldInterceptRequest)
+REQUEST_BLOCKING_ENABLED = True
+BLOCKED_EXTENSIONS = {
+    "image": (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico", ".bmp"),
+    "font": (".woff", ".woff2", ".ttf", ".otf", ".eot"),
+    "media": (".mp4", ".webm", ".mp3", ".ogg", ".wav", ".m4a"),
+}
+BLOCK_THIRD_PARTY_SCRIPTS = True
+BLOCKED_HOST_MARKERS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "facebook.net", "hotjar.com", "clarity.ms",
+)
+ASSET_CACHE_ENABLED = True
+ASSET_CACHE_FOLDER = "/storage/emulated/0/Download/bpjs_cache/assets/"
+ASSET_CACHE_EXTENSIONS = {".css": "text/css", ".js": "application/javascript"}
+ASSET_CACHE_TTL = 7 * 24 * 3600  # seconds
+
+# HTTP fast path (plain form search without rendering the WebView)
+HTTP_FAST_PATH_ENABLED = False
+HTTP_POOL_SIZE = 4  # keep-alive connections per host
+HTTP_RATE_LIMIT = 2.0  # requests per second per host
+HTTP_FAST_PATH_FORMS = {
+    # search_url None = portal belum dipetakan, selalu lewat WebView
+    "sipp": {
+        "search_url": None,
+        "method": "POST",
+        "kpj_field": "kpj",
+        "extra_fields": {},
+        "result_marker": "<table",
+    },
+    # Pipeline portals: headless runs (batch_cli) have no WebView to fall back on
+    "dpt": {
+        "search_url": None,
+        "method": "POST",
+        "kpj_field": "nik",
+        "extra_fields": {},
+        "result_marker": "<table",
+    },
+    "lapak": {
+        "search_url": None,
+        "method": "POST",
+        "kpj_field": "kpj",
+        "extra_fields": {},
+        "result_marker": "<table",
+    },
+}
+
+# Multi-portal pipeline (SIPP -> DPT -> LAPAK, each stage its own WebView)
+PIPELINE_PORTALS = ("sipp", "dpt", "lapak")
+PIPELINE_STAGE_RATE = {"sipp": 1.0, "dpt": 0.5, "lapak": 1.0}  # searches per second
+PIPELINE_QUEUE_SIZE = 10  # KPJs waiting per stage (backpressure)
+PIPELINE_SEARCH_FIELDS = {"sipp": "kpj", "dpt": "nik", "lapak": "kpj"}  # input keyword per portal
+PARALLEL_MAX_WORKERS = 4  # KPJs in flight for headless HTTP-only runs (batch_cli.py --concurrency)
+
 # UI Settings
 UI_REFRESH_RATE = 0.5  # seconds
 PROGRESS_UPDATE_INTERVAL = 0.2  # seconds
+LIVE_STATS_INTERVAL = 2.0  # seconds between StatsPanel refreshes during a batch
+RATE_EWMA_ALPHA = 0.1  # weight of the newest KPJ interval in the throughput average
+RATE_LATENCY_WINDOW = 50  # recent KPJs used for the p50 latency
 
 # CSV Export settings
 CSV_ENCODING = "utf-8"
 CSV_DELIMITER = ","
 CSV_QUOTING = "csv.QUOTE_MINIMAL"
+EXPORT_CHUNK_SIZE = 1000  # records per write (exporter.py)
+EXPORT_USE_COLUMN_PLAN = True  # CSV/XLSX: flatten results with EXPORT_COLUMN_PLAN
+CSV_INDEX_SUFFIX = ".idx"  # sidecar offset index next to a result CSV (csv_index.py)
+CSV_INDEX_SAVE = True  # keep the sidecar so the next open skips the scan
+CSV_INDEX_KEY_FIELD = "kpj"
+
+# Flattened export columns: (column, dotted path, mode)
+# "[]" flattens a list; modes: value, json (JSON in cell), join (list -> text), count
+EXPORT_COLUMN_PLAN = [
+    ("kpj", "kpj", "value"),
+    ("status", "status", "value"),
+    ("tab", "tab", "value"),
+    ("error", "error", "value"),
+    ("page_title", "data.pageTitle", "value"),
+    ("tables_found", "data.tablesFound", "value"),
+    ("result_text", "data.tables[].rows[].cells[].text", "join"),
+    ("containers", "data.containers[].text", "join"),
+    ("truncated", "data.truncated", "value"),
+    ("dpt_status", "portals.dpt.status", "value"),
+    ("dpt_text", "portals.dpt.data.tables[].rows[].cells[].text", "join"),
+    ("lapak_status", "portals.lapak.status", "value"),
+    ("lapak_text", "portals.lapak.data.tables[].rows[].cells[].text", "join"),
+    ("cache_hit", "cache_hit", "value"),
+    ("attempt", "process_attempt", "value"),
+    ("duration_seconds", "processing_duration_seconds", "value"),
+    ("timestamp", "batch_timestamp", "value"),
+    ("batch_success_rate", "batch_summary.success_rate", "value"),
+]
+EXPORT_EXPLODE_PATH = None  # e.g. "data.tables[].rows[]" for one row per table row ("@." paths)
+EXPORT_JOIN_SEPARATOR = " | "
+
+# Incremental autosave (only records added since the last save)
+AUTOSAVE_ENABLED = True
+AUTOSAVE_INTERVAL = 60  # seconds
+AUTOSAVE_FOLDER = CSV_FOLDER
+AUTOSAVE_PREFIX = "hasil_real_autosave_"
+AUTOSAVE_MAX_PART_BYTES = 10 * 1024 * 1024  # roll to a new part file above this size
+
+# Result file merge (result_merger.py)
+MERGE_FILE_PATTERNS = ["hasil_real_*.csv"]  # includes hasil_real_autosave_*.csv
+MERGE_OUTPUT_PREFIX = "hasil_real_gabungan_"
+MERGE_RUN_SIZE = 50000  # rows sorted in memory per run
+MERGE_MAX_FANIN = 64  # run files open at once during the merge
+MERGE_KEY_FIELD = "kpj"
+MERGE_TIME_FIELD = "timestamp"  # latest value wins per KPJ
+
+# Multi-batch scheduler (batch_scheduler.py): share of engine turns per priority
+SCHEDULER_ENABLED = True  # queue new batches instead of refusing while one runs
+SCHEDULER_PRIORITY_WEIGHTS = {"urgent": 8, "normal": 2, "bulk": 1}
+SCHEDULER_DEFAULT_PRIORITY = "normal"
+# Deadline (seconds after queuing) per priority; at-risk batches jump the queue
+SCHEDULER_PRIORITY_DEADLINES = {"urgent": 15 * 60, "normal": None, "bulk": None}
+
+# Headless worker process (worker_service.py)
+WORKER_MODE_ENABLED = False  # run batches in the worker instead of the app process
+WORKER_HOST = "127.0.0.1"
+WORKER_PORT = 8765
+# App-private dir shared by app and worker (p4a sets ANDROID_PRIVATE in both processes)
+APP_PRIVATE_DIR = os.environ.get("ANDROID_PRIVATE") or os.path.dirname(os.path.abspath(__file__))
+WORKER_TOKEN_FILE = os.path.join(APP_PRIVATE_DIR, ".worker_token")
+WORKER_EVENT_BACKLOG = 2000  # events replayed to a reconnecting app
+WORKER_CLIENT_QUEUE_SIZE = 4000  # unsent events per client before it is dropped (> backlog)
+WORKER_CONNECT_TIMEOUT = 10  # seconds to wait for a freshly started worker
 
 # Logging levels
 LOG_LEVEL_INFO = "INFO"
@@ -49,6 +202,26 @@ LOG_LEVEL_WARNING = "WARNING"
 LOG_LEVEL_ERROR = "ERROR"
 LOG_LEVEL_DEBUG = "DEBUG"
 
+# ============================================
+# DIAGNOSTICS SETTINGS
+# ============================================
+
+# Sampling CPU profiler (output: LOG_FOLDER/bpjs_profile_*.folded)
+PROFILER_ENABLED = False
+PROFILER_SAMPLE_INTERVAL = 0.01  # seconds (100 Hz)
+PROFILER_MAX_DEPTH = 64  # frames per stack
+PROFILER_TOP_N = 10  # hot spots logged at stop
+
+# tracemalloc memory snapshots (logged every N processed KPJs)
+MEMORY_DIAGNOSTICS_ENABLED = False
+MEMORY_SNAPSHOT_EVERY = 50  # KPJs
+MEMORY_TOP_N = 10  # growing allocation sites per report
+MEMORY_TRACE_FRAMES = 1  # traceback depth stored by tracemalloc
+
+# Cold-start import budget (python import_budget.py)
+IMPORT_TIME_BUDGET_MS = 150  # cumulative per app module, excluding Kivy itself
+IMPORT_REPORT_TOP_N = 5  # slowest imports listed per module
+
 # ============================================
 # VALIDATION SETTINGS
 # ============================================
@@ -57,6 +230,7 @@ LOG_LEVEL_DEBUG = "DEBUG"
 KPJ_MIN_LENGTH = 10
 KPJ_MAX_LENGTH = 15
 KPJ_ALLOWED_CHARS = "0123456789"
+KPJ_IMPORT_COLUMN = "kpj"  # CSV/XLSX header name (falls back to first column)
 
 # Data validation
 MIN_NAME_LENGTH = 3
@@ -97,6 +271,7 @@ MESSAGES = {
     "csv_saved": "CSV saved successfully: {filename}",
     "csv_error": "Error saving CSV: {error}",
     "login_required": "Please login to the system first.",
+    "relogin_required": "Session expired. Please login again to resume.",
     "network_error": "Network error. Please check connection.",
     "timeout_error": "Request timeout. Please try again.",
 }
@@ -3,15 +3,19 @@ BPJS AUTOMATION - CSV HANDLER
 Handles all CSV file operations
 """
 
-import csv
 import os
 import json
 from datetime import datetime
 from config import (
-    CSV_ENCODING, CSV_DELIMITER, CSV_QUOTING,
+    CSV_ENCODING, EXPORT_USE_COLUMN_PLAN,
     DOWNLOAD_FOLDER, CSV_PREFIX, get_csv_path
 )
 from logger import log_info, log_error, log_warning
+from exporter import (
+    export_records_atomic, export_in_background, detect_format
+)
+from flattener import get_default_plan
+from csv_index import IndexedCSVReader
 
 class CSVHandler:
     """Handles CSV file operations"""
@@ -20,6 +24,9 @@ class CSVHandler:
         self.data = []
         self.fields = set()
         self.current_file = None
+        self.export_cursor = 0  # data[:export_cursor] sudah di-autosave
+        self.trimmed_count = 0  # record yang sudah di-autosave lalu dibuang dari memori
+        self.generation = 0  # naik saat data diurutkan ulang/dedupe (autosave tulis ulang)
         
     def add_record(self, record):
         """Add a record to the data collection"""
@@ -58,13 +65,33 @@ class CSVHandler:
         count = len(self.data)
         self.data = []
         self.fields = set()
+        self.export_cursor = 0
+        self.trimmed_count = 0
         log_info(f"Cleared {count} records from memory")
         return count
     
+    def _reset_export_cursor(self):
+        """Urutan data berubah: autosave berikutnya menulis ulang semua record ke part baru"""
+        self.export_cursor = 0
+        self.generation += 1
+    
+    def trim_saved(self):
+        """Buang record yang sudah di-autosave dari memori (batch file besar)"""
+        count = self.export_cursor
+        if count:
+            del self.data[:count]
+            self.export_cursor = 0
+            self.trimmed_count += count
+        return count
+    
     def get_record_count(self):
         """Get total number of records"""
         return len(self.data)
     
+    def has_data(self):
+        """Ada record yang belum diekspor"""
+        return bool(self.data)
+    
     def get_fields(self):
         """Get all field names"""
         return sorted(list(self.fields))
@@ -97,23 +124,8 @@ class CSVHandler:
                 # Use fields from first record
                 fields_to_write = list(self.data[0].keys())
             
-            # Write CSV file
-            with open(filepath, 'w', newline='', encoding=CSV_ENCODING) as csvfile:
-                # Configure CSV writer
-                writer = csv.DictWriter(
-                    csvfile,
-                    fieldnames=fields_to_write,
-                    delimiter=CSV_DELIMITER,
-                    quoting=eval(CSV_QUOTING)
-                )
-                
-                # Write header and data
-                writer.writeheader()
-                
-                for record in self.data:
-                    # Ensure all fields are present in each record
-                    row = {field: record.get(field, '') for field in fields_to_write}
-                    writer.writerow(row)
+            # Write CSV file (streaming per chunk)
+            export_records_atomic(self.data, filepath, "csv", columns=fields_to_write)
             
             self.current_file = filepath
             record_count = len(self.data)
@@ -136,30 +148,72 @@ class CSVHandler:
             return False, "File not found"
         
         try:
-            with open(filepath, 'r', encoding=CSV_ENCODING) as csvfile:
-                reader = csv.DictReader(csvfile, delimiter=CSV_DELIMITER)
-                
-                loaded_data = []
-                for row in reader:
-                    loaded_data.append(dict(row))
-                
-                # Replace current data with loaded data
-                self.data = loaded_data
-                self.fields = set()
-                for record in self.data:
-                    self.fields.update(record.keys())
-                
-                count = len(self.data)
-                self.current_file = filepath
-                
-                log_info(f"Loaded {count} records from CSV: {filepath}")
-                return True, count
-                
+            reader = IndexedCSVReader(filepath)
+            loaded_data = [dict(row) for row in reader.iter_rows()]
+            
+            # Replace current data with loaded data
+            self.data = loaded_data
+            self.export_cursor = len(loaded_data)  # sudah ada di file
+            self.fields = set(reader.columns or [])
+            
+            count = len(self.data)
+            self.current_file = filepath
+            
+            log_info(f"Loaded {count} records from CSV: {filepath}")
+            return True, count
+            
         except Exception as e:
             error_msg = f"Error loading CSV: {str(e)}"
             log_error(error_msg)
             return False, error_msg
     
+    def open_indexed(self, filepath):
+        """
+        Buka file hasil besar tanpa memuat ke self.data
+        Returns: IndexedCSVReader (get_row, find_by_kpj, iter_rows)
+        """
+        reader = IndexedCSVReader(filepath)
+        reader.ensure_index()
+        return reader
+    
+    def _export_kwargs(self, filepath, fmt):
+        """Argumen exporter: CSV/XLSX diratakan dengan rencana kolom, JSONL apa adanya"""
+        fmt = fmt or detect_format(filepath)
+        if fmt == "jsonl":
+            return {"fmt": fmt}
+        if EXPORT_USE_COLUMN_PLAN:
+            return {"fmt": fmt, "plan": get_default_plan()}
+        return {"fmt": fmt, "columns": self.get_fields()}
+    
+    def export(self, filepath, fmt=None):
+        """
+        Ekspor semua record ke CSV/JSONL/XLSX (format dari ekstensi jika fmt=None)
+        CSV/XLSX diratakan dengan rencana kolom (EXPORT_COLUMN_PLAN)
+        Returns: jumlah record (exception diteruskan ke pemanggil)
+        """
+        count = export_records_atomic(self.data, filepath, **self._export_kwargs(filepath, fmt))
+        self.current_file = filepath
+        return count
+    
+    def export_async(self, filepath, fmt=None, progress=None):
+        """
+        Ekspor di background thread (atomik), UI tetap bisa dipakai
+        progress(ditulis, total) dipanggil dari thread worker
+        Returns: Future (result: jumlah record)
+        """
+        # Snapshot list: record baru selama ekspor tidak ikut/mengganggu iterasi
+        snapshot = list(self.data)
+        future = export_in_background(
+            snapshot, filepath, total=len(snapshot), progress=progress,
+            **self._export_kwargs(filepath, fmt)
+        )
+        self.current_file = filepath
+        return future
+    
+    def export_to_csv(self, filepath):
+        """Ekspor ke CSV, Returns: jumlah record"""
+        return self.export(filepath, "csv")
+    
     def export_to_json(self, filepath=None):
         """Export data to JSON file"""
         if not self.data:
@@ -170,8 +224,14 @@ class CSVHandler:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filepath = os.path.join(DOWNLOAD_FOLDER, f"{CSV_PREFIX}{timestamp}.json")
             
+            # Tulis array JSON per record (tanpa membangun satu string besar)
             with open(filepath, 'w', encoding=CSV_ENCODING) as jsonfile:
-                json.dump(self.data, jsonfile, indent=2, ensure_ascii=False)
+                jsonfile.write("[\n")
+                for index, record in enumerate(self.data):
+                    if index:
+                        jsonfile.write(",\n")
+                    json.dump(record, jsonfile, ensure_ascii=False, default=str)
+                jsonfile.write("\n]\n")
             
             log_info(f"Exported {len(self.data)} records to JSON: {filepath}")
             return True, filepath
@@ -249,6 +309,7 @@ class CSVHandler:
                 duplicates_removed += 1
         
         self.data = list(unique_records.values())
+        self._reset_export_cursor()
         log_info(f"Removed {duplicates_removed} duplicate records")
         return duplicates_removed
     
@@ -259,6 +320,7 @@ class CSVHandler:
         
         try:
             self.data.sort(key=lambda x: x.get(field, ''), reverse=reverse)
+            self._reset_export_cursor()
             log_info(f"Sorted {len(self.data)} records by {field}")
             return True
         except Exception as e:
@@ -289,8 +351,21 @@ class CSVHandler:
             log_error(error_msg)
             return False, error_msg
 
-# Global CSV handler instance
-csv_handler = CSVHandler()
+# Global CSV handler instance (dibuat saat pertama dipakai)
+_csv_handler = None
+
+def get_csv_handler():
+    """Ambil CSV handler global, buat jika belum ada"""
+    global _csv_handler
+    if _csv_handler is None:
+        _csv_handler = CSVHandler()
+    return _csv_handler
+
+def __getattr__(name):
+    # Kompatibilitas untuk `from csv_handler import csv_handler`
+    if name == "csv_handler":
+        return get_csv_handler()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Convenience functions
 def save_csv(data, filename=None):
@@ -305,9 +380,14 @@ def load_csv(filepath):
     return handler.load_from_csv(filepath)
 
 def get_csv_stats(filepath):
-    """Get statistics from CSV file"""
-    handler = CSVHandler()
-    success, result = handler.load_from_csv(filepath)
-    if success:
-        return handler.get_statistics()
-    return {"error": result}
\ No newline at end of file
+    """Get statistics from CSV file (satu kali baca streaming, tanpa memuat semua baris)"""
+    if not os.path.exists(filepath):
+        log_error(f"CSV file not found: {filepath}")
+        return {"error": "File not found"}
+    
+    try:
+        return IndexedCSVReader(filepath).compute_stats()
+    except Exception as e:
+        error_msg = f"Error reading CSV: {str(e)}"
+        log_error(error_msg)
+        return {"error": error_msg}
\ No newline at end of file
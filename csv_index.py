@@ -0,0 +1,346 @@
+"""
+BPJS AUTOMATION - INDEXED CSV READER
+Baca file hasil CSV besar secara streaming, dengan sidecar index offset
+(per nomor baris dan per KPJ) untuk akses acak lewat mmap
+
+Sidecar (.idx): satu baris JSON meta, array offset baris (uint64), lalu tabel KPJ
+terurut berukuran tetap (KPJ di-pad ke key_width + nomor baris uint64) yang
+dicari dengan binary search langsung di mmap; hanya array offset yang dimuat
+"""
+
+import io
+import os
+import csv
+import json
+import mmap
+import struct
+from array import array
+from config import (
+    CSV_ENCODING, CSV_DELIMITER, CSV_INDEX_SUFFIX, CSV_INDEX_SAVE, CSV_INDEX_KEY_FIELD
+)
+from logger import log_info, log_warning
+
+INDEX_VERSION = 2
+
+class IndexedCSVReader:
+    """
+    Reader CSV tanpa memuat seluruh file:
+    - iter_rows(): stream dict per baris
+    - get_row(n) / find_by_kpj(kpj): akses acak via index offset + mmap
+    - compute_stats(): statistik dalam satu kali baca
+    """
+    
+    def __init__(self, filepath, delimiter=CSV_DELIMITER, encoding=CSV_ENCODING,
+                 key_field=CSV_INDEX_KEY_FIELD):
+        self.filepath = filepath
+        self.index_path = filepath + CSV_INDEX_SUFFIX
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.key_field = key_field
+        self.columns = None
+        self.offsets = None  # array('Q'): awal tiap baris data + akhir data
+        self.key_count = 0
+        self._key_record = None  # struct "<{key_width}sQ": KPJ (pad NUL) + nomor baris
+        self._keys = None  # tabel KPJ terurut: mmap sidecar atau bytes (index tidak disimpan)
+        self._keys_start = 0
+        self._file = None
+        self._mmap = None
+        self._index_file = None
+    
+    def read_header(self):
+        if self.columns is None:
+            with open(self.filepath, "r", newline="", encoding=self.encoding) as f:
+                self.columns = next(csv.reader(f, delimiter=self.delimiter), [])
+        return self.columns
+    
+    def iter_rows(self):
+        """Yields: dict per baris (hanya satu baris di memori)"""
+        with open(self.filepath, "r", newline="", encoding=self.encoding) as f:
+            reader = csv.DictReader(f, delimiter=self.delimiter)
+            self.columns = reader.fieldnames or []
+            for row in reader:
+                yield row
+    
+    # ---------------------------------------------
+    # Index offset
+    # ---------------------------------------------
+    
+    def _signature(self):
+        stat = os.stat(self.filepath)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    
+    def ensure_index(self):
+        """Pakai sidecar index jika masih cocok dengan file, jika tidak bangun ulang"""
+        if self.offsets is not None:
+            return
+        if not self._load_index():
+            self.build_index(save=CSV_INDEX_SAVE)
+    
+    def build_index(self, save=True):
+        """
+        Satu kali baca biner: catat offset awal tiap baris data
+        (baris dengan newline di dalam kutip dihitung satu baris)
+        """
+        signature = self._signature()
+        delimiter = self.delimiter.encode(self.encoding)
+        offsets = array("Q")
+        key_pairs = []  # (kpj bytes, nomor baris), hanya selama build
+        
+        with open(self.filepath, "rb") as f:
+            header = f.readline()
+            self.columns = next(csv.reader([header.decode(self.encoding)], delimiter=self.delimiter), [])
+            key_column = self.columns.index(self.key_field) if self.key_field in self.columns else None
+            
+            position = len(header)
+            start = position
+            quotes = 0
+            parts = []
+            for line in f:
+                quotes += line.count(b'"')
+                position += len(line)
+                parts.append(line)
+                if quotes % 2:
+                    continue  # newline di dalam field berkutip
+                
+                record = parts[0] if len(parts) == 1 else b"".join(parts)
+                parts = []
+                quotes = 0
+                if not record.strip():
+                    start = position
+                    continue
+                
+                if key_column is not None:
+                    key = self._extract_key(record, key_column, delimiter)
+                    if key:
+                        key_pairs.append((key.encode(self.encoding), len(offsets)))
+                offsets.append(start)
+                start = position
+            
+            offsets.append(start)  # akhir data (batas baris terakhir)
+        
+        self.offsets = offsets
+        table = self._pack_keys(key_pairs)
+        del key_pairs
+        log_info(f"🗂️ Index CSV: {len(self)} baris, {self.key_count} entri KPJ -> {os.path.basename(self.filepath)}")
+        
+        # Tersimpan: tabel KPJ dibaca ulang lewat mmap sidecar, bukan ditahan di memori
+        if not (save and self._save_index(signature, table) and self._load_index()):
+            self._keys = table
+            self._keys_start = 0
+    
+    def _pack_keys(self, key_pairs):
+        """Urutkan (KPJ, baris) dan pack jadi record berukuran tetap"""
+        key_width = max((len(key) for key, _ in key_pairs), default=0)
+        self._key_record = struct.Struct(f"<{key_width}sQ")
+        key_pairs.sort()
+        table = bytearray(self._key_record.size * len(key_pairs))
+        for position, (key, row) in enumerate(key_pairs):
+            self._key_record.pack_into(table, position * self._key_record.size, key, row)
+        self.key_count = len(key_pairs)
+        return bytes(table)
+    
+    def _extract_key(self, record, key_column, delimiter):
+        if b'"' not in record:
+            fields = record.rstrip(b"\r\n").split(delimiter, key_column + 1)
+            return fields[key_column].decode(self.encoding) if key_column < len(fields) else None
+        fields = self._parse(record)
+        return fields[key_column] if key_column < len(fields) else None
+    
+    def _parse(self, record):
+        return next(csv.reader(io.StringIO(record.decode(self.encoding), newline=""),
+                               delimiter=self.delimiter), [])
+    
+    def _save_index(self, signature, table):
+        """Sidecar: satu baris JSON meta, array offset biner, tabel KPJ. Returns: True jika tersimpan"""
+        meta = dict(signature, version=INDEX_VERSION, columns=self.columns,
+                    key_field=self.key_field, rows=len(self),
+                    key_width=self._key_record.size - 8, key_count=self.key_count)
+        temp_path = self.index_path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(json.dumps(meta, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.offsets.tofile(f)
+                f.write(table)
+            os.replace(temp_path, self.index_path)
+            return True
+        except OSError as e:
+            log_warning(f"Index CSV tidak tersimpan: {str(e)}")
+            return False
+    
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            f = open(self.index_path, "rb")
+        except OSError as e:
+            log_warning(f"Index CSV tidak bisa dibuka: {str(e)}")
+            return False
+        try:
+            meta = json.loads(f.readline().decode("utf-8"))
+            if (meta.get("version") != INDEX_VERSION
+                    or meta.get("key_field") != self.key_field
+                    or {"size": meta.get("size"), "mtime_ns": meta.get("mtime_ns")} != self._signature()):
+                f.close()
+                return False  # file berubah sejak index dibuat
+            
+            offsets = array("Q")
+            offsets.frombytes(f.read(8 * (meta["rows"] + 1)))
+            key_record = struct.Struct(f"<{meta['key_width']}sQ")
+            keys_start = f.tell()
+            if (len(offsets) != meta["rows"] + 1
+                    or os.fstat(f.fileno()).st_size != keys_start + key_record.size * meta["key_count"]):
+                f.close()
+                return False
+            keys = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if meta["key_count"] else b""
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            f.close()
+            log_warning(f"Index CSV rusak, dibangun ulang: {str(e)}")
+            return False
+        
+        self._close_index()
+        self.columns = meta["columns"]
+        self.offsets = offsets
+        self.key_count = meta["key_count"]
+        self._key_record = key_record
+        self._keys = keys
+        self._keys_start = keys_start
+        self._index_file = f
+        return True
+    
+    def _close_index(self):
+        if isinstance(self._keys, mmap.mmap):
+            self._keys.close()
+        self._keys = None
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+    
+    def __len__(self):
+        self.ensure_index()
+        return len(self.offsets) - 1
+    
+    # ---------------------------------------------
+    # Akses acak
+    # ---------------------------------------------
+    
+    def _map(self):
+        if self._mmap is None:
+            self._file = open(self.filepath, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+    
+    def get_row(self, number):
+        """Baris data ke-number (0 = baris pertama setelah header)"""
+        self.ensure_index()
+        if number < 0:
+            number += len(self)
+        if not 0 <= number < len(self):
+            raise IndexError(f"Baris {number} di luar jangkauan ({len(self)} baris)")
+        
+        record = self._map()[self.offsets[number]:self.offsets[number + 1]]
+        return dict(zip(self.columns, self._parse(record)))
+    
+    def get_rows(self, start, stop):
+        """Baris start..stop-1 (untuk halaman tampilan)"""
+        self.ensure_index()
+        return [self.get_row(number) for number in range(max(start, 0), min(stop, len(self)))]
+    
+    def _key_rows(self, kpj):
+        """Nomor baris untuk KPJ: binary search di tabel KPJ terurut"""
+        record = self._key_record
+        width = record.size - 8
+        key = kpj.encode(self.encoding)
+        if not key or len(key) > width:
+            return []
+        key = key.ljust(width, b"\0")  # sama dengan padding struct "s"
+        
+        keys, start, size = self._keys, self._keys_start, record.size
+        low, high = 0, self.key_count
+        while low < high:
+            middle = (low + high) // 2
+            position = start + middle * size
+            if keys[position:position + width] < key:
+                low = middle + 1
+            else:
+                high = middle
+        
+        rows = []
+        while low < self.key_count:
+            stored, row = record.unpack_from(keys, start + low * size)
+            if stored != key:
+                break
+            rows.append(row)
+            low += 1
+        return rows
+    
+    def find_by_kpj(self, kpj):
+        """Semua baris dengan KPJ tersebut, tanpa membaca file lain"""
+        self.ensure_index()
+        return [self.get_row(number) for number in self._key_rows(kpj)]
+    
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = None
+            self._file = None
+        self._close_index()
+        self.offsets = None  # index dimuat ulang (dari sidecar) jika reader dipakai lagi
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    # ---------------------------------------------
+    # Statistik streaming
+    # ---------------------------------------------
+    
+    def compute_stats(self):
+        """
+        Statistik file (format sama dengan CSVHandler.get_statistics)
+        dihitung dalam satu kali baca tanpa menyimpan baris
+        """
+        total = 0
+        status_counts = {}
+        date_counts = {}
+        first_time = last_time = "Unknown"
+        
+        with open(self.filepath, "r", newline="", encoding=self.encoding) as f:
+            reader = csv.reader(f, delimiter=self.delimiter)
+            self.columns = next(reader, [])
+            # Kolom dibaca per posisi (lebih cepat dari DictReader)
+            status_column = self.columns.index('status') if 'status' in self.columns else None
+            time_column = self.columns.index('timestamp') if 'timestamp' in self.columns else None
+            
+            for row in reader:
+                if not row:
+                    continue
+                total += 1
+                status = row[status_column] if status_column is not None and status_column < len(row) else ''
+                status = status or 'Unknown'
+                status_counts[status] = status_counts.get(status, 0) + 1
+                
+                timestamp = row[time_column] if time_column is not None and time_column < len(row) else ''
+                if timestamp:
+                    date = timestamp.split()[0] if ' ' in timestamp else timestamp[:10]
+                    date_counts[date] = date_counts.get(date, 0) + 1
+                if total == 1:
+                    first_time = timestamp or 'Unknown'
+                last_time = timestamp or 'Unknown'
+        
+        if total == 0:
+            return {"total_records": 0}
+        
+        columns = self.columns or []
+        return {
+            "total_records": total,
+            "fields_count": len(columns),
+            "field_names": sorted(columns),
+            "first_record_time": first_time,
+            "last_record_time": last_time,
+            "status_counts": status_counts,
+            "date_counts": date_counts,
+            "file_size": os.path.getsize(self.filepath),
+        }
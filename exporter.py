@@ -0,0 +1,301 @@
+"""
+BPJS AUTOMATION - EXPORT ENGINE
+Ekspor record secara streaming (per chunk) ke CSV, JSON Lines atau XLSX
+(openpyxl write-only) dengan memori konstan
+"""
+
+import csv
+import json
+import os
+import shutil
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from config import CSV_ENCODING, CSV_DELIMITER, CSV_QUOTING, EXPORT_CHUNK_SIZE
+from logger import log_info, log_warning
+
+def _resolve_quoting(value):
+    """"csv.QUOTE_MINIMAL" -> csv.QUOTE_MINIMAL (tanpa eval)"""
+    if isinstance(value, int):
+        return value
+    return getattr(csv, str(value).rsplit(".", 1)[-1], csv.QUOTE_MINIMAL)
+
+# Konfigurasi writer di-resolve sekali saat import
+CSV_DIALECT = {
+    "delimiter": CSV_DELIMITER,
+    "quoting": _resolve_quoting(CSV_QUOTING),
+}
+
+def cell_value(value):
+    """Nilai sel: skalar apa adanya, struktur bersarang sebagai JSON (bukan repr)"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+def iter_chunks(records, chunk_size=EXPORT_CHUNK_SIZE):
+    """Potong iterator record menjadi list berukuran chunk_size"""
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+class ExportWriter(ABC):
+    """Dasar writer: open() -> write_chunk() berulang -> close()"""
+    
+    extension = ""
+    
+    def __init__(self, filepath, columns=None, plan=None):
+        self.filepath = filepath
+        self.plan = plan  # flattener.ColumnPlan (kolom + cara meratakan)
+        if plan is not None:
+            columns = plan.columns
+        self.columns = list(columns) if columns else None
+        self.infer_columns = self.columns is None  # kolom dari key record
+        self.count = 0
+    
+    @abstractmethod
+    def open(self):
+        """Buka file tujuan"""
+    
+    @abstractmethod
+    def write_chunk(self, records):
+        """Tulis satu chunk (list record)"""
+    
+    def close(self):
+        pass
+    
+    def _ensure_columns(self, records):
+        """
+        Kolom dari key record jika columns/plan tidak ditentukan; key yang baru
+        muncul di chunk berikutnya ditambahkan di akhir (tidak dibuang)
+        Returns: True jika kolom bertambah
+        """
+        if not self.infer_columns:
+            return False
+        
+        seen = dict.fromkeys(self.columns or ())
+        known = len(seen)
+        for record in records:
+            for key in record:
+                seen.setdefault(key, None)
+        
+        if self.columns is None or len(seen) > known:
+            self.columns = list(seen)
+            return True
+        return False
+    
+    def _rows(self, records):
+        if self.plan is not None:
+            rows = self.plan.rows
+            for record in records:
+                yield from rows(record)
+            return
+        
+        columns = self.columns
+        for record in records:
+            get = record.get
+            yield [cell_value(get(column, "")) for column in columns]
+
+class CSVExportWriter(ExportWriter):
+    extension = ".csv"
+    
+    def open(self):
+        self._file = open(self.filepath, "w", newline="", encoding=CSV_ENCODING)
+        self._writer = csv.writer(self._file, **CSV_DIALECT)
+        self._header_written = False
+        self._header_end = 0  # posisi byte akhir header
+        self._header_stale = False
+    
+    def write_chunk(self, records):
+        grew = self._ensure_columns(records)
+        if not self._header_written:
+            self._writer.writerow(self.columns)
+            self._file.flush()
+            self._header_end = self._file.buffer.tell()
+            self._header_written = True
+        elif grew:
+            self._header_stale = True
+        self._writer.writerows(self._rows(records))
+        self.count += len(records)
+    
+    def close(self):
+        self._file.close()
+        if self._header_stale:
+            self._rewrite_header()
+    
+    def _rewrite_header(self):
+        """Kolom bertambah setelah header ditulis: ganti header, salin isi apa adanya"""
+        temp_path = f"{self.filepath}.header"
+        with open(self.filepath, "rb") as source, \
+                open(temp_path, "w", newline="", encoding=CSV_ENCODING) as target:
+            csv.writer(target, **CSV_DIALECT).writerow(self.columns)
+            target.flush()
+            source.seek(self._header_end)
+            shutil.copyfileobj(source, target.buffer)
+        os.replace(temp_path, self.filepath)
+
+class JSONLExportWriter(ExportWriter):
+    """Satu record JSON per baris, semua field (kolom opsional)"""
+    
+    extension = ".jsonl"
+    
+    def open(self):
+        self._file = open(self.filepath, "w", encoding=CSV_ENCODING)
+    
+    def write_chunk(self, records):
+        count = len(records)
+        if self.plan is not None:
+            columns = self.columns
+            records = [dict(zip(columns, row)) for row in self._rows(records)]
+        elif self.columns:
+            records = [{column: record.get(column) for column in self.columns} for record in records]
+        dumps = json.dumps
+        self._file.write("".join(
+            dumps(record, ensure_ascii=False, default=str) + "\n" for record in records
+        ))
+        self.count += count
+    
+    def close(self):
+        self._file.close()
+
+class XLSXExportWriter(ExportWriter):
+    """openpyxl write-only: baris langsung di-stream ke file, tidak disimpan di memori"""
+    
+    extension = ".xlsx"
+    
+    def open(self):
+        from openpyxl import Workbook
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("Hasil")
+        self._header_written = False
+    
+    def write_chunk(self, records):
+        self._ensure_columns(records)
+        if not self._header_written:
+            self._sheet.append(self.columns)
+            self._header_size = len(self.columns)
+            self._header_written = True
+        append = self._sheet.append
+        for row in self._rows(records):
+            append(row)
+        self.count += len(records)
+    
+    def close(self):
+        # Header write-only tidak bisa diubah: kolom yang muncul belakangan tanpa judul
+        if self._header_written and len(self.columns) > self._header_size:
+            log_warning(f"XLSX: kolom tanpa header: {', '.join(self.columns[self._header_size:])}")
+        self._workbook.save(self.filepath)
+
+# Registry writer per format (tambah format baru lewat register_writer)
+WRITERS = {
+    "csv": CSVExportWriter,
+    "jsonl": JSONLExportWriter,
+    "xlsx": XLSXExportWriter,
+}
+
+def register_writer(fmt, writer_class):
+    WRITERS[fmt] = writer_class
+
+def detect_format(filepath):
+    """Format dari ekstensi file (default csv)"""
+    extension = os.path.splitext(filepath)[1].lower().lstrip(".")
+    return extension if extension in WRITERS else "csv"
+
+def export_records(records, filepath, fmt=None, columns=None, chunk_size=EXPORT_CHUNK_SIZE,
+                   plan=None, progress=None):
+    """
+    Tulis record (iterator apa pun) ke file per chunk
+    columns: urutan kolom CSV/XLSX (default: gabungan key semua record, urut kemunculan)
+    plan: flattener.ColumnPlan, menggantikan columns (hasil bersarang jadi kolom datar)
+    progress: progress(jumlah_ditulis) dipanggil setiap chunk
+    Returns: jumlah record yang ditulis
+    """
+    fmt = fmt or detect_format(filepath)
+    if fmt not in WRITERS:
+        raise ValueError(f"Format ekspor tidak didukung: {fmt}")
+    
+    count = _write_records(records, filepath, fmt, columns, chunk_size, plan, progress)
+    _log_export(fmt, count, filepath)
+    return count
+
+def _write_records(records, filepath, fmt, columns, chunk_size, plan, progress):
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    writer = WRITERS[fmt](filepath, columns, plan)
+    writer.open()
+    try:
+        for chunk in iter_chunks(records, chunk_size):
+            writer.write_chunk(chunk)
+            if progress:
+                progress(writer.count)
+    finally:
+        writer.close()
+    return writer.count
+
+def _log_export(fmt, count, filepath):
+    if count == 0:
+        log_warning(f"Ekspor kosong: {filepath}")
+    log_info(f"💾 Ekspor {fmt.upper()}: {count} record -> {filepath}")
+
+def export_records_atomic(records, filepath, fmt=None, columns=None, chunk_size=EXPORT_CHUNK_SIZE,
+                          plan=None, progress=None):
+    """
+    Seperti export_records, tapi tulis ke file sementara lalu rename:
+    crash di tengah jalan tidak meninggalkan file terpotong
+    """
+    fmt = fmt or detect_format(filepath)
+    if fmt not in WRITERS:
+        raise ValueError(f"Format ekspor tidak didukung: {fmt}")
+    
+    directory, filename = os.path.split(filepath)
+    temp_path = os.path.join(directory, f".{filename}.tmp")
+    
+    try:
+        count = _write_records(records, temp_path, fmt, columns, chunk_size, plan, progress)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    _log_export(fmt, count, filepath)
+    return count
+
+class ExportWorker:
+    """Satu thread ekspor di background (antrian job berurutan)"""
+    
+    def __init__(self):
+        self._executor = None
+    
+    def submit(self, records, filepath, fmt=None, total=None, progress=None, **kwargs):
+        """
+        Jadwalkan ekspor atomik
+        progress(ditulis, total) dipanggil dari thread worker
+        Returns: Future (result: jumlah record, exception jika gagal)
+        """
+        chunk_progress = None
+        if progress:
+            chunk_progress = lambda written: progress(written, total)
+        
+        return self.run(export_records_atomic, records, filepath, fmt, progress=chunk_progress, **kwargs)
+    
+    def run(self, fn, *args, **kwargs):
+        """Jalankan fungsi apa pun di thread ekspor (urut dengan job lain)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+        return self._executor.submit(fn, *args, **kwargs)
+    
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+# Global export worker (thread dibuat saat job pertama)
+export_worker = ExportWorker()
+
+def export_in_background(records, filepath, fmt=None, total=None, progress=None, **kwargs):
+    return export_worker.submit(records, filepath, fmt, total, progress, **kwargs)
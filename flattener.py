@@ -0,0 +1,129 @@
+"""
+BPJS AUTOMATION - RESULT FLATTENER
+Ratakan hasil bersarang (data.tables[].rows[].cells[], containers, batch_summary)
+menjadi kolom spreadsheet dengan rencana kolom yang dikompilasi sekali
+"""
+
+import json
+from config import EXPORT_COLUMN_PLAN, EXPORT_EXPLODE_PATH, EXPORT_JOIN_SEPARATOR
+
+_MISSING = object()
+
+def compile_path(path):
+    """
+    "data.tables[].rows[].cells[].text" -> fungsi record -> nilai
+    Segmen berakhiran [] meratakan list; hasilnya list nilai (None dibuang)
+    """
+    steps = []
+    for segment in path.split("."):
+        if segment.endswith("[]"):
+            steps.append((segment[:-2], True))
+        else:
+            steps.append((segment, False))
+    
+    if not any(is_list for _, is_list in steps):
+        keys = tuple(key for key, _ in steps)
+        
+        def get_scalar(record):
+            value = record
+            for key in keys:
+                if not isinstance(value, dict):
+                    return None
+                value = value.get(key)
+                if value is None:
+                    return None
+            return value
+        return get_scalar
+    
+    def get_list(record):
+        values = [record]
+        for key, is_list in steps:
+            next_values = []
+            for value in values:
+                if not isinstance(value, dict):
+                    continue
+                item = value.get(key, _MISSING) if key else value
+                if item is _MISSING or item is None:
+                    continue
+                if is_list and isinstance(item, list):
+                    next_values.extend(item)
+                else:
+                    next_values.append(item)
+            values = next_values
+        return values
+    return get_list
+
+def _format_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def _compile_mode(mode, separator):
+    """Fungsi pengubah nilai per mode kolom"""
+    if mode == "json":
+        return lambda value: None if value is None else json.dumps(value, ensure_ascii=False, default=str)
+    if mode == "join":
+        return lambda value: separator.join(str(v) for v in _as_list(value) if v not in (None, "")) or None
+    if mode == "count":
+        return lambda value: len(_as_list(value))
+    return _format_value
+
+class ColumnPlan:
+    """
+    Rencana kolom: [(nama_kolom, path, mode)], mode: value | json | join | count
+    explode: path list (mis. "data.tables[].rows[]") -> satu baris per elemen;
+    path kolom berawalan "@." dibaca dari elemen tersebut
+    """
+    
+    def __init__(self, spec=EXPORT_COLUMN_PLAN, explode=EXPORT_EXPLODE_PATH,
+                 separator=EXPORT_JOIN_SEPARATOR):
+        self.columns = [name for name, _, _ in spec]
+        self._explode = compile_path(explode) if explode else None
+        self._record_getters = []
+        self._element_getters = []
+        
+        for index, (_, path, mode) in enumerate(spec):
+            formatter = _compile_mode(mode, separator)
+            if path.startswith("@."):
+                self._element_getters.append((index, compile_path(path[2:]), formatter))
+            else:
+                self._record_getters.append((index, compile_path(path), formatter))
+    
+    def rows(self, record):
+        """Yields: list nilai sesuai self.columns (lebih dari satu jika explode)"""
+        base = [None] * len(self.columns)
+        for index, getter, formatter in self._record_getters:
+            base[index] = formatter(getter(record))
+        
+        if self._explode is None:
+            yield base
+            return
+        
+        elements = self._explode(record)
+        if not elements:
+            yield base
+            return
+        
+        for element in elements:
+            row = base[:]
+            for index, getter, formatter in self._element_getters:
+                row[index] = formatter(getter(element))
+            yield row
+    
+    def flatten(self, record):
+        """Satu record -> list dict kolom datar"""
+        return [dict(zip(self.columns, row)) for row in self.rows(record)]
+
+# Rencana default dari config (dikompilasi saat pertama dipakai)
+_default_plan = None
+
+def get_default_plan():
+    global _default_plan
+    if _default_plan is None:
+        _default_plan = ColumnPlan()
+    return _default_plan
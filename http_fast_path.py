@@ -0,0 +1,328 @@
+"""
+BPJS AUTOMATION - HTTP FAST PATH
+Cari KPJ lewat HTTP langsung (cookie sesi dari WebView, koneksi keep-alive)
+dan parse tabel hasil di Python. None = pakai alur WebView biasa.
+
+Uji lokal: python http_fast_path.py --stand-in
+"""
+
+import sys
+import time
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+from config import (
+    HTTP_FAST_PATH_ENABLED, HTTP_POOL_SIZE, HTTP_RATE_LIMIT,
+    HTTP_FAST_PATH_FORMS, REQUEST_TIMEOUT
+)
+from logger import log_info, log_error, log_warning
+from session_monitor import session_monitor
+
+MAX_ROWS_PER_TABLE = 20  # sama dengan ekstraksi JS di WebView
+
+class HostRateLimiter:
+    """Batas request per detik per host"""
+    
+    def __init__(self, rate=HTTP_RATE_LIMIT):
+        self.min_interval = 1.0 / rate if rate > 0 else 0
+        self.next_allowed = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, host):
+        """Blok sampai host boleh di-request lagi"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_allowed.get(host, now))
+            self.next_allowed[host] = slot + self.min_interval
+        
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+class ResultTableParser(HTMLParser):
+    """Ambil tabel dan judul halaman, struktur sama dengan hasil ekstraksi JS"""
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tables = []
+        self.page_title = ""
+        self._table_stack = []
+        self._row = None
+        self._cell = None
+        self._title_tag = None
+        self._title_parts = []
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._table_stack.append([])
+        elif tag == "tr" and self._table_stack:
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            attributes = dict(attrs)
+            self._cell = {
+                "text": [],
+                "className": attributes.get("class") or "",
+                "colSpan": int(attributes.get("colspan") or 1),
+                "rowSpan": int(attributes.get("rowspan") or 1)
+            }
+        elif tag in ("h1", "h2", "title") and not self.page_title and self._title_tag is None:
+            self._title_tag = tag
+            self._title_parts = []
+    
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._cell is not None:
+            self._cell["text"] = " ".join("".join(self._cell["text"]).split())
+            self._row.append(self._cell)
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            rows = self._table_stack[-1]
+            if self._row and len(rows) < MAX_ROWS_PER_TABLE:
+                rows.append({"rowIndex": len(rows), "cells": self._row, "cellCount": len(self._row)})
+            self._row = None
+        elif tag == "table" and self._table_stack:
+            rows = self._table_stack.pop()
+            if rows:
+                self.tables.append({"tableIndex": len(self.tables), "rows": rows, "totalRows": len(rows)})
+        elif tag == self._title_tag:
+            self.page_title = " ".join("".join(self._title_parts).split())
+            self._title_tag = None
+    
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell["text"].append(data)
+        if self._title_tag is not None:
+            self._title_parts.append(data)
+
+def parse_result_html(html, url):
+    """
+    Parse HTML hasil pencarian
+    Returns: dict dengan format hasil ekstraksi WebView
+    """
+    parser = ResultTableParser()
+    parser.feed(html)
+    parser.close()
+    
+    return {
+        "success": True,
+        "source": "http",
+        "tablesFound": len(parser.tables),
+        "containersFound": 0,
+        "pageTitle": parser.page_title,
+        "url": url,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "tables": parser.tables,
+        "containers": []
+    }
+
+class HttpFastPath:
+    """Pencarian KPJ via requests.Session yang memakai cookie login WebView"""
+    
+    def __init__(self, cookie_provider=None, user_agent=None, forms=None,
+                 pool_size=HTTP_POOL_SIZE, rate=HTTP_RATE_LIMIT):
+        self.enabled = HTTP_FAST_PATH_ENABLED
+        self.cookie_provider = cookie_provider  # cookie_provider(url) -> "a=1; b=2"
+        self.user_agent = user_agent
+        self.forms = forms if forms is not None else HTTP_FAST_PATH_FORMS
+        self.pool_size = pool_size
+        self.rate_limiter = HostRateLimiter(rate)
+        self.session = None
+        self.stats = {"attempts": 0, "hits": 0, "fallbacks": {}}
+        self._lock = threading.Lock()
+    
+    def supports(self, portal):
+        form = self.forms.get(portal)
+        return bool(self.enabled and form and form.get("search_url"))
+    
+    def _get_session(self):
+        """requests.Session dengan pool keep-alive terbatas (import saat pertama dipakai)"""
+        if self.session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=len(self.forms) or 1,
+                pool_maxsize=self.pool_size,
+                pool_block=True,
+                max_retries=0
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self.session = session
+        return self.session
+    
+    def _sync_cookies(self, session, url):
+        """Salin cookie login dari cookie store WebView ke session"""
+        if not self.cookie_provider:
+            return
+        
+        cookie_header = self.cookie_provider(url)
+        if not cookie_header:
+            return
+        
+        host = urlsplit(url).hostname
+        for pair in cookie_header.split(";"):
+            name, sep, value = pair.strip().partition("=")
+            if sep and name:
+                session.cookies.set(name, value, domain=host)
+    
+    def _fallback(self, kpj, reason):
+        with self._lock:
+            fallbacks = self.stats["fallbacks"]
+            fallbacks[reason] = fallbacks.get(reason, 0) + 1
+        log_info(f"↩️ Fast path KPJ {kpj} dilewati ({reason}), pakai WebView")
+        return None
+    
+    def search(self, portal, kpj):
+        """
+        Cari KPJ langsung via HTTP
+        Returns: dict hasil (format ekstraksi WebView) or None untuk fallback
+        """
+        if not self.supports(portal):
+            return None
+        
+        form = self.forms[portal]
+        url = form["search_url"]
+        fields = dict(form.get("extra_fields") or {})
+        fields[form["kpj_field"]] = kpj
+        
+        with self._lock:
+            self.stats["attempts"] += 1
+        
+        try:
+            session = self._get_session()
+            self._sync_cookies(session, url)
+            headers = {"User-Agent": self.user_agent} if self.user_agent else {}
+            
+            self.rate_limiter.acquire(urlsplit(url).hostname)
+            if form.get("method", "POST").upper() == "GET":
+                response = session.get(url, params=fields, headers=headers, timeout=REQUEST_TIMEOUT)
+            else:
+                response = session.post(url, data=fields, headers=headers, timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            log_warning(f"Fast path request error: {str(e)}")
+            return self._fallback(kpj, "request_error")
+        
+        # Setiap ketidaksesuaian -> WebView (yang juga menangani deteksi sesi habis)
+        if response.status_code != 200:
+            return self._fallback(kpj, f"http_{response.status_code}")
+        if session_monitor.check_url(response.url):
+            return self._fallback(kpj, "login_redirect")
+        
+        html = response.text
+        marker = form.get("result_marker")
+        if marker and marker not in html:
+            return self._fallback(kpj, "marker_missing")
+        if session_monitor.check_text(html):
+            return self._fallback(kpj, "session_text")
+        
+        try:
+            data = parse_result_html(html, response.url)
+        except Exception as e:
+            log_error(f"Fast path parse error: {str(e)}")
+            return self._fallback(kpj, "parse_error")
+        
+        if not data["tablesFound"]:
+            return self._fallback(kpj, "no_tables")
+        
+        with self._lock:
+            self.stats["hits"] += 1
+        log_info(f"⚡ Fast path KPJ {kpj}: {data['tablesFound']} tabel")
+        return data
+    
+    def get_stats(self):
+        with self._lock:
+            stats = self.stats.copy()
+            stats["fallbacks"] = dict(self.stats["fallbacks"])
+        return stats
+    
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+# Global fast path instance (cookie_provider dipasang oleh automation)
+http_fast_path = HttpFastPath()
+
+def serve_stand_in(port=0):
+    """
+    Server lokal pengganti portal untuk uji fast path
+    POST/GET kpj=... atau nik=... -> tabel hasil (dengan NIK untuk stage DPT),
+    nilai berakhiran 0 -> redirect ke /login
+    Returns: (server, search_url) - panggil server.shutdown() setelah selesai
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    from urllib.parse import parse_qs
+    
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def _respond(self, status, body, location=None):
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            if location:
+                self.send_header("Location", location)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def _search(self, query):
+            fields = parse_qs(query)
+            kpj = (fields.get("kpj") or fields.get("nik") or [""])[0]
+            if "session=ok" not in (self.headers.get("Cookie") or ""):
+                return self._respond(302, "", "/login")
+            if kpj.endswith("0"):
+                return self._respond(302, "", "/login")
+            nik = "3171" + kpj[-12:].zfill(12)
+            self._respond(200, (
+                "<html><head><title>Hasil</title></head><body><h1>Hasil Pencarian</h1>"
+                "<table><tr><th>KPJ</th><th>Nama</th><th>NIK</th></tr>"
+                f"<tr><td>{kpj}</td><td class='nama'>PESERTA {kpj[-4:]}</td><td>{nik}</td></tr></table>"
+                "</body></html>"
+            ))
+        
+        def do_GET(self):
+            if self.path.startswith("/login"):
+                return self._respond(200, "<html><body>Silakan login</body></html>")
+            self._search(urlsplit(self.path).query)
+        
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self._search(self.rfile.read(length).decode("utf-8"))
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/search"
+
+def main(argv=None):
+    """Jalankan fast path terhadap server stand-in lokal"""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--stand-in" not in argv:
+        print("Usage: python http_fast_path.py --stand-in")
+        return 2
+    
+    server, search_url = serve_stand_in()
+    fast_path = HttpFastPath(
+        cookie_provider=lambda url: "session=ok",
+        forms={"sipp": {"search_url": search_url, "method": "POST",
+                        "kpj_field": "kpj", "extra_fields": {}, "result_marker": "<table"}}
+    )
+    fast_path.enabled = True
+    
+    try:
+        for kpj in ("12033062238", "12033062231", "12033062230"):
+            data = fast_path.search("sipp", kpj)
+            rows = data["tables"][0]["rows"] if data else None
+            print(f"{kpj}: {'fallback' if data is None else rows[-1]['cells'][1]['text']}")
+        print(fast_path.get_stats())
+    finally:
+        fast_path.close()
+        server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+BPJS AUTOMATION - IMPORT TIME BUDGET
+Laporan biaya import per modul (setara `python -X importtime`) tanpa Kivy:
+kivy/jnius/android diganti modul kosong di interpreter yang diukur, jadi
+ui_components, ui_builder dan main tetap terukur (biaya Kivy sendiri tidak dihitung)
+
+Jalankan: python import_budget.py [modul ...]
+"""
+
+import os
+import sys
+import subprocess
+from config import IMPORT_TIME_BUDGET_MS, IMPORT_REPORT_TOP_N
+
+# Modul aplikasi yang diukur secara default (urut dari yang paling dasar)
+APP_MODULES = [
+    "config", "logger", "validator", "rate_estimator", "exporter", "csv_handler",
+    "profiler", "memory_monitor", "kpj_importer", "autosave", "automation",
+    "batch_scheduler", "worker_service",
+    "ui_components", "ui_builder", "main",
+]
+
+# Modul platform yang tidak diukur (tidak ada di luar device/tanpa Kivy)
+STUBBED_PACKAGES = ["kivy", "jnius", "android"]
+
+# Dijalankan sebelum import modul: modul kosong untuk STUBBED_PACKAGES
+# (atribut apa pun = kelas kosong, cukup untuk subclass/dekorator saat import)
+_STUB_PRELUDE = """
+import sys, types, importlib.abc, importlib.machinery
+class _Stub:
+    def __init__(self, *args, **kwargs): pass
+    def __call__(self, *args, **kwargs): return self
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return type(name, (_Stub,), {})
+class _StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def find_spec(self, fullname, path, target=None):
+        if fullname.split(".")[0] in %r:
+            return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+    def create_module(self, spec):
+        return _StubModule(spec.name)
+    def exec_module(self, module):
+        module.__path__ = []
+sys.meta_path.insert(0, _StubFinder())
+"""
+
+# Library berat yang seharusnya TIDAK ikut ter-import saat startup
+HEAVY_MODULES = ["pandas", "selenium", "openpyxl", "bs4", "requests", "numpy"]
+
+def measure_module(module_name):
+    """
+    Import modul di interpreter baru dengan -X importtime
+    Returns: (success, entries or error_message)
+    entries: list of {"module", "self_us", "cumulative_us", "depth"}
+    """
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c",
+             _STUB_PRELUDE % (STUBBED_PACKAGES,) + f"import {module_name}"],
+            cwd=app_dir,
+            capture_output=True,
+            text=True,
+            timeout=120
+        )
+    except Exception as e:
+        return False, str(e)
+    
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        
+        # Format: "import time:  self_us | cumulative_us | <indent>module"
+        try:
+            self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+            name = name.rstrip()[1:]
+            entries.append({
+                "module": name.strip(),
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": (len(name) - len(name.lstrip())) // 2
+            })
+        except ValueError:
+            continue
+    
+    if proc.returncode != 0:
+        last_line = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "Unknown error"
+        return False, last_line
+    
+    return True, entries
+
+def build_report(modules=None, top_n=IMPORT_REPORT_TOP_N):
+    """Ukur setiap modul aplikasi dan kumpulkan hasilnya"""
+    modules = modules or APP_MODULES
+    report = {"modules": [], "budget_ms": IMPORT_TIME_BUDGET_MS}
+    
+    for module_name in modules:
+        success, result = measure_module(module_name)
+        if not success:
+            report["modules"].append({"module": module_name, "error": result})
+            continue
+        
+        # Import anak dicetak sebelum induknya; ambil subtree milik modul ini
+        # saja (tanpa import startup interpreter seperti site/encodings)
+        root_index = max(i for i, e in enumerate(result) if e["module"] == module_name and e["depth"] == 0)
+        start_index = root_index
+        while start_index > 0 and result[start_index - 1]["depth"] > 0:
+            start_index -= 1
+        subtree = result[start_index:root_index + 1]
+        
+        cumulative_ms = result[root_index]["cumulative_us"] / 1000
+        imported = {e["module"].split(".")[0] for e in subtree}
+        
+        report["modules"].append({
+            "module": module_name,
+            "cumulative_ms": round(cumulative_ms, 1),
+            "heavy_imports": sorted(imported.intersection(HEAVY_MODULES)),
+            "slowest": sorted(subtree, key=lambda e: e["self_us"], reverse=True)[:top_n]
+        })
+    
+    return report
+
+def print_report(report):
+    """
+    Cetak laporan ke stdout
+    Returns: True jika semua modul ter-import dan dalam budget
+    """
+    budget_ms = report["budget_ms"]
+    within_budget = True
+    
+    print("=" * 60)
+    print(f"IMPORT TIME REPORT (budget {budget_ms} ms per modul)")
+    print("=" * 60)
+    
+    for item in report["modules"]:
+        # Modul yang gagal di-import tidak terukur: dihitung gagal
+        if "error" in item:
+            within_budget = False
+            print(f"\n❌ {item['module']}: gagal import - {item['error']}")
+            continue
+        
+        over = item["cumulative_ms"] > budget_ms
+        within_budget = within_budget and not over
+        marker = "❌" if over else "✅"
+        print(f"\n{marker} {item['module']}: {item['cumulative_ms']:.1f} ms")
+        
+        if item["heavy_imports"]:
+            within_budget = False
+            print(f"   ❌ Library berat ikut ter-import: {', '.join(item['heavy_imports'])}")
+        
+        for entry in item["slowest"]:
+            print(f"   {entry['self_us'] / 1000:8.1f} ms  {entry['module']}")
+    
+    print("\n" + "=" * 60)
+    return within_budget
+
+def main():
+    modules = sys.argv[1:] or None
+    report = build_report(modules)
+    ok = print_report(report)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+BPJS AUTOMATION - KPJ FILE IMPORTER
+Baca daftar KPJ dari file TXT/CSV/XLSX secara streaming (memori konstan)
+"""
+
+import csv
+import os
+from config import CSV_ENCODING, CSV_DELIMITER, KPJ_IMPORT_COLUMN
+from logger import log_info, log_error, log_warning
+from validator import KPJ_PATTERN
+
+SUPPORTED_EXTENSIONS = (".txt", ".csv", ".xlsx")
+
+class KPJFileImporter:
+    """Importer KPJ lazy dari file"""
+    
+    def __init__(self, filepath, dedupe=True, column=KPJ_IMPORT_COLUMN):
+        self.filepath = filepath
+        self.dedupe = dedupe
+        self.column = column
+        self.extension = os.path.splitext(filepath)[1].lower()
+        self.stats = {
+            "rows_read": 0,
+            "valid": 0,
+            "invalid": 0,
+            "duplicates": 0
+        }
+    
+    def size_hint(self):
+        """
+        Perkiraan jumlah baris tanpa memuat file ke memori
+        Returns: int or None
+        """
+        try:
+            if self.extension == ".xlsx":
+                from openpyxl import load_workbook
+                workbook = load_workbook(self.filepath, read_only=True)
+                try:
+                    max_row = workbook.active.max_row
+                finally:
+                    workbook.close()
+                return max(max_row - 1, 0) if max_row else None
+            
+            # TXT/CSV: hitung newline per blok
+            count = 0
+            with open(self.filepath, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    count += block.count(b"\n")
+            if self.extension == ".csv":
+                count -= 1  # header
+            return max(count, 0)
+        
+        except Exception as e:
+            log_warning(f"Tidak bisa hitung baris {self.filepath}: {str(e)}")
+            return None
+    
+    def __iter__(self):
+        """Yields: KPJ valid (dan unik jika dedupe=True)"""
+        if self.extension not in SUPPORTED_EXTENSIONS:
+            raise ValueError(f"Format file tidak didukung: {self.extension}")
+        
+        if self.extension == ".txt":
+            raw_values = self._iter_txt()
+        elif self.extension == ".csv":
+            raw_values = self._iter_csv()
+        else:
+            raw_values = self._iter_xlsx()
+        
+        seen = set() if self.dedupe else None
+        fullmatch = KPJ_PATTERN.fullmatch
+        
+        for value in raw_values:
+            self.stats["rows_read"] += 1
+            kpj = str(value).strip() if value is not None else ""
+            
+            if not kpj or not fullmatch(kpj):
+                if kpj:
+                    self.stats["invalid"] += 1
+                continue
+            
+            if seen is not None:
+                if kpj in seen:
+                    self.stats["duplicates"] += 1
+                    continue
+                seen.add(kpj)
+            
+            self.stats["valid"] += 1
+            yield kpj
+        
+        log_info(
+            f"📥 Import {os.path.basename(self.filepath)}: {self.stats['valid']} valid, "
+            f"{self.stats['invalid']} tidak valid, {self.stats['duplicates']} duplikat"
+        )
+    
+    def _iter_txt(self):
+        """
+        KPJ di mana saja dalam file (biasanya satu per baris), dicari lewat mmap
+        tanpa decode per baris; dedupe tetap di __iter__ agar statistik terhitung
+        """
+        from kpj_scanner import scan_file
+        for kpj, _ in scan_file(self.filepath, dedupe=False):
+            yield kpj
+    
+    def _iter_csv(self):
+        """Kolom KPJ dari header, atau kolom pertama"""
+        with open(self.filepath, "r", encoding=CSV_ENCODING, errors="replace", newline="") as f:
+            reader = csv.reader(f, delimiter=CSV_DELIMITER)
+            header = next(reader, None)
+            if header is None:
+                return
+            
+            column_index = self._find_column(header)
+            if column_index is None:
+                # Tidak ada header KPJ: baris pertama juga data
+                column_index = 0
+                if header:
+                    yield header[0]
+            
+            for row in reader:
+                if len(row) > column_index:
+                    yield row[column_index]
+    
+    def _iter_xlsx(self):
+        """Sheet aktif dibaca dengan openpyxl read-only (streaming)"""
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            log_error("❌ openpyxl tidak terinstall, import XLSX tidak tersedia")
+            raise
+        
+        workbook = load_workbook(self.filepath, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            
+            header_text = ["" if cell is None else str(cell) for cell in header]
+            column_index = self._find_column(header_text)
+            if column_index is None:
+                column_index = 0
+                yield self._xlsx_value(header[0] if header else None)
+            
+            for row in rows:
+                if len(row) > column_index:
+                    yield self._xlsx_value(row[column_index])
+        finally:
+            workbook.close()
+    
+    def _xlsx_value(self, value):
+        # Excel sering menyimpan KPJ sebagai angka (12033062238.0)
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return value
+    
+    def _find_column(self, header):
+        """Index kolom KPJ di header (case-insensitive), None jika tidak ada"""
+        target = self.column.lower()
+        for index, name in enumerate(header):
+            if name and name.strip().lower() == target:
+                return index
+        return None
+
+def open_kpj_file(filepath, dedupe=True):
+    """
+    Siapkan importer untuk file KPJ
+    Returns: (importer, size_hint)
+    """
+    importer = KPJFileImporter(filepath, dedupe=dedupe)
+    return importer, importer.size_hint()
@@ -0,0 +1,58 @@
+"""
+BPJS AUTOMATION - KPJ SCANNER
+Cari KPJ di file/ekspor besar dengan memory-mapping, satu kali lewat
+(dipakai import TXT di kpj_importer dan extract_kpj_from_text di validator)
+"""
+
+import mmap
+import os
+import re
+from logger import log_info, log_warning
+from validator import KPJ_SCAN_PATTERN
+
+# Versi bytes dari pola scan (dipakai untuk mmap/bytes)
+KPJ_SCAN_PATTERN_BYTES = re.compile(KPJ_SCAN_PATTERN.pattern.encode("ascii"))
+
+def scan_buffer(buffer, dedupe=True):
+    """
+    Scan buffer in-memory (str, bytes, bytearray, memoryview, mmap)
+    Yields: (kpj, offset) - offset dalam byte untuk buffer bytes,
+    dalam karakter untuk str
+    """
+    pattern = KPJ_SCAN_PATTERN if isinstance(buffer, str) else KPJ_SCAN_PATTERN_BYTES
+    seen = set() if dedupe else None
+    
+    for match in pattern.finditer(buffer):
+        kpj = match.group()
+        if not isinstance(kpj, str):
+            kpj = kpj.decode("ascii")
+        
+        if seen is not None:
+            if kpj in seen:
+                continue
+            seen.add(kpj)
+        
+        yield kpj, match.start()
+
+def scan_file(filepath, dedupe=True):
+    """
+    Scan file (bisa ratusan MB) lewat mmap tanpa memuatnya ke memori
+    Yields: (kpj, byte_offset)
+    """
+    size = os.path.getsize(filepath)
+    if size == 0:
+        log_warning(f"File kosong: {filepath}")
+        return
+    
+    found = 0
+    with open(filepath, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # Akses baca berurutan: beri tahu kernel agar read-ahead agresif
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            
+            for kpj, offset in scan_buffer(mapped, dedupe=dedupe):
+                found += 1
+                yield kpj, offset
+    
+    log_info(f"🔎 Scan {os.path.basename(filepath)} ({size / 1024 / 1024:.1f} MB): {found} KPJ ditemukan")
@@ -16,9 +16,14 @@ class Logger:
         self.log_to_console = log_to_console
         self.log_entries = []
         
-        # Create log folder if it doesn't exist
-        if log_to_file:
+        # Log folder dibuat saat tulis pertama, bukan saat import
+        self._folder_ready = False
+    
+    def _ensure_folder(self):
+        """Create log folder if it doesn't exist"""
+        if not self._folder_ready:
             os.makedirs(LOG_FOLDER, exist_ok=True)
+            self._folder_ready = True
     
     def _get_timestamp(self):
         """Get current timestamp for logging"""
@@ -32,6 +37,8 @@ class Logger:
     def _write_to_file(self, formatted_message):
         """Write log message to file"""
         try:
+            self._ensure_folder()
+            
             # Daily log file
             date_str = datetime.now().strftime("%Y%m%d")
             log_file = os.path.join(LOG_FOLDER, f"bpjs_log_{date_str}.txt")
@@ -137,6 +144,7 @@ class Logger:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"bpjs_logs_export_{timestamp}.txt"
             
+            self._ensure_folder()
             filepath = os.path.join(LOG_FOLDER, filename)
             
             with open(filepath, "w", encoding="utf-8") as f:
@@ -3,6 +3,9 @@ BPJS REAL AUTOMATION - APLIKASI UTAMA
 Aplikasi utama untuk otomatisasi REAL setelah login manual
 """
 
+import time
+_STARTUP_T0 = time.perf_counter()  # Titik awal pengukuran waktu startup
+
 import kivy
 kivy.require('2.1.0')
 
@@ -12,15 +15,22 @@ from kivy.core.window import Window
 from kivy.metrics import dp
 import csv
 import os
+import sys
+import threading
 import traceback
 from datetime import datetime
 
 # Impor modul kita
-from config import APP_NAME, SIPP_URL, DPT_URL, LAPAK_URL, CSV_FOLDER
+from config import (
+    APP_NAME, SIPP_URL, DPT_URL, LAPAK_URL, CSV_FOLDER, DOWNLOAD_FOLDER,
+    AUTOSAVE_ENABLED, AUTOSAVE_INTERVAL, LIVE_STATS_INTERVAL, WORKER_MODE_ENABLED,
+    SCHEDULER_ENABLED, SCHEDULER_DEFAULT_PRIORITY, SCHEDULER_PRIORITY_DEADLINES
+)
 from logger import log_info, log_error, log_warning
-from validator import validate_kpj_list
-from csv_handler import csv_handler
-from automation import process_kpj_list, get_engine_stats, reset_engine
+from validator import validate_kpj_bulk
+from rate_estimator import format_duration
+# Engine, CSV handler, scheduler, worker, exporter dll. diimpor saat pertama dipakai
+# (startup hanya butuh UI; lihat python import_budget.py)
 
 # Impor UI builder
 try:
@@ -39,7 +49,8 @@ class BPJSRealAutomationApp(App):
         # Status pemrosesan
         self.is_processing = False
         self.current_batch = []
-        self.results = []
+        self.success_count = 0
+        self.processed_count = 0
         self.current_index = 0
         self.total_kpj = 0
         
@@ -55,6 +66,25 @@ class BPJSRealAutomationApp(App):
         
         # Untuk debouncing progress update
         self._progress_update_scheduled = None
+        self._live_stats_event = None
+        
+        # Batch dari file: hasil ditulis ke part autosave dan dibuang dari memori
+        self._file_run = False
+        self._run_autosave_event = None
+        
+        # Autosave inkremental (hanya record baru sejak simpan terakhir), dibuat di batch pertama
+        self.autosaver = None
+        
+        # Antrian multi-batch: batch baru bergiliran dengan batch yang sedang jalan
+        self.scheduler = None
+        
+        # Thread batch tanpa scheduler; reset engine saat stop ditunda sampai thread selesai
+        self._batch_thread = None
+        self._reset_after_drain = False
+        
+        # Worker terpisah (WORKER_MODE_ENABLED): app hanya sebagai client
+        self.worker_client = None
+        self._worker_stats = None
         
         # Batas maksimum baris log
         self.MAX_LOG_LINES = 1000
@@ -72,6 +102,56 @@ class BPJSRealAutomationApp(App):
         # Bangun dengan UIBuilder
         return UIBuilder.build_main_ui(self)
     
+    def get_autosaver(self):
+        """Autosaver untuk CSV handler (dibuat saat batch pertama)"""
+        if self.autosaver is None:
+            from csv_handler import get_csv_handler
+            from autosave import IncrementalAutosaver
+            self.autosaver = IncrementalAutosaver(get_csv_handler())
+        return self.autosaver
+    
+    def get_scheduler(self):
+        """Scheduler multi-batch (dibuat saat batch pertama)"""
+        if self.scheduler is None:
+            from batch_scheduler import BatchScheduler
+            self.scheduler = BatchScheduler(
+                on_result=self._on_scheduled_result,
+                on_batch_done=self._on_scheduled_batch_done,
+                on_idle=lambda: Clock.schedule_once(lambda dt: self._scheduler_idle(), 0),
+                progress_callback=self._on_scheduled_progress
+            )
+        return self.scheduler
+    
+    def _scheduler_busy(self):
+        return self.scheduler is not None and self.scheduler.is_busy()
+    
+    def _autosave_tick(self, dt=None):
+        # Belum ada batch: belum ada yang perlu disimpan
+        if self.autosaver is not None:
+            self.autosaver.save_in_background()
+    
+    def on_start(self):
+        """Ukur waktu startup sampai frame pertama"""
+        build_ms = (time.perf_counter() - _STARTUP_T0) * 1000
+        Clock.schedule_once(lambda dt: self._log_startup_time(build_ms), 0)
+        
+        if AUTOSAVE_ENABLED:
+            Clock.schedule_interval(self._autosave_tick, AUTOSAVE_INTERVAL)
+        
+        if WORKER_MODE_ENABLED:
+            from worker_service import worker_lookup_ready
+            if worker_lookup_ready():
+                threading.Thread(target=self._connect_worker, name="worker-connect", daemon=True).start()
+            else:
+                # Worker tidak punya WebView: tanpa fast path HTTP tidak ada KPJ yang bisa dicari
+                self.add_log("⚠️ Mode worker tidak dipakai: butuh HTTP_FAST_PATH_ENABLED dan search_url "
+                             "portal (WebView tidak jalan di worker), batch diproses di app")
+    
+    def _log_startup_time(self, build_ms):
+        """Log waktu startup (dipanggil setelah frame pertama)"""
+        first_frame_ms = (time.perf_counter() - _STARTUP_T0) * 1000
+        log_info(f"⏱️ Startup: UI siap {build_ms:.0f} ms, frame pertama {first_frame_ms:.0f} ms")
+    
     def build_simple_ui(self):
         """Bangun UI sederhana manual"""
         from kivy.uix.boxlayout import BoxLayout
@@ -155,7 +235,14 @@ class BPJSRealAutomationApp(App):
         )
         self.export_button.bind(on_press=self.export_results)
         
+        file_button = Button(
+            text='📂 FILE KPJ',
+            background_color=(0.5, 0.4, 0.8, 1)
+        )
+        file_button.bind(on_press=self.open_file_picker)
+        
         btn_layout.add_widget(self.start_button)
+        btn_layout.add_widget(file_button)
         btn_layout.add_widget(self.stop_button)
         btn_layout.add_widget(self.export_button)
         
@@ -212,7 +299,8 @@ class BPJSRealAutomationApp(App):
     def _do_progress_update(self, current, total, kpj=None):
         """Eksekusi pembaruan progress (thread-safe)"""
         if hasattr(self, 'progress_bar'):
-            progress = (current / total * 100) if total > 0 else 0
+            # total bisa None/perkiraan untuk input dari file
+            progress = min(current / total * 100, 100) if total else 0
             self.progress_bar.value = progress
             self.progress_label.text = f"Progress: {current}/{total}"
         
@@ -220,8 +308,8 @@ class BPJSRealAutomationApp(App):
             self.update_status(f"Memproses: {kpj} ({current}/{total})")
     
     def start_real_processing(self, instance):
-        """Mulai pemrosesan otomatisasi REAL"""
-        if self.is_processing:
+        """Mulai pemrosesan otomatisasi REAL (antri sebagai batch urgent jika ada yang jalan)"""
+        if self.is_processing and not SCHEDULER_ENABLED:
             self.add_log("⚠️ Pemrosesan sudah berjalan")
             return
         
@@ -238,55 +326,419 @@ class BPJSRealAutomationApp(App):
         
         # Parsing dan validasi
         raw_kpjs = [k for k in valid_lines if k]
-        valid_kpjs, invalid_kpjs = validate_kpj_list(raw_kpjs)
+        validation = validate_kpj_bulk(raw_kpjs)
+        valid_kpjs = validation["valid"]
+        invalid_indices = validation["invalid_indices"]
         
-        if invalid_kpjs:
-            self.add_log(f"⚠️ {len(invalid_kpjs)} KPJ tidak valid")
-            for inv in invalid_kpjs[:5]:  # Tampilkan maksimal 5 error
-                self.add_log(f"  - {inv['kpj']}: {inv['error']}")
-            if len(invalid_kpjs) > 5:
-                self.add_log(f"  ... dan {len(invalid_kpjs) - 5} error lainnya")
+        if invalid_indices:
+            self.add_log(f"⚠️ {len(invalid_indices)} KPJ tidak valid")
+            for error, count in validation["error_counts"].items():
+                self.add_log(f"  - {error}: {count} KPJ")
+            for index in invalid_indices[:5]:  # Tampilkan maksimal 5 contoh
+                self.add_log(f"  - contoh: {raw_kpjs[index]!r}")
+        
+        if validation["duplicate_count"]:
+            self.add_log(f"ℹ️ {validation['duplicate_count']} KPJ duplikat dilewati")
         
         if not valid_kpjs:
             self.update_status("❌ Error: Tidak ada KPJ yang valid")
             return
         
+        self.add_log(f"✅ KPJ Valid: {len(valid_kpjs)}, Tidak Valid: {len(invalid_indices)}")
+        
+        # Batch tambahan saat ada yang berjalan: didahulukan lewat scheduler
+        if self.is_processing:
+            self._queue_batch(valid_kpjs, len(valid_kpjs), "urgent")
+            return
+        
         # Perbarui UI
         self.is_processing = True
         self.current_batch = valid_kpjs
         self.total_kpj = len(valid_kpjs)
         self.current_index = 0
-        self.results = []
         
-        self.start_button.disabled = True
+        self.start_button.disabled = not SCHEDULER_ENABLED
         self.stop_button.disabled = False
         self.export_button.disabled = True
         
         self.update_status(f"🚀 Memulai otomatisasi REAL: {self.total_kpj} KPJ")
-        self.add_log(f"✅ KPJ Valid: {len(valid_kpjs)}, Tidak Valid: {len(invalid_kpjs)}")
         
-        # Mulai pemrosesan dengan callback
-        Clock.schedule_once(lambda dt: self._process_batch_with_callback(), 0.5)
+        # Mulai pemrosesan dengan callback (di worker jika tersambung)
+        self._dispatch_batch()
+    
+    def open_file_picker(self, instance=None):
+        """Pilih file KPJ (TXT/CSV/XLSX) untuk diproses streaming"""
+        from kivy.uix.boxlayout import BoxLayout
+        from kivy.uix.button import Button
+        from kivy.uix.popup import Popup
+        from kivy.uix.filechooser import FileChooserListView
+        
+        start_path = DOWNLOAD_FOLDER if os.path.isdir(DOWNLOAD_FOLDER) else os.getcwd()
+        chooser = FileChooserListView(path=start_path, filters=['*.txt', '*.csv', '*.xlsx'])
+        
+        content = BoxLayout(orientation='vertical', spacing=dp(10))
+        buttons = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
+        select_button = Button(text='Proses file ini', background_color=(0, 0.7, 0, 1))
+        cancel_button = Button(text='Batal', background_color=(0.9, 0.2, 0.2, 1))
+        buttons.add_widget(select_button)
+        buttons.add_widget(cancel_button)
+        content.add_widget(chooser)
+        content.add_widget(buttons)
+        
+        popup = Popup(title='Pilih file KPJ', content=content, size_hint=(0.95, 0.9))
+        
+        def select(*args):
+            if not chooser.selection:
+                self.add_log("⚠️ Belum ada file yang dipilih")
+                return
+            popup.dismiss()
+            self.start_file_processing(chooser.selection[0])
+        
+        select_button.bind(on_press=select)
+        cancel_button.bind(on_press=popup.dismiss)
+        popup.open()
+    
+    def start_file_processing(self, filepath):
+        """Mulai pemrosesan dari file TXT/CSV/XLSX tanpa memuat semua KPJ ke memori"""
+        if self.is_processing and not SCHEDULER_ENABLED:
+            self.add_log("⚠️ Pemrosesan sudah berjalan")
+            return
+        
+        if not os.path.exists(filepath):
+            self.update_status(f"❌ File tidak ditemukan: {filepath}")
+            return
+        
+        try:
+            from kpj_importer import open_kpj_file
+            importer, size_hint = open_kpj_file(filepath)
+        except Exception as e:
+            self.update_status(f"❌ Gagal membuka file: {str(e)}")
+            return
+        
+        # File besar saat ada yang berjalan: antri sebagai backfill
+        if self.is_processing:
+            if not self._worker_connected():
+                self._begin_file_run()
+            self._queue_batch(importer, size_hint, "bulk", filepath)
+            return
+        
+        # Perbarui UI
+        self.is_processing = True
+        self.current_batch = importer
+        self.total_kpj = size_hint
+        self.current_index = 0
+        
+        self.start_button.disabled = not SCHEDULER_ENABLED
+        self.stop_button.disabled = False
+        self.export_button.disabled = True
+        
+        self.update_status(f"🚀 Memulai otomatisasi REAL dari file: {os.path.basename(filepath)} (±{size_hint or '?'} baris)")
+        
+        self._dispatch_batch(filepath, priority="bulk")
+    
+    def _queue_batch(self, source, size_hint, priority, filepath=None):
+        """Tambah batch ke antrian yang sedang berjalan"""
+        if self.is_processing and self.worker_client is not None and self.worker_client.is_connected():
+            # Worker menjalankan batch kiriman berikutnya setelah yang sekarang
+            try:
+                if filepath:
+                    self.worker_client.submit(filepath=filepath)
+                else:
+                    self.worker_client.submit(kpjs=source)
+                self.add_log("🛠️ Batch tambahan dikirim ke worker")
+            except OSError as e:
+                self.add_log(f"⚠️ Gagal mengirim batch ke worker: {e}")
+            return
+        
+        self._submit_scheduled(source, size_hint, priority)
+    
+    def _submit_scheduled(self, source, size_hint, priority):
+        deadline = SCHEDULER_PRIORITY_DEADLINES.get(priority)
+        batch_id = self.get_scheduler().submit(source, size_hint, priority, deadline=deadline)
+        self.add_log(
+            f"🗓️ Batch {batch_id} ({priority}, ±{size_hint or '?'} KPJ"
+            f"{f', deadline {format_duration(deadline)}' if deadline is not None else ''}) masuk antrian"
+        )
+    
+    def _worker_connected(self):
+        return self.worker_client is not None and self.worker_client.is_connected()
+    
+    def _begin_file_run(self):
+        """
+        Hasil batch file tidak ditahan di memori: autosave menulisnya ke part file
+        lalu membuangnya dari CSV handler, di akhir part digabung jadi satu file hasil
+        """
+        if self._file_run:
+            return
+        self._file_run = True
+        self.get_autosaver().trim_after_save = True
+        if not AUTOSAVE_ENABLED:
+            self._run_autosave_event = Clock.schedule_interval(self._autosave_tick, AUTOSAVE_INTERVAL)
+    
+    def _finish_file_run(self):
+        """Simpan sisa hasil batch file dan gabungkan part file run ini (di thread ekspor)"""
+        self._file_run = False
+        if self._run_autosave_event is not None:
+            self._run_autosave_event.cancel()
+            self._run_autosave_event = None
+        
+        from exporter import export_worker
+        
+        self.update_status("💾 Menyimpan hasil batch file...")
+        future = export_worker.run(self._save_file_run)
+        future.add_done_callback(self._file_run_saved)
+    
+    def _save_file_run(self):
+        from result_merger import ResultMerger
+        
+        paths = self.autosaver.finish_run()
+        if not paths:
+            return None, None
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(CSV_FOLDER, f"hasil_real_{timestamp}.csv")
+        return filepath, ResultMerger().merge(paths, filepath)
+    
+    @mainthread
+    def _file_run_saved(self, future):
+        if self.export_button and not self.is_processing:
+            self.export_button.disabled = False
+        
+        error = future.exception()
+        if error is not None:
+            self._show_export_error(error)
+            self.add_log(f"ℹ️ Hasil tetap ada di part autosave: {CSV_FOLDER}")
+            return
+        
+        filepath, stats = future.result()
+        if filepath is None:
+            self.update_status("❌ Tidak ada hasil untuk disimpan")
+            return
+        
+        self.update_status(f"💾 Hasil batch file tersimpan: {stats['rows_out']} records")
+        self.add_log(f"📄 File: {os.path.basename(filepath)}")
+        self.add_log(f"📁 Lokasi: {CSV_FOLDER}")
+    
+    def _dispatch_batch(self, filepath=None, priority=SCHEDULER_DEFAULT_PRIORITY):
+        """Kirim batch ke worker jika tersambung, jika tidak proses di app"""
+        if self._worker_connected():
+            try:
+                if filepath:
+                    self.worker_client.submit(filepath=filepath)
+                else:
+                    self.worker_client.submit(kpjs=self.current_batch)
+                self.current_batch = []
+                self.success_count = 0
+                self.processed_count = 0
+                self._start_live_stats()
+                self.add_log("🛠️ Batch dikirim ke worker")
+                return
+            except OSError as e:
+                self.add_log(f"⚠️ Worker tidak bisa dipakai, proses di app: {e}")
+        
+        from profiler import start_profiling
+        
+        # Part autosave baru untuk run ini (part lama tidak tercampur hasil run)
+        self.get_autosaver().start_run()
+        if filepath:
+            self._begin_file_run()
+        
+        if SCHEDULER_ENABLED:
+            self.success_count = 0
+            self.processed_count = 0
+            if start_profiling("batch"):
+                self.add_log("🔬 Profiler CPU aktif untuk batch ini")
+            self._start_live_stats()
+            self._submit_scheduled(self.current_batch, self.total_kpj, priority)
+            self.current_batch = []
+            return
+        
+        # Batch di thread terpisah: main thread Kivy tetap bebas untuk UI dan StatsPanel live
+        if start_profiling("batch"):
+            self.add_log("🔬 Profiler CPU aktif untuk batch ini")
+        self._start_live_stats()
+        self._batch_thread = threading.Thread(target=self._process_batch_with_callback, name="batch", daemon=True)
+        self._batch_thread.start()
+    
+    def _on_scheduled_result(self, batch, result):
+        """Hasil dari thread scheduler: langsung ke CSV handler"""
+        self.autosaver.handler.add_record(result)
+        self.processed_count += 1
+        if result.get("status") in ["success", "completed"]:
+            self.success_count += 1
+    
+    def _on_scheduled_progress(self, progress):
+        """Progress engine -> progress batch asalnya (bukan gabungan semua batch)"""
+        for status in self.scheduler.get_status():
+            if status["batch_id"] == progress.get("batch_id"):
+                progress = dict(progress, current=status["processed"] + 1, total=status["total"])
+                break
+        Clock.schedule_once(lambda dt: self._handle_progress(progress), 0)
+    
+    @mainthread
+    def _on_scheduled_batch_done(self, batch):
+        status = batch.get_status()
+        late = status["deadline_in"] is not None and status["deadline_in"] < 0
+        self.add_log(
+            f"🗓️ Batch {status['batch_id']} {status['state']}: {status['processed']}/"
+            f"{status['total'] or '?'} KPJ, {status['successful']} berhasil"
+            f"{' (lewat deadline)' if late else ''}"
+        )
+    
+    def _scheduler_idle(self):
+        """Semua batch di antrian selesai"""
+        from profiler import stop_profiling
+        stop_profiling()
+        self._engine_drained()
+        if self.is_processing:
+            self._processing_complete()
+    
+    def _engine_drained(self):
+        """Tidak ada KPJ yang sedang jalan lagi: lakukan reset engine yang ditunda stop"""
+        if not self._reset_after_drain:
+            return
+        self._reset_after_drain = False
+        self._reset_engine()
+    
+    def _reset_engine(self):
+        try:
+            from automation import reset_engine
+            reset_engine()
+        except Exception as e:
+            self.add_log(f"⚠️ Gagal reset engine: {e}")
+    
+    def _connect_worker(self):
+        """Sambung ke worker (dijalankan jika belum ada) di thread terpisah"""
+        from worker_service import connect_worker
+        client = connect_worker(self._on_worker_event)
+        if client is not None:
+            self.worker_client = client
+            self.add_log("🛠️ Tersambung ke worker")
+    
+    @mainthread
+    def _on_worker_event(self, event):
+        """Event dari worker -> handler UI yang sama dengan mode in-process"""
+        event_type = event.get("type")
+        
+        if event_type == "progress":
+            self._handle_progress(event["progress"])
+        elif event_type == "result":
+            self.processed_count += 1
+            if event["result"].get("status") in ["success", "completed"]:
+                self.success_count += 1
+        elif event_type == "stats":
+            self._worker_stats = event["stats"]
+        elif event_type == "status":
+            if event.get("lookup_ready") is False:
+                self.add_log("⚠️ Worker tanpa fast path HTTP tidak bisa mencari KPJ, batch diproses di app")
+                if self.worker_client is not None:
+                    self.worker_client.close()
+                    self.worker_client = None
+                return
+            # Batch tetap berjalan di worker walau app sempat ditutup
+            if event.get("state") == "running" and not self.is_processing:
+                self.is_processing = True
+                self.start_button.disabled = True
+                self.stop_button.disabled = False
+                self.export_button.disabled = True
+                self._start_live_stats()
+                self.update_status(f"🔄 Batch {event['batch_id']} masih berjalan di worker")
+        elif event_type == "batch_done":
+            self.processed_count = event["processed"]
+            self.success_count = event["successful"]
+            if event.get("file"):
+                self.add_log(f"💾 Worker menyimpan hasil: {event['file']}")
+            if self.is_processing:
+                self._processing_complete()
+        elif event_type == "error":
+            if self.is_processing:
+                self._processing_error(event.get("error", "Worker error"))
+        elif event_type == "disconnected":
+            self.add_log("⚠️ Koneksi ke worker terputus")
+    
+    def _start_live_stats(self):
+        """Refresh StatsPanel dari estimator engine dengan frekuensi rendah"""
+        self._stop_live_stats()
+        self._live_stats_event = Clock.schedule_interval(self._refresh_live_stats, LIVE_STATS_INTERVAL)
+    
+    def _stop_live_stats(self):
+        if self._live_stats_event is not None:
+            self._live_stats_event.cancel()
+            self._live_stats_event = None
+    
+    def _refresh_live_stats(self, dt=None):
+        """Throughput, ETA dan success rate batch ke StatsPanel"""
+        if not HAS_UI_BUILDER:
+            return
+        
+        if self.worker_client is not None and self.worker_client.is_connected():
+            stats = self._worker_stats
+            if stats is None:
+                return
+        else:
+            from automation import get_engine_stats
+            stats = get_engine_stats()
+            if SCHEDULER_ENABLED and self.scheduler is not None:
+                # Engine dijalankan scheduler tanpa size_hint: total/ETA dari semua batch di antrian
+                stats = dict(stats, live=self.scheduler.estimator.snapshot())
+        live = stats["live"]
+        
+        if live["eta_seconds"] is not None:
+            eta = f"{format_duration(live['eta_seconds'])} ({live['finish_at']})"
+        else:
+            eta = "-"
+        
+        speed = f"{live['per_minute']:.1f} KPJ/min"
+        if live["p50_latency"] is not None:
+            speed += f", p50 {live['p50_latency']:.1f}s"
+        
+        UIBuilder.update_stats_panel(self, {
+            "total_processed": live["processed"],
+            "successful": live["successful"],
+            "skipped": stats.get("skipped", 0),
+            "failed": live["failed"],
+            "success_rate": f"{live['success_rate']:.1f}%",
+            "current_kpj": stats.get("current_kpj") or "None",
+            "status": "Processing" if self.is_processing else "Idle",
+            "time": format_duration(live["elapsed"]),
+            "speed": speed,
+            "eta": eta
+        })
     
     def _process_batch_with_callback(self):
-        """Proses batch dengan callback progress"""
+        """Proses batch dengan callback progress (dijalankan di thread batch)"""
+        from automation import process_kpj_stream
+        from profiler import stop_profiling
+        
         def progress_callback(progress):
             # Kirim update progress ke main thread
             Clock.schedule_once(lambda dt: self._handle_progress(progress), 0)
         
-        # Jalankan batch processing
+        # Jalankan batch processing (streaming: hasil langsung masuk CSV handler)
         try:
-            batch_results = process_kpj_list(self.current_batch, progress_callback)
+            self.success_count = 0
+            self.processed_count = 0
             
-            # Tambahkan ke CSV handler
-            csv_handler.add_batch(batch_results)
-            self.results = batch_results
+            stream = process_kpj_stream(self.current_batch, self.total_kpj, progress_callback)
+            try:
+                for result in stream:
+                    self.autosaver.handler.add_record(result)
+                    self.processed_count += 1
+                    if result.get("status") in ["success", "completed"]:
+                        self.success_count += 1
+                    
+                    # Tombol stop: hentikan setelah KPJ yang sedang jalan
+                    if not self.is_processing:
+                        break
+            finally:
+                stream.close()
             
             # Kosongkan batch untuk menghemat memori
             self.current_batch = []
             
             # Perbarui UI setelah selesai
-            Clock.schedule_once(lambda dt: self._processing_complete(), 0)
+            if self.is_processing:
+                Clock.schedule_once(lambda dt: self._processing_complete(), 0)
             
         except Exception as e:
             # Tangkap error detail untuk debugging
@@ -295,6 +747,10 @@ class BPJSRealAutomationApp(App):
                 lambda dt: self._processing_error(f"{str(e)}\n\nDetail:\n{error_detail}"), 
                 0
             )
+        
+        finally:
+            stop_profiling()
+            Clock.schedule_once(lambda dt: self._engine_drained(), 0)
     
     @mainthread
     def _handle_progress(self, progress):
@@ -308,6 +764,14 @@ class BPJSRealAutomationApp(App):
             self.current_index = current
             self.update_progress(current, total, kpj)
             self.add_log(f"Memproses: {kpj}")
+        elif status == "login_required":
+            portal = progress.get("portal", "sipp").upper()
+            self.update_status(f"🔐 Sesi login {portal} berakhir - silakan login ulang, batch dijeda")
+            self.add_log(f"⏸️ Batch dijeda: {progress.get('reason', '')}")
+        elif status == "session_restored":
+            self.update_status("🔓 Login berhasil, batch dilanjutkan")
+        elif status == "relogin_timeout":
+            self.add_log("❌ Login ulang tidak dilakukan, KPJ ditandai gagal")
         elif status == "completed":
             result = progress.get("result", {})
             if result.get("status") in ["success", "completed"]:
@@ -320,10 +784,12 @@ class BPJSRealAutomationApp(App):
     def _processing_complete(self):
         """Tangani penyelesaian pemrosesan (thread-safe)"""
         self.is_processing = False
+        self._stop_live_stats()
+        self._refresh_live_stats()
         
         # Hitung hasil
-        success_count = len([r for r in self.results if r.get("status") in ["success", "completed"]])
-        failed_count = len(self.results) - success_count
+        success_count = self.success_count
+        failed_count = self.processed_count - success_count
         
         # Perbarui UI
         self.start_button.disabled = False
@@ -332,17 +798,21 @@ class BPJSRealAutomationApp(App):
         
         self.update_status(f"✅ Pemrosesan selesai! Berhasil: {success_count}, Gagal: {failed_count}")
         self.add_log(f"=== SELESAI ===")
-        self.add_log(f"Total diproses: {len(self.results)}")
+        self.add_log(f"Total diproses: {self.processed_count}")
         self.add_log(f"Berhasil: {success_count}")
         self.add_log(f"Gagal: {failed_count}")
         
-        # Ekspor otomatis hasil
-        Clock.schedule_once(lambda dt: self.export_results(auto=True), 1)
+        # Ekspor otomatis hasil (batch file: gabungkan part autosave run ini)
+        if self._file_run:
+            self._finish_file_run()
+        else:
+            Clock.schedule_once(lambda dt: self.export_results(auto=True), 1)
     
     @mainthread
     def _processing_error(self, error_message):
         """Tangani error pemrosesan (thread-safe)"""
         self.is_processing = False
+        self._stop_live_stats()
         
         # Perbarui UI
         self.start_button.disabled = False
@@ -353,6 +823,10 @@ class BPJSRealAutomationApp(App):
         self.add_log("❌❌❌ ERROR PEMROSESAN ❌❌❌")
         self.add_log(error_message)
         self.add_log("❌❌❌===================❌❌❌")
+        
+        # Hasil parsial batch file tetap digabung ke satu file
+        if self._file_run:
+            self._finish_file_run()
     
     def stop_processing(self, instance):
         """Hentikan pemrosesan"""
@@ -360,12 +834,25 @@ class BPJSRealAutomationApp(App):
             return
         
         self.is_processing = False
+        self._stop_live_stats()
         
-        # Reset engine
-        try:
-            reset_engine()
-        except Exception as e:
-            self.add_log(f"⚠️ Gagal reset engine: {e}")
+        # Batalkan semua batch di antrian (KPJ yang sedang jalan tetap selesai)
+        if self._scheduler_busy():
+            self.scheduler.cancel()
+        
+        # Batch di worker dibatalkan lewat IPC
+        if self.worker_client is not None and self.worker_client.is_connected():
+            try:
+                self.worker_client.cancel()
+            except OSError as e:
+                self.add_log(f"⚠️ Gagal membatalkan batch worker: {e}")
+        
+        # Reset engine setelah KPJ yang sedang jalan selesai (thread scheduler/batch masih memakainya)
+        batch_running = self._batch_thread is not None and self._batch_thread.is_alive()
+        if self._scheduler_busy() or batch_running:
+            self._reset_after_drain = True
+        else:
+            self._reset_engine()
         
         # Perbarui UI
         self.start_button.disabled = False
@@ -373,11 +860,15 @@ class BPJSRealAutomationApp(App):
         
         self.update_status("⏹️ Pemrosesan dihentikan")
         self.add_log("Pemrosesan dihentikan manual")
+        
+        if self._file_run:
+            self._finish_file_run()
     
     def export_results(self, instance=None, auto=False):
         """Ekspor hasil ke CSV dengan robust file handling"""
         try:
-            if not csv_handler.has_data():
+            from csv_handler import get_csv_handler
+            if not get_csv_handler().has_data():
                 if not auto:
                     self.update_status("❌ Tidak ada data untuk diekspor")
                 return
@@ -406,58 +897,89 @@ class BPJSRealAutomationApp(App):
                     filepath = os.path.join(CSV_FOLDER, filename)
                     break
             
-            # Ekspor data
-            export_count = csv_handler.export_to_csv(filepath)
-            
-            # Perbarui UI
-            self.update_status(f"💾 Data berhasil diekspor: {export_count} records")
-            self.add_log(f"📄 File: {filename}")
-            self.add_log(f"📁 Lokasi: {CSV_FOLDER}")
+            # Ekspor data di background (file sementara lalu rename)
+            if self.export_button:
+                self.export_button.disabled = True
+            self.update_status("💾 Mengekspor data...")
             
-            if auto:
-                self.add_log("(Ekspor otomatis setelah pemrosesan selesai)")
+            future = get_csv_handler().export_async(filepath, progress=self._export_progress)
+            future.add_done_callback(lambda f: self._export_finished(f, filename, auto))
             
-            # Bersihkan data setelah diekspor (optional)
-            # csv_handler.clear_data()
-            
-        except PermissionError:
+        except Exception as e:
+            self._show_export_error(e)
+    
+    @mainthread
+    def _export_progress(self, written, total):
+        """Progress ekspor dari thread worker"""
+        if total:
+            self.update_status(f"💾 Mengekspor... {written}/{total} ({written / total * 100:.0f}%)")
+    
+    @mainthread
+    def _export_finished(self, future, filename, auto):
+        """Ekspor background selesai (berhasil atau gagal)"""
+        if self.export_button and not self.is_processing:
+            self.export_button.disabled = False
+        
+        error = future.exception()
+        if error is not None:
+            self._show_export_error(error)
+            return
+        
+        # Perbarui UI
+        self.update_status(f"💾 Data berhasil diekspor: {future.result()} records")
+        self.add_log(f"📄 File: {filename}")
+        self.add_log(f"📁 Lokasi: {CSV_FOLDER}")
+        
+        if auto:
+            self.add_log("(Ekspor otomatis setelah pemrosesan selesai)")
+        
+        # Bersihkan data setelah diekspor (optional)
+        # get_csv_handler().clear_data()
+    
+    def _show_export_error(self, error):
+        if isinstance(error, PermissionError):
             error_msg = "❌ Gagal menulis file: Akses ditolak. Tutup file Excel jika terbuka."
             self.update_status(error_msg)
             self.add_log(error_msg)
-        except Exception as e:
-            error_msg = f"❌ Error ekspor: {str(e)}"
+        else:
+            error_msg = f"❌ Error ekspor: {str(error)}"
             self.update_status(error_msg)
             self.add_log(error_msg)
-            self.add_log(f"Detail: {traceback.format_exc()}")
+            self.add_log(f"Detail: {''.join(traceback.format_exception(type(error), error, error.__traceback__))}")
     
     def on_stop(self):
         """Aplikasi ditutup - cleanup resources"""
         if self.is_processing:
             self.stop_processing(None)
         
-        # Simpan data yang tersisa
-        if csv_handler.has_data():
+        # Simpan record yang belum di-autosave (hanya sisa sejak autosave terakhir)
+        if self.autosaver is not None and self.autosaver.handler.has_data():
             try:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"hasil_real_autosave_{timestamp}.csv"
-                filepath = os.path.join(CSV_FOLDER, filename)
-                
-                # Pastikan folder ada
-                if not os.path.exists(CSV_FOLDER):
-                    os.makedirs(CSV_FOLDER)
-                
-                export_count = csv_handler.export_to_csv(filepath)
-                print(f"[APLIKASI] Data tersimpan otomatis: {export_count} records ke {filename}")
+                export_count, path = self.autosaver.save_increment()
+                if path:
+                    print(f"[APLIKASI] Data tersimpan otomatis: {export_count} records ke {path}")
                 
                 # Clear data setelah disimpan
-                csv_handler.clear_data()
+                self.autosaver.handler.clear_data()
                 
             except Exception as e:
                 print(f"[APLIKASI] Gagal simpan otomatis: {e}")
         
+        # Tunggu ekspor background yang masih berjalan selesai (file tidak terpotong)
+        # Modul belum diimpor = belum pernah ada ekspor, tidak perlu diimpor saat keluar
+        exporter = sys.modules.get("exporter")
+        if exporter is not None:
+            exporter.export_worker.shutdown(wait=True)
+        
+        # Putus dari worker; batch di worker tetap berjalan
+        if self.worker_client is not None:
+            self.worker_client.close()
+        
         # Reset engine jika ada
         try:
-            reset_engine()
+            automation = sys.modules.get("automation")
+            if automation is not None:
+                automation.reset_engine()
         except Exception as e:
             print(f"[APLIKASI] Gagal reset engine saat exit: {e}")
         
@@ -0,0 +1,169 @@
+"""
+BPJS AUTOMATION - MEMORY DIAGNOSTICS
+Snapshot tracemalloc berkala untuk melacak kebocoran memori pada batch panjang
+"""
+
+import os
+from config import (
+    MEMORY_DIAGNOSTICS_ENABLED, MEMORY_SNAPSHOT_EVERY,
+    MEMORY_TOP_N, MEMORY_TRACE_FRAMES
+)
+from logger import log_info, log_warning
+
+class MemoryMonitor:
+    """Ambil snapshot tracemalloc setiap N KPJ dan log lokasi alokasi yang tumbuh"""
+    
+    def __init__(self, every=MEMORY_SNAPSHOT_EVERY, top_n=MEMORY_TOP_N):
+        self.enabled = MEMORY_DIAGNOSTICS_ENABLED
+        self.every = max(1, every)
+        self.top_n = top_n
+        self.baseline = None
+        self.previous = None
+        self.processed = 0
+        self.history = []
+        self._started_tracing = False
+    
+    def set_enabled(self, enabled):
+        """Aktifkan/nonaktifkan diagnostik memori"""
+        self.enabled = bool(enabled)
+        log_info(f"Diagnostik memori {'aktif' if self.enabled else 'nonaktif'}")
+    
+    def start(self):
+        """Mulai tracing dan ambil snapshot awal"""
+        if not self.enabled:
+            return False
+        
+        # tracemalloc (dan pickle) hanya di-import saat diagnostik dipakai
+        import tracemalloc
+        
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_TRACE_FRAMES)
+            self._started_tracing = True
+        
+        self.processed = 0
+        self.history = []
+        self.baseline = self._take_snapshot()
+        self.previous = self.baseline
+        
+        log_info(f"🧠 Diagnostik memori mulai (snapshot setiap {self.every} KPJ), RSS {self._format_kb(get_rss_kb())}")
+        return True
+    
+    def on_kpj_processed(self):
+        """Dipanggil engine setelah setiap KPJ selesai"""
+        if not self.enabled or self.previous is None:
+            return
+        
+        self.processed += 1
+        if self.processed % self.every == 0:
+            self.report()
+    
+    def report(self, final=False):
+        """Bandingkan dengan snapshot sebelumnya dan log alokasi yang tumbuh"""
+        if self.previous is None:
+            return None
+        
+        import tracemalloc
+        
+        snapshot = self._take_snapshot()
+        reference = self.baseline if final else self.previous
+        traced_current, traced_peak = tracemalloc.get_traced_memory()
+        rss_kb = get_rss_kb()
+        
+        label = "total batch" if final else f"{self.processed} KPJ"
+        log_info(
+            f"🧠 Memori @ {label}: traced {traced_current / 1024:.0f} KB "
+            f"(peak {traced_peak / 1024:.0f} KB), RSS {self._format_kb(rss_kb)}"
+        )
+        
+        # Pertumbuhan per modul (file) lalu per baris
+        for stat in self._top_growth(snapshot, reference, "filename"):
+            log_info(f"  📦 {stat.size_diff / 1024:+.1f} KB ({stat.count_diff:+d} blok) - {self._describe(stat)}")
+        
+        for stat in self._top_growth(snapshot, reference, "lineno"):
+            log_info(f"  📍 {stat.size_diff / 1024:+.1f} KB ({stat.count_diff:+d} blok) - {self._describe(stat)}")
+        
+        entry = {
+            "processed": self.processed,
+            "traced_kb": round(traced_current / 1024, 1),
+            "peak_kb": round(traced_peak / 1024, 1),
+            "rss_kb": rss_kb
+        }
+        self.history.append(entry)
+        self.previous = snapshot
+        return entry
+    
+    def stop(self):
+        """Laporan akhir terhadap baseline dan hentikan tracing"""
+        if self.previous is None:
+            return None
+        
+        # Tracing tetap dihentikan walau laporan akhir gagal
+        try:
+            return self.report(final=True)
+        finally:
+            self.baseline = None
+            self.previous = None
+            if self._started_tracing:
+                import tracemalloc
+                tracemalloc.stop()
+                self._started_tracing = False
+    
+    def _take_snapshot(self):
+        """Snapshot tanpa alokasi internal tracemalloc/importlib/monitor ini"""
+        import tracemalloc
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+    
+    def _top_growth(self, snapshot, reference, key_type):
+        """Statistik dengan pertumbuhan positif terbesar"""
+        stats = snapshot.compare_to(reference, key_type)
+        growing = [stat for stat in stats if stat.size_diff > 0]
+        return growing[:self.top_n]
+    
+    def _describe(self, stat):
+        frame = stat.traceback[0]
+        filename = os.path.basename(frame.filename)
+        if frame.lineno:
+            return f"{filename}:{frame.lineno}"
+        return filename
+    
+    def _format_kb(self, value):
+        return f"{value / 1024:.1f} MB" if value is not None else "n/a"
+
+def get_rss_kb():
+    """Resident set size proses ini dalam KB (None jika tidak tersedia)"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except Exception:
+        pass
+    
+    try:
+        import resource
+        # ru_maxrss adalah puncak RSS (KB di Linux), bukan nilai saat ini
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        log_warning("RSS tidak tersedia di platform ini")
+        return None
+
+# Global memory monitor instance
+memory_monitor = MemoryMonitor()
+
+# Convenience functions
+def start_memory_diagnostics():
+    return memory_monitor.start()
+
+def stop_memory_diagnostics():
+    return memory_monitor.stop()
+
+def set_memory_diagnostics_enabled(enabled):
+    memory_monitor.set_enabled(enabled)
+
+def is_memory_diagnostics_enabled():
+    return memory_monitor.enabled
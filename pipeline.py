@@ -0,0 +1,150 @@
+"""
+BPJS AUTOMATION - PORTAL PIPELINE
+Workflow bertahap (SIPP -> DPT -> LAPAK): tiap portal punya antrian,
+worker dan rate limit sendiri sehingga portal berbeda dikerjakan bersamaan
+"""
+
+import time
+import queue
+import threading
+from config import PIPELINE_QUEUE_SIZE
+from logger import log_info, log_error
+from http_fast_path import HostRateLimiter
+
+# Penanda akhir aliran (diteruskan dari stage ke stage)
+_DONE = object()
+
+class PipelineStage:
+    """Satu portal: antrian masuk + worker + rate limit"""
+    
+    def __init__(self, name, handler, rate, queue_size=PIPELINE_QUEUE_SIZE):
+        """
+        handler(item) -> result dict untuk stage ini
+        item: {"kpj", "sequence", "stages": {nama_stage: result}, "queued_at"}
+        """
+        self.name = name
+        self.handler = handler
+        self.cancelled = None  # threading.Event milik PortalPipeline
+        self.rate_limiter = HostRateLimiter(rate)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.next_stage = None
+        self.output = None  # antrian hasil akhir (stage terakhir)
+        self.thread = None
+        self.stats = {
+            "processed": 0,
+            "successful": 0,
+            "failed": 0,
+            "skipped": 0,
+            "busy_seconds": 0.0,
+            "started_at": None
+        }
+        self._lock = threading.Lock()
+    
+    def start(self):
+        self.stats["started_at"] = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self.thread.start()
+    
+    def _forward(self, item):
+        if self.next_stage is not None:
+            self.next_stage.queue.put(item)  # blok jika stage berikut penuh (backpressure)
+        else:
+            self.output.put(item)
+    
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                self._forward(_DONE)
+                return
+            if self.cancelled is not None and self.cancelled.is_set():
+                continue  # pipeline dibatalkan: buang sisa antrian sampai _DONE
+            
+            self.rate_limiter.acquire(self.name)
+            started = time.monotonic()
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                log_error(f"Stage {self.name} error KPJ {item['kpj']}: {str(e)}")
+                result = {"status": "error", "error": str(e)}
+            
+            item["stages"][self.name] = result
+            self._record(result, time.monotonic() - started)
+            self._forward(item)
+    
+    def _record(self, result, seconds):
+        status = (result or {}).get("status")
+        with self._lock:
+            self.stats["processed"] += 1
+            self.stats["busy_seconds"] += seconds
+            if status in ["success", "completed"]:
+                self.stats["successful"] += 1
+            elif status == "skipped":
+                self.stats["skipped"] += 1
+            else:
+                self.stats["failed"] += 1
+    
+    def get_stats(self):
+        with self._lock:
+            stats = self.stats.copy()
+        
+        elapsed = time.monotonic() - stats["started_at"] if stats["started_at"] else 0
+        stats.pop("started_at")
+        stats["backlog"] = self.queue.qsize()
+        stats["per_minute"] = round(stats["processed"] / elapsed * 60, 1) if elapsed > 0 else 0.0
+        stats["utilization"] = round(stats["busy_seconds"] / elapsed, 2) if elapsed > 0 else 0.0
+        stats["busy_seconds"] = round(stats["busy_seconds"], 1)
+        return stats
+
+class PortalPipeline:
+    """Rangkaian stage; KPJ pindah ke stage berikut begitu hasilnya ada"""
+    
+    def __init__(self, stages):
+        self.stages = stages
+        self.output = queue.Queue()
+        self.cancelled = threading.Event()
+        for stage, next_stage in zip(stages, stages[1:] + [None]):
+            stage.next_stage = next_stage
+            stage.cancelled = self.cancelled
+        stages[-1].output = self.output
+    
+    def run(self, kpj_iterable):
+        """
+        Jalankan semua stage untuk KPJ dari iterator
+        Yields: item selesai (urutan selesai) {"kpj", "sequence", "stages", "queued_at"}
+        """
+        log_info(f"🔀 Pipeline dimulai: {' -> '.join(stage.name for stage in self.stages)}")
+        for stage in self.stages:
+            stage.start()
+        
+        feeder = threading.Thread(target=self._feed, args=(kpj_iterable,), name="stage-feeder", daemon=True)
+        feeder.start()
+        
+        while True:
+            item = self.output.get()
+            if item is _DONE:
+                break
+            yield item
+        
+        log_info(f"🔀 Pipeline selesai: {self.get_stats()}")
+    
+    def _feed(self, kpj_iterable):
+        first = self.stages[0]
+        try:
+            for sequence, kpj in enumerate(kpj_iterable, 1):
+                if self.cancelled.is_set():
+                    break
+                first.queue.put({"kpj": kpj, "sequence": sequence, "stages": {},
+                                 "queued_at": time.monotonic()})
+        except Exception as e:
+            log_error(f"Pipeline feeder error: {str(e)}")
+        finally:
+            first.queue.put(_DONE)
+    
+    def cancel(self):
+        """Hentikan feeder dan buang KPJ yang belum diproses (KPJ yang sedang jalan tetap selesai)"""
+        self.cancelled.set()
+    
+    def get_stats(self):
+        """Throughput dan backlog per stage"""
+        return {stage.name: stage.get_stats() for stage in self.stages}
@@ -0,0 +1,175 @@
+"""
+BPJS AUTOMATION - SAMPLING PROFILER
+Profiler CPU ringan berbasis sampling untuk batch yang berjalan lama
+"""
+
+import os
+import sys
+import time
+import threading
+from datetime import datetime
+from config import (
+    LOG_FOLDER, PROFILER_ENABLED, PROFILER_SAMPLE_INTERVAL,
+    PROFILER_MAX_DEPTH, PROFILER_TOP_N
+)
+from logger import log_info, log_error, log_warning
+
+class SamplingProfiler:
+    """Sampling profiler dengan thread latar belakang"""
+
+    def __init__(self, interval=PROFILER_SAMPLE_INTERVAL, max_depth=PROFILER_MAX_DEPTH):
+        self.enabled = PROFILER_ENABLED
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = {}
+        self.sample_count = 0
+        self.label = None
+        self.start_time = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def set_enabled(self, enabled):
+        """Aktifkan/nonaktifkan profiler untuk batch berikutnya"""
+        self.enabled = bool(enabled)
+        log_info(f"Profiler CPU {'aktif' if self.enabled else 'nonaktif'}")
+
+    def is_running(self):
+        """Cek apakah thread sampling sedang berjalan"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, label="batch"):
+        """Mulai sampling semua thread"""
+        if self.is_running():
+            log_warning("Profiler sudah berjalan")
+            return False
+
+        with self._lock:
+            self.samples = {}
+            self.sample_count = 0
+
+        self.label = label
+        self.start_time = time.monotonic()
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="bpjs-sampling-profiler",
+            daemon=True
+        )
+        self._thread.start()
+
+        log_info(f"🔬 Profiler mulai ({label}), interval {self.interval * 1000:.0f} ms")
+        return True
+
+    def stop(self):
+        """
+        Hentikan sampling dan tulis hasil ke LOG_FOLDER
+        Returns: (success, filepath or error_message)
+        """
+        if not self.is_running():
+            return False, "Profiler tidak berjalan"
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+        duration = time.monotonic() - self.start_time
+        log_info(f"🔬 Profiler selesai: {self.sample_count} sampel dalam {duration:.1f} detik")
+
+        for frame_name, count in self.get_hot_spots():
+            log_info(f"  🔥 {count} sampel - {frame_name}")
+
+        return self.write_collapsed()
+
+    def _run(self):
+        """Loop sampling (dijalankan di thread profiler)"""
+        own_id = threading.get_ident()
+
+        while not self._stop_event.wait(self.interval):
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
+
+            try:
+                frames = sys._current_frames()
+            except Exception as e:
+                log_error(f"Profiler gagal ambil frame: {str(e)}")
+                break
+
+            with self._lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+
+                    stack = self._collapse_stack(frame)
+                    thread_name = thread_names.get(thread_id, str(thread_id))
+                    key = f"{thread_name};{stack}"
+                    self.samples[key] = self.samples.get(key, 0) + 1
+
+                self.sample_count += 1
+
+    def _collapse_stack(self, frame):
+        """Ubah frame menjadi stack format collapsed (root;...;leaf)"""
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            filename = os.path.basename(code.co_filename)
+            names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+
+        names.reverse()
+        return ";".join(names)
+
+    def get_hot_spots(self, top_n=PROFILER_TOP_N):
+        """Fungsi dengan sampel terbanyak (berdasarkan frame paling atas)"""
+        leaf_counts = {}
+        with self._lock:
+            for key, count in self.samples.items():
+                leaf = key.rsplit(";", 1)[-1]
+                leaf_counts[leaf] = leaf_counts.get(leaf, 0) + count
+
+        return sorted(leaf_counts.items(), key=lambda x: x[1], reverse=True)[:top_n]
+
+    def write_collapsed(self, filename=None):
+        """
+        Tulis sampel dalam format collapsed-stack (kompatibel flamegraph.pl / speedscope)
+        Returns: (success, filepath or error_message)
+        """
+        try:
+            if filename is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"bpjs_profile_{self.label}_{timestamp}.folded"
+
+            os.makedirs(LOG_FOLDER, exist_ok=True)
+            filepath = os.path.join(LOG_FOLDER, filename)
+
+            with self._lock:
+                lines = [f"{stack} {count}" for stack, count in self.samples.items()]
+
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write("\n".join(sorted(lines)) + "\n")
+
+            log_info(f"🔬 Profil disimpan: {filepath}")
+            return True, filepath
+
+        except Exception as e:
+            error_msg = f"Error menyimpan profil: {str(e)}"
+            log_error(error_msg)
+            return False, error_msg
+
+# Global profiler instance
+sampling_profiler = SamplingProfiler()
+
+# Convenience functions
+def start_profiling(label="batch"):
+    """Mulai profiler jika diaktifkan lewat config atau UI"""
+    if not sampling_profiler.enabled:
+        return False
+    return sampling_profiler.start(label)
+
+def stop_profiling():
+    return sampling_profiler.stop()
+
+def set_profiling_enabled(enabled):
+    sampling_profiler.set_enabled(enabled)
+
+def is_profiling_enabled():
+    return sampling_profiler.enabled
@@ -0,0 +1,102 @@
+"""
+BPJS AUTOMATION - RATE ESTIMATOR
+Throughput (EWMA KPJ/menit), latensi p50, success rate dan ETA batch,
+diperbarui per KPJ dengan jam monotonic (tidak terpengaruh perubahan jam sistem)
+"""
+
+import time
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from config import RATE_EWMA_ALPHA, RATE_LATENCY_WINDOW
+
+def format_duration(seconds):
+    """Detik -> "HH:MM:SS" (jam boleh > 24)"""
+    if seconds is None:
+        return "--:--:--"
+    seconds = int(max(seconds, 0))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+class RateEstimator:
+    """Estimator batch: record() per KPJ selesai, snapshot() untuk UI/stats"""
+    
+    def __init__(self, alpha=RATE_EWMA_ALPHA, window=RATE_LATENCY_WINDOW, clock=time.monotonic):
+        self.alpha = alpha
+        self.clock = clock
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.start()
+    
+    def start(self, total=None):
+        """Reset untuk batch baru (total boleh None untuk input stream)"""
+        with self._lock:
+            self.total = total
+            self.processed = 0
+            self.successful = 0
+            self.started_at = self.clock()
+            self.last_completion = self.started_at
+            self.interval_ewma = None  # detik per KPJ
+            self.latencies.clear()
+    
+    def set_total(self, total):
+        """Ubah total tanpa reset (mis. batch baru masuk saat berjalan)"""
+        with self._lock:
+            self.total = total
+    
+    def record(self, latency, success):
+        """Satu KPJ selesai: latency (detik) dari mulai sampai hasil"""
+        now = self.clock()
+        with self._lock:
+            interval = now - self.last_completion
+            self.last_completion = now
+            if self.interval_ewma is None:
+                self.interval_ewma = interval
+            else:
+                self.interval_ewma += self.alpha * (interval - self.interval_ewma)
+            
+            self.processed += 1
+            if success:
+                self.successful += 1
+            if latency is not None:
+                self.latencies.append(latency)
+    
+    def _p50(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        middle = len(ordered) // 2
+        if len(ordered) % 2:
+            return ordered[middle]
+        return (ordered[middle - 1] + ordered[middle]) / 2
+    
+    def snapshot(self):
+        """
+        Returns: dict processed, success_rate, per_minute, p50_latency,
+        elapsed, remaining, eta_seconds, finish_at (jam selesai perkiraan)
+        """
+        with self._lock:
+            elapsed = self.clock() - self.started_at
+            processed = self.processed
+            per_minute = 60 / self.interval_ewma if self.interval_ewma else 0.0
+            remaining = max(self.total - processed, 0) if self.total else None
+            
+            eta_seconds = None
+            if remaining is not None and per_minute > 0:
+                eta_seconds = remaining / per_minute * 60
+            
+            return {
+                "processed": processed,
+                "successful": self.successful,
+                "failed": processed - self.successful,
+                "total": self.total,
+                "success_rate": round(self.successful / processed * 100, 1) if processed else 0.0,
+                "per_minute": round(per_minute, 2),
+                "p50_latency": round(self._p50(), 2) if self.latencies else None,
+                "elapsed": round(elapsed, 1),
+                "remaining": remaining,
+                "eta_seconds": round(eta_seconds) if eta_seconds is not None else None,
+                "finish_at": (
+                    (datetime.now() + timedelta(seconds=eta_seconds)).strftime('%Y-%m-%d %H:%M')
+                    if eta_seconds is not None else None
+                ),
+            }
@@ -0,0 +1,183 @@
+"""
+BPJS AUTOMATION - REQUEST POLICY
+Kebijakan intercept request WebView tersembunyi: blokir gambar/font/media/
+script pihak ketiga dan layani aset statis dari cache lokal
+"""
+
+import os
+import time
+import hashlib
+import threading
+from urllib.parse import urlsplit
+from config import (
+    REQUEST_BLOCKING_ENABLED, BLOCKED_EXTENSIONS, BLOCK_THIRD_PARTY_SCRIPTS,
+    BLOCKED_HOST_MARKERS, ASSET_CACHE_ENABLED, ASSET_CACHE_FOLDER,
+    ASSET_CACHE_EXTENSIONS, ASSET_CACHE_TTL, REQUEST_TIMEOUT, get_all_urls
+)
+from logger import log_info, log_error, log_warning
+
+ALLOW = "allow"
+BLOCK = "block"
+CACHE = "cache"
+
+def _base_domain(host):
+    """sipp.bpjsketenagakerjaan.go.id -> bpjsketenagakerjaan.go.id"""
+    parts = host.split(".")
+    return ".".join(parts[1:]) if len(parts) > 2 else host
+
+class RequestPolicy:
+    """Klasifikasi request dan cache aset statis"""
+    
+    def __init__(self, cache_folder=ASSET_CACHE_FOLDER, cache_ttl=ASSET_CACHE_TTL):
+        self.enabled = REQUEST_BLOCKING_ENABLED
+        self.cache_enabled = ASSET_CACHE_ENABLED
+        self.cache_folder = cache_folder
+        self.cache_ttl = cache_ttl
+        self.first_party = tuple(sorted({
+            _base_domain(urlsplit(url).hostname or "") for url in get_all_urls().values()
+        }))
+        
+        # Ekstensi -> jenis resource (lookup sekali per request)
+        self.blocked_extensions = {
+            ext: kind for kind, extensions in BLOCKED_EXTENSIONS.items() for ext in extensions
+        }
+        
+        self.stats = {
+            "requests": 0,
+            "blocked": 0,
+            "blocked_by_kind": {},
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "bytes_saved": 0,
+            "bytes_fetched": 0
+        }
+        self._lock = threading.Lock()
+    
+    def is_first_party(self, host):
+        host = (host or "").lower()
+        return any(host == domain or host.endswith("." + domain) for domain in self.first_party)
+    
+    def classify(self, url, method="GET", accept=""):
+        """
+        Tentukan tindakan untuk satu request
+        Returns: (ALLOW | BLOCK | CACHE, jenis resource atau None)
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+        
+        if not self.enabled or method.upper() != "GET":
+            return ALLOW, None
+        
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return ALLOW, None
+        
+        host = (parts.hostname or "").lower()
+        extension = os.path.splitext(parts.path)[1].lower()
+        accept = (accept or "").lower()
+        
+        if any(marker in host for marker in BLOCKED_HOST_MARKERS):
+            return self._blocked("tracker")
+        
+        kind = self.blocked_extensions.get(extension)
+        if kind is None and accept.startswith("image/"):
+            kind = "image"
+        if kind is not None:
+            return self._blocked(kind)
+        
+        first_party = self.is_first_party(host)
+        if extension == ".js" and not first_party and BLOCK_THIRD_PARTY_SCRIPTS:
+            return self._blocked("third_party_script")
+        
+        if self.cache_enabled and first_party and extension in ASSET_CACHE_EXTENSIONS:
+            return CACHE, extension
+        
+        return ALLOW, None
+    
+    def _blocked(self, kind):
+        with self._lock:
+            self.stats["blocked"] += 1
+            by_kind = self.stats["blocked_by_kind"]
+            by_kind[kind] = by_kind.get(kind, 0) + 1
+        return BLOCK, kind
+    
+    def _cache_path(self, url):
+        extension = os.path.splitext(urlsplit(url).path)[1].lower()
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_folder, digest + extension)
+    
+    def get_cached_asset(self, url, headers=None):
+        """
+        Path file cache untuk aset statis (download dulu jika belum ada/kedaluwarsa)
+        headers: header request asli (Cookie, User-Agent) untuk download
+        Returns: (path, mime_type) or None (biarkan WebView memuat sendiri)
+        """
+        path = self._cache_path(url)
+        mime_type = ASSET_CACHE_EXTENSIONS.get(os.path.splitext(path)[1], "application/octet-stream")
+        
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime < self.cache_ttl:
+                with self._lock:
+                    self.stats["cache_hits"] += 1
+                    self.stats["bytes_saved"] += stat.st_size
+                return path, mime_type
+        except OSError:
+            pass
+        
+        with self._lock:
+            self.stats["cache_misses"] += 1
+        
+        try:
+            import urllib.request  # ssl/http.client hanya saat cache miss
+            request = urllib.request.Request(url, headers=headers or {})
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                if response.status != 200:
+                    return None
+                body = response.read()
+            
+            # Tulis atomik: file sementara lalu rename
+            os.makedirs(self.cache_folder, exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(body)
+            os.replace(temp_path, path)
+            
+            with self._lock:
+                self.stats["bytes_fetched"] += len(body)
+            return path, mime_type
+        
+        except Exception as e:
+            log_warning(f"Aset tidak bisa di-cache {url}: {str(e)}")
+            return None
+    
+    def clear_cache(self):
+        """Hapus semua aset yang di-cache"""
+        if not os.path.isdir(self.cache_folder):
+            return
+        for name in os.listdir(self.cache_folder):
+            try:
+                os.remove(os.path.join(self.cache_folder, name))
+            except OSError as e:
+                log_error(f"Gagal hapus cache aset {name}: {str(e)}")
+        log_info("Cache aset dikosongkan")
+    
+    def get_stats(self):
+        with self._lock:
+            stats = self.stats.copy()
+            stats["blocked_by_kind"] = dict(self.stats["blocked_by_kind"])
+        return stats
+    
+    def log_summary(self):
+        """Ringkasan hemat bandwidth (dipanggil di akhir batch)"""
+        stats = self.get_stats()
+        if not stats["requests"]:
+            return
+        log_info(
+            f"🚫 Request WebView: {stats['blocked']}/{stats['requests']} diblokir "
+            f"{stats['blocked_by_kind']}, cache aset {stats['cache_hits']} hit / "
+            f"{stats['cache_misses']} miss, hemat {stats['bytes_saved'] / 1024:.1f} KB"
+        )
+
+# Global policy instance
+request_policy = RequestPolicy()
@@ -0,0 +1,231 @@
+"""
+BPJS AUTOMATION - RESULT CACHE
+Cache hasil per KPJ + portal (SQLite) dengan TTL dan eviksi LRU berdasarkan ukuran
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from config import (
+    RESULT_CACHE_ENABLED, RESULT_CACHE_FILE, RESULT_CACHE_TTL_POSITIVE,
+    RESULT_CACHE_TTL_NEGATIVE, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_SWEEP_EVERY,
+    RESULT_CACHE_EVICT_BATCH
+)
+from logger import log_info, log_error, log_warning
+
+class ResultCache:
+    """Cache persisten hasil lookup KPJ"""
+    
+    def __init__(self, filepath=RESULT_CACHE_FILE,
+                 ttl_positive=RESULT_CACHE_TTL_POSITIVE,
+                 ttl_negative=RESULT_CACHE_TTL_NEGATIVE,
+                 max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.enabled = RESULT_CACHE_ENABLED
+        self.filepath = filepath
+        self.ttl_positive = ttl_positive
+        self.ttl_negative = ttl_negative
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        self._total_bytes = 0  # SUM(size) berjalan, diperbarui tiap insert/delete
+        self._puts_since_sweep = 0
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    def _connect(self):
+        """Buka database saat pertama dipakai"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            self._conn = sqlite3.connect(self.filepath, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    kpj TEXT NOT NULL,
+                    portal TEXT NOT NULL,
+                    positive INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (kpj, portal)
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_result_cache_access ON result_cache (last_access)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_result_cache_expires ON result_cache (expires_at)"
+            )
+            self._conn.commit()
+            self._sync_total(self._conn)
+        return self._conn
+    
+    def _sync_total(self, conn):
+        """Hitung ulang total byte dari tabel (saat buka dan tiap sweep, bukan tiap put)"""
+        self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM result_cache").fetchone()[0]
+    
+    def _delete(self, conn, kpj, portal):
+        """Hapus satu entri dan kurangi total byte"""
+        row = conn.execute(
+            "SELECT size FROM result_cache WHERE kpj = ? AND portal = ?", (kpj, portal)
+        ).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM result_cache WHERE kpj = ? AND portal = ?", (kpj, portal))
+            self._total_bytes -= row[0]
+    
+    def get(self, kpj, portal):
+        """
+        Ambil hasil yang masih berlaku
+        Returns: result dict or None
+        """
+        if not self.enabled:
+            return None
+        
+        try:
+            with self._lock:
+                conn = self._connect()
+                now = time.time()
+                row = conn.execute(
+                    "SELECT payload, expires_at FROM result_cache WHERE kpj = ? AND portal = ?",
+                    (kpj, portal)
+                ).fetchone()
+                
+                if row is None:
+                    self.stats["misses"] += 1
+                    return None
+                
+                payload, expires_at = row
+                if expires_at <= now:
+                    self._delete(conn, kpj, portal)
+                    conn.commit()
+                    self.stats["expired"] += 1
+                    self.stats["misses"] += 1
+                    return None
+                
+                conn.execute(
+                    "UPDATE result_cache SET last_access = ? WHERE kpj = ? AND portal = ?",
+                    (now, kpj, portal)
+                )
+                conn.commit()
+                self.stats["hits"] += 1
+            
+            return json.loads(payload)
+        
+        except Exception as e:
+            log_error(f"Cache read error: {str(e)}")
+            return None
+    
+    def put(self, kpj, portal, result, positive):
+        """Simpan hasil dengan TTL positif/negatif"""
+        if not self.enabled:
+            return False
+        
+        try:
+            payload = json.dumps(result, ensure_ascii=False, default=str)
+            now = time.time()
+            ttl = self.ttl_positive if positive else self.ttl_negative
+            
+            with self._lock:
+                conn = self._connect()
+                self._delete(conn, kpj, portal)  # entri lama (jika ada) keluar dari total
+                conn.execute(
+                    "INSERT OR REPLACE INTO result_cache "
+                    "(kpj, portal, positive, payload, size, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (kpj, portal, 1 if positive else 0, payload, len(payload), now + ttl, now)
+                )
+                self._total_bytes += len(payload)
+                self._evict(conn)
+                conn.commit()
+            return True
+        
+        except Exception as e:
+            log_error(f"Cache write error: {str(e)}")
+            return False
+    
+    def _evict(self, conn):
+        """
+        Tiap RESULT_CACHE_SWEEP_EVERY put: hapus entri kedaluwarsa dan sinkronkan total;
+        lalu hapus entri LRU per batch sampai di bawah max_bytes
+        """
+        self._puts_since_sweep += 1
+        if self._puts_since_sweep >= RESULT_CACHE_SWEEP_EVERY:
+            self._puts_since_sweep = 0
+            conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (time.time(),))
+            self._sync_total(conn)
+        
+        evicted = 0
+        while self._total_bytes > self.max_bytes:
+            rows = conn.execute(
+                "SELECT kpj, portal, size FROM result_cache ORDER BY last_access ASC LIMIT ?",
+                (RESULT_CACHE_EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            for kpj, portal, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM result_cache WHERE kpj = ? AND portal = ?", (kpj, portal))
+                self._total_bytes -= size
+                evicted += 1
+        
+        self.stats["evicted"] += evicted
+        if evicted:
+            log_info(f"🗑️ Cache: {evicted} entri LRU dihapus")
+    
+    def invalidate(self, kpj, portal=None):
+        """Hapus entri untuk KPJ (semua portal jika portal=None)"""
+        with self._lock:
+            conn = self._connect()
+            if portal is None:
+                size = conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM result_cache WHERE kpj = ?", (kpj,)
+                ).fetchone()[0]
+                conn.execute("DELETE FROM result_cache WHERE kpj = ?", (kpj,))
+                self._total_bytes -= size
+            else:
+                self._delete(conn, kpj, portal)
+            conn.commit()
+    
+    def clear(self):
+        """Kosongkan seluruh cache"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM result_cache")
+            conn.commit()
+            self._total_bytes = 0
+        log_info("Cache hasil dikosongkan")
+    
+    def get_stats(self):
+        """Statistik cache"""
+        stats = self.stats.copy()
+        try:
+            with self._lock:
+                entries, total = self._connect().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM result_cache"
+                ).fetchone()
+            stats.update({"entries": entries, "bytes": total})
+        except Exception as e:
+            log_warning(f"Cache stats error: {str(e)}")
+        return stats
+    
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# Global cache instance (database dibuka saat pertama dipakai)
+result_cache = ResultCache()
+
+# Convenience functions
+def get_cached_result(kpj, portal):
+    return result_cache.get(kpj, portal)
+
+def cache_result(kpj, portal, result, positive):
+    return result_cache.put(kpj, portal, result, positive)
+
+def clear_result_cache():
+    result_cache.clear()
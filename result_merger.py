@@ -0,0 +1,208 @@
+"""
+BPJS AUTOMATION - RESULT MERGER
+Gabungkan banyak file hasil (hasil_real_*.csv, hasil_real_autosave_*.csv)
+dengan external k-way merge: urut KPJ/timestamp, simpan record terbaru per KPJ,
+memori dibatasi ukuran run
+"""
+
+import os
+import json
+import glob
+import heapq
+import shutil
+import tempfile
+from datetime import datetime
+from config import (
+    CSV_FOLDER, CSV_ENCODING, MERGE_FILE_PATTERNS, MERGE_OUTPUT_PREFIX,
+    MERGE_RUN_SIZE, MERGE_MAX_FANIN, MERGE_KEY_FIELD, MERGE_TIME_FIELD
+)
+from logger import log_info, log_warning
+from csv_index import IndexedCSVReader
+from exporter import export_records_atomic
+
+def find_result_files(folder=CSV_FOLDER, patterns=MERGE_FILE_PATTERNS, exclude=()):
+    """File hasil di folder (urut nama = urut waktu pembuatan)"""
+    exclude = {os.path.abspath(path) for path in exclude}
+    found = set()
+    for pattern in patterns:
+        found.update(glob.glob(os.path.join(folder, pattern)))
+    return sorted(path for path in found if os.path.abspath(path) not in exclude)
+
+class ResultMerger:
+    """
+    Fase 1: baca file per run (maks run_size baris), urutkan, tulis ke file run sementara
+    Fase 2: merge run (maks max_fanin file terbuka sekaligus), buang duplikat KPJ
+    """
+    
+    def __init__(self, run_size=MERGE_RUN_SIZE, max_fanin=MERGE_MAX_FANIN,
+                 key_field=MERGE_KEY_FIELD, time_field=MERGE_TIME_FIELD):
+        self.run_size = run_size
+        self.max_fanin = max(2, max_fanin)
+        self.key_field = key_field
+        self.time_field = time_field
+        self.stats = {}
+    
+    def _sort_key(self, entry):
+        # entry: [kpj, timestamp, urutan_masuk, record]
+        return entry[0], entry[1], entry[2]
+    
+    def _write_run(self, entries, temp_dir):
+        """Satu run terurut sebagai JSON Lines (kolom tiap file boleh berbeda)"""
+        entries.sort(key=self._sort_key)
+        fd, path = tempfile.mkstemp(suffix=".run", dir=temp_dir)
+        with os.fdopen(fd, "w", encoding=CSV_ENCODING) as f:
+            dumps = json.dumps
+            f.writelines(dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        return path
+    
+    def _read_run(self, path):
+        with open(path, "r", encoding=CSV_ENCODING) as f:
+            for line in f:
+                yield json.loads(line)
+    
+    def _make_runs(self, paths, temp_dir):
+        """
+        Returns: (path run, kolom gabungan urut kemunculan)
+        """
+        runs = []
+        columns = {}
+        entries = []
+        sequence = 0
+        
+        for path in paths:
+            reader = IndexedCSVReader(path)
+            # Batas sebelum file ini: file yang gagal di tengah dibatalkan seluruhnya
+            runs_mark, sequence_mark, skipped_mark = len(runs), sequence, self.stats["skipped"]
+            try:
+                for row in reader.iter_rows():
+                    key = row.get(self.key_field)
+                    if not key:
+                        self.stats["skipped"] += 1
+                        continue
+                    sequence += 1
+                    entries.append([key, row.get(self.time_field) or "", sequence, row])
+                    if len(entries) >= self.run_size:
+                        runs.append(self._write_run(entries, temp_dir))
+                        entries = []
+            except Exception as e:
+                log_warning(f"File dilewati ({os.path.basename(path)}): {str(e)}")
+                self.stats["failed_files"] += 1
+                runs[runs_mark:] = self._drop_from_runs(runs[runs_mark:], sequence_mark, temp_dir)
+                entries = [entry for entry in entries if entry[2] <= sequence_mark]
+                sequence = sequence_mark
+                self.stats["skipped"] = skipped_mark
+                continue
+            
+            for column in reader.columns or []:
+                columns.setdefault(column, None)
+            self.stats["files"] += 1
+        
+        if entries:
+            runs.append(self._write_run(entries, temp_dir))
+        
+        self.stats["rows_in"] = sequence
+        return runs, list(columns)
+    
+    def _drop_from_runs(self, runs, sequence_mark, temp_dir):
+        """
+        Buang entry dengan urutan > sequence_mark dari run yang ditulis sejak mark
+        (hanya run pertama bisa berisi entry file sebelumnya)
+        Returns: run yang tersisa
+        """
+        kept_runs = []
+        for path in runs:
+            kept = [entry for entry in self._read_run(path) if entry[2] <= sequence_mark]
+            os.remove(path)
+            if kept:
+                kept_runs.append(self._write_run(kept, temp_dir))
+        return kept_runs
+    
+    def _merge_runs(self, runs):
+        return heapq.merge(*(self._read_run(path) for path in runs), key=self._sort_key)
+    
+    def _reduce_runs(self, runs, temp_dir):
+        """Merge bertingkat sampai jumlah run <= max_fanin (batas file terbuka)"""
+        while len(runs) > self.max_fanin:
+            merged = []
+            for i in range(0, len(runs), self.max_fanin):
+                group = runs[i:i + self.max_fanin]
+                fd, path = tempfile.mkstemp(suffix=".run", dir=temp_dir)
+                with os.fdopen(fd, "w", encoding=CSV_ENCODING) as f:
+                    for entry in self._merge_runs(group):
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                for old in group:
+                    os.remove(old)
+                merged.append(path)
+            runs = merged
+        return runs
+    
+    def _latest_per_key(self, entries):
+        """Entry terurut -> record terakhir (timestamp terbaru) per KPJ"""
+        current = None
+        for entry in entries:
+            if current is not None and entry[0] != current[0]:
+                yield current[3]
+            elif current is not None:
+                self.stats["duplicates"] += 1
+            current = entry
+        if current is not None:
+            yield current[3]
+    
+    def merge(self, paths, output_path):
+        """
+        Gabungkan file CSV ke output_path (ditulis atomik)
+        Returns: stats dict (files, rows_in, rows_out, duplicates, ...)
+        """
+        self.stats = {"files": 0, "failed_files": 0, "rows_in": 0, "rows_out": 0,
+                      "duplicates": 0, "skipped": 0, "runs": 0}
+        output_dir = os.path.dirname(output_path) or "."
+        os.makedirs(output_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix=".merge_", dir=output_dir)
+        
+        try:
+            runs, columns = self._make_runs(paths, temp_dir)
+            self.stats["runs"] = len(runs)
+            runs = self._reduce_runs(runs, temp_dir)
+            
+            records = self._latest_per_key(self._merge_runs(runs))
+            self.stats["rows_out"] = export_records_atomic(records, output_path, "csv", columns=columns)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        
+        log_info(f"🧩 Merge {self.stats['files']} file: {self.stats['rows_in']} -> "
+                 f"{self.stats['rows_out']} record ({self.stats['duplicates']} duplikat) -> {output_path}")
+        return self.stats
+
+def merge_result_folder(folder=CSV_FOLDER, output_path=None, run_size=MERGE_RUN_SIZE):
+    """Gabungkan semua file hasil di folder menjadi satu file hasil_real_gabungan_*.csv"""
+    if output_path is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = os.path.join(folder, f"{MERGE_OUTPUT_PREFIX}{timestamp}.csv")
+    
+    paths = find_result_files(folder, exclude=[output_path])
+    if not paths:
+        log_warning(f"Tidak ada file hasil di {folder}")
+        return None
+    
+    return ResultMerger(run_size=run_size).merge(paths, output_path)
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Gabungkan file hasil BPJS (dedupe per KPJ)")
+    parser.add_argument("files", nargs="*", help="file CSV (default: semua file hasil di --folder)")
+    parser.add_argument("--folder", default=CSV_FOLDER)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--run-size", type=int, default=MERGE_RUN_SIZE)
+    args = parser.parse_args(argv)
+    
+    if args.files:
+        output_path = args.output or os.path.join(
+            args.folder, f"{MERGE_OUTPUT_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        )
+        stats = ResultMerger(run_size=args.run_size).merge(args.files, output_path)
+    else:
+        stats = merge_result_folder(args.folder, args.output, args.run_size)
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
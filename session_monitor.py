@@ -0,0 +1,141 @@
+"""
+BPJS AUTOMATION - SESSION MONITOR
+Deteksi sesi login portal yang berakhir dan jeda batch sampai login ulang
+"""
+
+import threading
+from datetime import datetime
+from config import (
+    SESSION_EXPIRED_URL_MARKERS, SESSION_EXPIRED_TEXT_MARKERS,
+    SESSION_RELOGIN_TIMEOUT
+)
+from logger import log_info, log_error, log_warning
+
+SESSION_EXPIRED_ERROR = "SESSION_EXPIRED"
+
+class SessionMonitor:
+    """State sesi login manual (ACTIVE / EXPIRED) untuk satu portal"""
+    
+    def __init__(self, portal="sipp"):
+        self.portal = portal
+        self.state = "ACTIVE"
+        self.reason = None
+        self.expired_at = None
+        self.expired_count = 0
+        self.listeners = []
+        self._active_event = threading.Event()
+        self._active_event.set()
+    
+    def is_expired(self):
+        return self.state == "EXPIRED"
+    
+    def add_listener(self, listener):
+        """listener(state, reason) dipanggil saat state berubah"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+    
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+    
+    def check_url(self, url):
+        """Cek apakah URL adalah halaman login (redirect karena sesi habis)"""
+        url_lower = (url or "").lower()
+        for marker in SESSION_EXPIRED_URL_MARKERS:
+            if marker in url_lower:
+                return marker
+        return None
+    
+    def check_text(self, text):
+        """Cek teks halaman/hasil ekstraksi untuk penanda sesi habis"""
+        text_lower = (text or "").lower()
+        for marker in SESSION_EXPIRED_TEXT_MARKERS:
+            if marker in text_lower:
+                return marker
+        return None
+    
+    def on_page_finished(self, url):
+        """
+        Dipanggil dari AutomatorWebViewClient.onPageFinished
+        Login page -> EXPIRED, halaman lain setelah EXPIRED -> ACTIVE
+        """
+        marker = self.check_url(url)
+        if marker:
+            self.mark_expired(f"Redirect ke halaman login ({marker}): {url}")
+        elif self.is_expired():
+            self.mark_restored(f"Halaman non-login dimuat: {url}")
+    
+    def check_extraction_result(self, data):
+        """
+        Cek hasil ekstraksi JS (dict) untuk penanda sesi habis
+        Returns: True jika sesi terdeteksi habis
+        """
+        if not isinstance(data, dict):
+            return False
+        
+        marker = self.check_url(data.get("url"))
+        if not marker:
+            parts = [data.get("pageTitle") or ""]
+            parts.extend(c.get("text", "") for c in data.get("containers", []) if isinstance(c, dict))
+            marker = self.check_text(" ".join(parts))
+        
+        if marker:
+            self.mark_expired(f"Penanda sesi habis di hasil ekstraksi: {marker}")
+            return True
+        return False
+    
+    def mark_expired(self, reason):
+        """Tandai sesi habis dan jeda batch"""
+        if self.is_expired():
+            return
+        
+        self.state = "EXPIRED"
+        self.reason = reason
+        self.expired_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.expired_count += 1
+        self._active_event.clear()
+        
+        log_warning(f"🔐 Sesi login {self.portal.upper()} berakhir: {reason}")
+        self._notify()
+    
+    def mark_restored(self, reason="Login ulang"):
+        """Tandai sesi aktif kembali dan lanjutkan batch"""
+        if not self.is_expired():
+            return
+        
+        self.state = "ACTIVE"
+        self.reason = reason
+        self._active_event.set()
+        
+        log_info(f"🔓 Sesi login {self.portal.upper()} aktif kembali: {reason}")
+        self._notify()
+    
+    def wait_until_active(self, timeout=SESSION_RELOGIN_TIMEOUT):
+        """
+        Blok sampai sesi aktif kembali
+        Returns: True jika aktif, False jika timeout
+        """
+        if not self.is_expired():
+            return True
+        
+        log_info(f"⏸️ Batch dijeda, menunggu login ulang {self.portal.upper()} (maks {timeout // 60} menit)")
+        return self._active_event.wait(timeout)
+    
+    def _notify(self):
+        for listener in list(self.listeners):
+            try:
+                listener(self.state, self.reason)
+            except Exception as e:
+                log_error(f"Session listener error: {str(e)}")
+
+# Global session monitor instance (SIPP, portal utama)
+session_monitor = SessionMonitor("sipp")
+
+# Sesi login tiap portal terpisah (pipeline: WebView sendiri per portal)
+session_monitors = {"sipp": session_monitor}
+
+def get_session_monitor(portal):
+    """SessionMonitor untuk portal, dibuat saat pertama dipakai"""
+    if portal not in session_monitors:
+        session_monitors[portal] = SessionMonitor(portal)
+    return session_monitors[portal]
@@ -41,7 +41,15 @@ def main():
     print("1. Edit URL di config.py (jika perlu)")
     print("2. Jalankan: python main.py")
     print("3. Input KPJ, klik START, export CSV")
+    print("4. Tanpa UI (server): python setup.py batch kpj.txt [--concurrency 4]")
     print("="*50)
 
+def batch(argv):
+    """Entry point batch tanpa Kivy (lihat batch_cli.py)"""
+    from batch_cli import main as batch_main
+    return batch_main(argv)
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(batch(sys.argv[2:]))
     main()
\ No newline at end of file
@@ -91,19 +91,33 @@ class UIBuilder:
             spacing=dp(10)
         )
         
-        # Input label
+        # Input header: label + tombol file KPJ (TXT/CSV/XLSX, diproses streaming)
+        input_header = BoxLayout(
+            orientation='horizontal',
+            size_hint_y=None,
+            height=dp(30)
+        )
+        
         input_label = HeaderLabel(
             text="Input KPJ List",
             font_size=sp(18),
             halign='left',
-            size_hint_y=None,
-            height=dp(30)
+            size_hint_x=0.7
+        )
+        
+        file_button = PrimaryButton(
+            text="📂 FILE",
+            size_hint_x=0.3
         )
+        file_button.bind(on_press=app_instance.open_file_picker)
+        
+        input_header.add_widget(input_label)
+        input_header.add_widget(file_button)
         
         # KPJ input field
         app_instance.kpj_input = KPJInput()
         
-        input_layout.add_widget(input_label)
+        input_layout.add_widget(input_header)
         input_layout.add_widget(app_instance.kpj_input)
         
         return input_layout
@@ -395,6 +409,8 @@ class UIBuilder:
                 "success_rate": "0%",
                 "current_kpj": "None",
                 "status": "Idle",
-                "time": "00:00:00"
+                "time": "00:00:00",
+                "speed": "-",
+                "eta": "-"
             }
             UIBuilder.update_stats_panel(app_instance, default_stats)
\ No newline at end of file
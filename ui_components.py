@@ -223,13 +223,30 @@ class CustomProgressBar(ProgressBar):
 class StatsPanel(GridLayout):
     """Statistics display panel"""
     
+    # (label, default value): one grid row per item
+    STAT_ITEMS = [
+        ("Total Processed", "0"),
+        ("Successful", "0"),
+        ("Skipped", "0"),
+        ("Failed", "0"),
+        ("Success Rate", "0%"),
+        ("Current KPJ", "None"),
+        ("Status", "Idle"),
+        ("Time", "00:00:00"),
+        ("Speed", "-"),
+        ("ETA", "-")
+    ]
+    ROW_HEIGHT = dp(22)
+    
     def __init__(self, **kwargs):
+        rows = len(self.STAT_ITEMS)
         kwargs.setdefault('cols', 2)
-        kwargs.setdefault('rows', 4)
-        kwargs.setdefault('size_hint_y', None)
-        kwargs.setdefault('height', dp(150))
+        kwargs.setdefault('rows', rows)
         kwargs.setdefault('padding', dp(10))
         kwargs.setdefault('spacing', dp(5))
+        kwargs.setdefault('size_hint_y', None)
+        # Height follows the row count (no empty grid rows)
+        kwargs.setdefault('height', rows * self.ROW_HEIGHT + (rows - 1) * kwargs['spacing'] + 2 * kwargs['padding'])
         super().__init__(**kwargs)
         
         with self.canvas.before:
@@ -251,18 +268,7 @@ class StatsPanel(GridLayout):
     
     def create_stat_items(self):
         """Create statistic display items"""
-        stats = [
-            ("Total Processed", "0"),
-            ("Successful", "0"),
-            ("Skipped", "0"),
-            ("Failed", "0"),
-            ("Success Rate", "0%"),
-            ("Current KPJ", "None"),
-            ("Status", "Idle"),
-            ("Time", "00:00:00")
-        ]
-        
-        for label, value in stats:
+        for label, value in self.STAT_ITEMS:
             # Label
             lbl = CustomLabel(
                 text=f"[b]{label}:[/b]",
@@ -392,6 +398,27 @@ class SettingsPopup(Popup):
         
         content.add_widget(url_box)
         
+        # Diagnostics Settings
+        from profiler import is_profiling_enabled
+        
+        diag_box = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(40))
+        diag_box.add_widget(CustomLabel(text='Profiler CPU (batch berikutnya)', size_hint_x=0.8))
+        
+        self.profiler_checkbox = CheckBox(active=is_profiling_enabled(), size_hint_x=0.2)
+        diag_box.add_widget(self.profiler_checkbox)
+        
+        content.add_widget(diag_box)
+        
+        from memory_monitor import is_memory_diagnostics_enabled
+        
+        mem_box = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(40))
+        mem_box.add_widget(CustomLabel(text='Diagnostik memori (tracemalloc)', size_hint_x=0.8))
+        
+        self.memory_checkbox = CheckBox(active=is_memory_diagnostics_enabled(), size_hint_x=0.2)
+        mem_box.add_widget(self.memory_checkbox)
+        
+        content.add_widget(mem_box)
+        
         # Buttons
         button_box = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10))
         
@@ -418,6 +445,12 @@ class SettingsPopup(Popup):
             log_info(f"DPT URL: {self.dpt_input.text}")
             log_info(f"LAPAK URL: {self.lapak_input.text}")
             
+            from profiler import set_profiling_enabled
+            set_profiling_enabled(self.profiler_checkbox.active)
+            
+            from memory_monitor import set_memory_diagnostics_enabled
+            set_memory_diagnostics_enabled(self.memory_checkbox.active)
+            
             self.dismiss()
         except Exception as e:
             from logger import log_error
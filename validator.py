@@ -4,6 +4,7 @@ Validates all input data and formats
 """
 
 import re
+from array import array
 from datetime import datetime
 from config import (
     KPJ_MIN_LENGTH, KPJ_MAX_LENGTH, KPJ_ALLOWED_CHARS,
@@ -11,6 +12,18 @@ from config import (
     validate_kpj as config_validate_kpj
 )
 
+# Pola KPJ dikompilasi sekali untuk validasi massal
+KPJ_PATTERN = re.compile(
+    r'[%s]{%d,%d}' % (re.escape(KPJ_ALLOWED_CHARS), KPJ_MIN_LENGTH, KPJ_MAX_LENGTH)
+)
+
+# Pola untuk mencari KPJ di dalam teks (batas kata seperti \b, hanya ASCII)
+KPJ_SCAN_PATTERN = re.compile(
+    r'(?<![0-9A-Za-z_])[%s]{%d,%d}(?![0-9A-Za-z_])' % (
+        re.escape(KPJ_ALLOWED_CHARS), KPJ_MIN_LENGTH, KPJ_MAX_LENGTH
+    )
+)
+
 class DataValidator:
     """Data validation and sanitization"""
     
@@ -40,6 +53,50 @@ class DataValidator:
         
         return valid, invalid
     
+    @staticmethod
+    def validate_kpj_bulk(kpj_list):
+        """
+        Validate a large list of KPJs in one pass
+        Duplicates are dropped (first occurrence kept, order preserved)
+        Returns: {
+            "valid": unique valid KPJs,
+            "valid_indices": array of input indices of "valid",
+            "invalid_indices": array of input indices of invalid KPJs,
+            "duplicate_count": number of dropped duplicates,
+            "error_counts": {error_message: count}
+        }
+        """
+        valid = []
+        valid_indices = array('L')
+        invalid_indices = array('L')
+        error_counts = {}
+        seen = set()
+        duplicate_count = 0
+        
+        fullmatch = KPJ_PATTERN.fullmatch
+        
+        for index, kpj in enumerate(kpj_list):
+            if kpj and fullmatch(kpj):
+                if kpj in seen:
+                    duplicate_count += 1
+                    continue
+                seen.add(kpj)
+                valid.append(kpj)
+                valid_indices.append(index)
+            else:
+                # Jalur lambat hanya untuk KPJ tidak valid (pesan error sama)
+                _, message = config_validate_kpj(kpj)
+                error_counts[message] = error_counts.get(message, 0) + 1
+                invalid_indices.append(index)
+        
+        return {
+            "valid": valid,
+            "valid_indices": valid_indices,
+            "invalid_indices": invalid_indices,
+            "duplicate_count": duplicate_count,
+            "error_counts": error_counts
+        }
+    
     @staticmethod
     def validate_nik(nik):
         """Validate NIK format"""
@@ -162,18 +219,9 @@ class DataValidator:
     @staticmethod
     def extract_kpj_from_text(text):
         """Extract KPJs from text"""
-        # Find all sequences of digits with length between min and max
-        pattern = r'\b\d{%d,%d}\b' % (KPJ_MIN_LENGTH, KPJ_MAX_LENGTH)
-        matches = re.findall(pattern, text)
-        
-        # Filter valid KPJs
-        valid_kpjs = []
-        for match in matches:
-            is_valid, _ = DataValidator.validate_kpj(match)
-            if is_valid:
-                valid_kpjs.append(match)
-        
-        return valid_kpjs
+        # Pola scan sudah menjamin panjang & karakter valid, tanpa validasi ulang
+        from kpj_scanner import scan_buffer
+        return [kpj for kpj, _ in scan_buffer(text, dedupe=False)]
     
     @staticmethod
     def validate_workflow_data(data):
@@ -253,6 +301,9 @@ def validate_kpj(kpj):
 def validate_kpj_list(kpj_list):
     return validator.validate_kpj_list(kpj_list)
 
+def validate_kpj_bulk(kpj_list):
+    return validator.validate_kpj_bulk(kpj_list)
+
 def sanitize_text(text):
     return validator.sanitize_text(text)
 
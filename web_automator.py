@@ -5,10 +5,47 @@ Untuk automate browser setelah login manual
 
 import time
 import json
+import threading
+from collections import deque
+from concurrent.futures import Future
 from datetime import datetime
 from android.runnable import run_on_ui_thread
 from jnius import autoclass, PythonJavaClass, java_method
+from config import (
+    REQUEST_TIMEOUT, READY_POLL_INTERVAL, RESULT_READY_TIMEOUT, LOAD_TIME_HISTORY,
+    JS_CHUNK_SIZE
+)
 from logger import log_info, log_error, log_warning
+from session_monitor import get_session_monitor, SESSION_EXPIRED_ERROR
+from request_policy import request_policy, BLOCK, CACHE
+from callback_registry import CallbackRegistry
+from bridge_transfer import ChunkedResult, build_stream_call
+
+# Elemen hasil pencarian (ditandai data-bpjs-stale sebelum klik)
+RESULT_ELEMENT_SELECTOR = 'table, .data-table, .result-container, .search-result, [class*="result"]'
+
+# Hasil siap: dokumen selesai dimuat, tidak ada indikator loading,
+# dan ada elemen hasil baru (belum ditandai stale)
+RESULT_READY_PREDICATE_JS = """
+function() {
+    if(document.readyState !== 'complete') return false;
+    var busy = document.querySelectorAll('.loading, .spinner, .progress, [aria-busy="true"]');
+    for(var i = 0; i < busy.length; i++) {
+        if(busy[i].offsetParent !== null) return false;
+    }
+    var fresh = document.querySelectorAll('%s');
+    for(var j = 0; j < fresh.length; j++) {
+        if(!fresh[j].hasAttribute('data-bpjs-stale')) return true;
+    }
+    return false;
+}
+""" % RESULT_ELEMENT_SELECTOR.replace("'", "\\'")
+
+def _error_message(data, default):
+    """Pesan error dari hasil JS (dict) atau string (mis. JS_TIMEOUT)"""
+    if isinstance(data, dict):
+        return data.get('error', default)
+    return data or default
 
 # Android WebView classes
 WebView = autoclass('android.webkit.WebView')
@@ -16,15 +53,59 @@ WebViewClient = autoclass('android.webkit.WebViewClient')
 WebSettings = autoclass('android.webkit.WebSettings')
 LayoutParams = autoclass('android.view.ViewGroup$LayoutParams')
 PythonActivity = autoclass('org.kivy.android.PythonActivity')
+WebResourceResponse = autoclass('android.webkit.WebResourceResponse')
+ByteArrayInputStream = autoclass('java.io.ByteArrayInputStream')
+FileInputStream = autoclass('java.io.FileInputStream')
+CookieManager = autoclass('android.webkit.CookieManager')
 
 class WebAutomator:
     """Real web automation engine"""
     
-    def __init__(self):
+    def __init__(self, portal="sipp"):
+        self.portal = portal
         self.webview = None
-        self.callbacks = {}
+        self.callbacks = CallbackRegistry()
+        self.transfers = {}  # callback_id -> ChunkedResult
+        self._transfers_lock = threading.Lock()
         self.is_ready = False
+        self.init_requested = False
         self.current_url = ""
+        self.user_agent = None
+        
+        # Navigasi yang menunggu onPageFinished (FIFO, redirect bisa ubah URL)
+        self.pending_loads = deque()
+        self.load_times = {}
+        self._loads_lock = threading.Lock()
+        
+        # Sesi login portal ini saja; tampilkan WebView ini untuk login ulang saat habis
+        self.session = get_session_monitor(portal)
+        self.session.add_listener(self.on_session_state_changed)
+    
+    def on_session_state_changed(self, state, reason):
+        """Listener sesi portal ini: tampilkan/sembunyikan WebView"""
+        self.set_webview_visible(state == "EXPIRED")
+    
+    @run_on_ui_thread
+    def set_webview_visible(self, visible):
+        """Full screen untuk login ulang, 1x1 tersembunyi untuk automation"""
+        if not self.webview:
+            return
+        
+        if visible:
+            self.webview.setLayoutParams(LayoutParams(-1, -1))  # MATCH_PARENT
+            self.webview.setVisibility(0)  # VISIBLE
+            log_info("🔐 WebView ditampilkan untuk login ulang")
+        else:
+            self.webview.setLayoutParams(LayoutParams(1, 1))
+            self.webview.setVisibility(4)  # INVISIBLE
+            log_info("WebView disembunyikan kembali")
+    
+    def ensure_webview(self):
+        """Buat WebView sekali saja (dipanggil saat batch pertama dimulai)"""
+        if self.init_requested:
+            return
+        self.init_requested = True
+        self.init_webview()
         
     @run_on_ui_thread
     def init_webview(self):
@@ -42,6 +123,7 @@ class WebAutomator:
             settings.setDatabaseEnabled(True)
             settings.setAllowFileAccess(True)
             settings.setAllowContentAccess(True)
+            self.user_agent = settings.getUserAgentString()
             
             # Set WebViewClient
             self.webview.setWebViewClient(AutomatorWebViewClient(self))
@@ -66,6 +148,7 @@ class WebAutomator:
             
         except Exception as e:
             log_error(f"❌ Failed to init WebView: {str(e)}")
+            self.init_requested = False
             return False
     
     @run_on_ui_thread
@@ -76,9 +159,178 @@ class WebAutomator:
             self.current_url = url
             log_info(f"🌐 Loading URL: {url}")
     
+    def navigate(self, url, ready_predicate_js=None, timeout=REQUEST_TIMEOUT):
+        """
+        Load URL dan kembalikan Future yang selesai saat halaman siap
+        ready_predicate_js: fungsi JS opsional yang harus return true (DOM siap)
+        Future result: {"url", "load_time"}; exception TimeoutError jika lewat timeout
+        """
+        future = Future()
+        load = {
+            "requested_url": url,
+            "future": future,
+            "predicate": ready_predicate_js,
+            "started": time.monotonic(),
+            "deadline": time.monotonic() + timeout
+        }
+        
+        with self._loads_lock:
+            self.pending_loads.append(load)
+        
+        timer = threading.Timer(timeout, self._expire_load, args=(load, timeout))
+        timer.daemon = True
+        timer.start()
+        future.add_done_callback(lambda f: timer.cancel())
+        
+        self.load_url(url)
+        return future
+    
+    def _expire_load(self, load, timeout):
+        """Timeout navigasi"""
+        with self._loads_lock:
+            if load in self.pending_loads:
+                self.pending_loads.remove(load)
+        
+        if not load["future"].done():
+            log_warning(f"⏱️ Page load timeout {timeout} detik: {load['requested_url']}")
+            load["future"].set_exception(TimeoutError(f"Page load timeout: {load['requested_url']}"))
+    
+    def intercept_request(self, request):
+        """
+        Dipanggil dari shouldInterceptRequest (thread background WebView)
+        Returns: WebResourceResponse, atau None untuk dimuat normal
+        """
+        # Saat login ulang WebView terlihat: muat halaman apa adanya (captcha dll)
+        if self.session.is_expired():
+            return None
+        
+        try:
+            url = request.getUrl().toString()
+            headers = request.getRequestHeaders()
+            accept = headers.get("Accept") if headers else None
+            action, kind = request_policy.classify(url, request.getMethod(), accept or "")
+            
+            if action == BLOCK:
+                return WebResourceResponse("text/plain", "utf-8", ByteArrayInputStream(b""))
+            
+            if action == CACHE:
+                fetch_headers = {}
+                cookie = self.get_cookies(url)
+                if cookie:
+                    fetch_headers["Cookie"] = cookie
+                if self.user_agent:
+                    fetch_headers["User-Agent"] = self.user_agent
+                
+                cached = request_policy.get_cached_asset(url, fetch_headers)
+                if cached:
+                    path, mime_type = cached
+                    return WebResourceResponse(mime_type, "utf-8", FileInputStream(path))
+        
+        except Exception as e:
+            log_warning(f"Intercept request error: {str(e)}")
+        
+        return None
+    
+    def get_cookies(self, url):
+        """Cookie login dari cookie store WebView (format header Cookie)"""
+        try:
+            return CookieManager.getInstance().getCookie(url)
+        except Exception as e:
+            log_warning(f"Gagal ambil cookie WebView: {str(e)}")
+            return None
+    
+    def get_request_stats(self):
+        """Statistik request yang diblokir/di-cache"""
+        return request_policy.get_stats()
+    
+    def on_page_finished(self, url):
+        """Dipanggil AutomatorWebViewClient.onPageFinished: selesaikan navigasi tertua"""
+        with self._loads_lock:
+            load = self.pending_loads.popleft() if self.pending_loads else None
+        
+        if load is None or load["future"].done():
+            return
+        
+        if load["predicate"]:
+            # Halaman selesai dimuat, tunggu predikat DOM siap
+            remaining = max(load["deadline"] - time.monotonic(), 0)
+            ready = self.wait_until(load["predicate"], timeout=remaining)
+            ready.add_done_callback(lambda f: self._finish_load(load, url, f))
+        else:
+            self._finish_load(load, url)
+    
+    def _finish_load(self, load, url, ready_future=None):
+        """Catat waktu muat dan selesaikan Future navigasi"""
+        future = load["future"]
+        if future.done():
+            return
+        
+        if ready_future is not None and ready_future.exception() is not None:
+            future.set_exception(ready_future.exception())
+            return
+        
+        load_time = time.monotonic() - load["started"]
+        self._record_load_time(url, load_time)
+        log_info(f"⏱️ Halaman siap dalam {load_time:.2f} detik: {url}")
+        future.set_result({"url": url, "load_time": round(load_time, 3)})
+    
+    def wait_until(self, predicate_js, timeout=RESULT_READY_TIMEOUT, interval=READY_POLL_INTERVAL):
+        """
+        Poll fungsi JS sampai return true
+        Returns: Future (result: waktu tunggu dalam detik, exception TimeoutError)
+        """
+        future = Future()
+        started = time.monotonic()
+        
+        def poll():
+            if future.done():
+                return
+            self.execute_javascript(predicate_js, on_result)
+        
+        def on_result(success, data):
+            if future.done():
+                return
+            elapsed = time.monotonic() - started
+            if success and data is True:
+                future.set_result(round(elapsed, 3))
+            elif elapsed >= timeout:
+                future.set_exception(TimeoutError(f"Kondisi tidak terpenuhi dalam {timeout} detik"))
+            else:
+                timer = threading.Timer(interval, poll)
+                timer.daemon = True
+                timer.start()
+        
+        poll()
+        return future
+    
+    def _record_load_time(self, url, seconds):
+        """Simpan riwayat waktu muat per URL (tanpa query string)"""
+        key = url.split("?", 1)[0]
+        with self._loads_lock:
+            history = self.load_times.setdefault(key, deque(maxlen=LOAD_TIME_HISTORY))
+            history.append(seconds)
+    
+    def get_load_stats(self):
+        """Statistik waktu muat per URL: count, avg, p50, max (detik)"""
+        stats = {}
+        with self._loads_lock:
+            for key, history in self.load_times.items():
+                ordered = sorted(history)
+                stats[key] = {
+                    "count": len(ordered),
+                    "avg": round(sum(ordered) / len(ordered), 3),
+                    "p50": round(ordered[len(ordered) // 2], 3),
+                    "max": round(ordered[-1], 3)
+                }
+        return stats
+    
     @run_on_ui_thread
-    def execute_javascript(self, js_code, callback=None):
-        """Execute JavaScript di WebView"""
+    def execute_javascript(self, js_code, callback=None, timeout=None):
+        """
+        Execute JavaScript di WebView
+        timeout: deadline callback (default JS_CALLBACK_TIMEOUT), lewat deadline
+        callback dipanggil dengan (False, JS_TIMEOUT_ERROR)
+        """
         if not self.webview or not self.is_ready:
             log_error("❌ WebView not ready")
             if callback:
@@ -88,15 +340,20 @@ class WebAutomator:
         # Generate callback ID
         callback_id = None
         if callback:
-            callback_id = str(int(time.time() * 1000))
-            self.callbacks[callback_id] = callback
+            callback_id = self.callbacks.register(callback, timeout)
             
             # Wrap JS dengan callback handler
             wrapped_js = f"""
             (function() {{
                 try {{
                     var result = ({js_code})();
-                    BPJSBridge.jsResult('{callback_id}', 'success', JSON.stringify(result));
+                    var json = JSON.stringify(result);
+                    if(json === undefined || json.length <= {JS_CHUNK_SIZE}) {{
+                        BPJSBridge.jsResult('{callback_id}', 'success', json);
+                    }} else {{
+                        // Hasil besar: kirim bertahap (lihat bridge_transfer)
+                        {build_stream_call(callback_id)}
+                    }}
                 }} catch(error) {{
                     BPJSBridge.jsResult('{callback_id}', 'error', error.toString());
                 }}
@@ -107,11 +364,44 @@ class WebAutomator:
             # Execute tanpa callback
             self.webview.evaluateJavascript(f"({js_code})();", None)
     
+    def handle_js_chunk(self, callback_id, seq, fragment):
+        """Potongan hasil besar dari BPJSBridge.jsChunk (thread JavaBridge)"""
+        with self._transfers_lock:
+            transfer = self.transfers.get(callback_id)
+            if transfer is None:
+                if not self.callbacks.is_pending(callback_id):
+                    return  # callback sudah timeout
+                # Buang transfer milik callback yang sudah timeout
+                for stale_id in [cid for cid in self.transfers if not self.callbacks.is_pending(cid)]:
+                    del self.transfers[stale_id]
+                transfer = self.transfers[callback_id] = ChunkedResult(callback_id)
+        
+        try:
+            transfer.add(int(seq), fragment)
+        except Exception as e:
+            log_error(f"❌ Transfer hasil JS {callback_id} gagal: {str(e)}")
+            with self._transfers_lock:
+                self.transfers.pop(callback_id, None)
+            callback = self.callbacks.resolve(callback_id)
+            if callback:
+                callback(False, f"Transfer error: {str(e)}")
+    
     def handle_js_result(self, callback_id, status, result):
         """Handle JavaScript result dari WebView"""
-        callback = self.callbacks.pop(callback_id, None)
+        with self._transfers_lock:
+            transfer = self.transfers.pop(callback_id, None)
+        
+        callback = self.callbacks.resolve(callback_id)
         if callback:
-            if status == 'success':
+            if status == 'chunked':
+                try:
+                    if transfer is None:
+                        raise ValueError("tidak ada potongan diterima")
+                    callback(True, transfer.finish(int(result)))
+                except Exception as e:
+                    log_error(f"❌ Transfer hasil JS {callback_id} gagal: {str(e)}")
+                    callback(False, f"Transfer error: {str(e)}")
+            elif status == 'success':
                 try:
                     data = json.loads(result) if result else None
                     callback(True, data)
@@ -120,18 +410,20 @@ class WebAutomator:
             else:
                 callback(False, result)
     
-    def simulate_sipp_automation(self, kpj, callback):
+    def simulate_sipp_automation(self, kpj, callback, field_keyword="kpj"):
         """
         Automate SIPP setelah login manual
-        KPJ: Nomor KPJ yang akan diproses
+        KPJ: Nomor KPJ yang akan diproses (atau NIK untuk DPT)
         callback: Fungsi yang dipanggil setelah selesai
+        field_keyword: kata kunci input pencarian (placeholder/name/id/label)
         """
-        log_info(f"🤖 Starting SIPP automation for KPJ: {kpj}")
+        log_info(f"🤖 Starting {self.portal.upper()} automation for: {kpj}")
         
         # Step 1: Cari input field untuk KPJ
         find_kpj_field_js = """
         function() {
-            console.log('Mencari input field KPJ...');
+            var keyword = %s;
+            console.log('Mencari input field ' + keyword + '...');
             
             // Cari semua input fields
             var inputs = document.querySelectorAll('input[type="text"], input:not([type])');
@@ -145,8 +437,8 @@ class WebAutomator:
                 var label = (input.parentElement.textContent || '').toLowerCase();
                 
                 // Cek apakah ini field KPJ
-                if(placeholder.includes('kpj') || name.includes('kpj') || 
-                   id.includes('kpj') || label.includes('kpj')) {
+                if(placeholder.includes(keyword) || name.includes(keyword) || 
+                   id.includes(keyword) || label.includes(keyword)) {
                     kpjFields.push({
                         element: input,
                         type: 'input',
@@ -188,7 +480,7 @@ class WebAutomator:
                 totalFields: inputs.length
             };
         }
-        """
+        """ % json.dumps(field_keyword.lower())
         
         def handle_field_found(success, data):
             if success and data.get('success'):
@@ -196,12 +488,16 @@ class WebAutomator:
                 if fields:
                     # Gunakan field pertama
                     field = fields[0]
+                    if field.get('id'):
+                        field_selector = f"#{field['id']}"
+                    else:
+                        field_selector = f'input[name="{field.get("name", "")}"]'
                     
                     # Step 2: Isi KPJ ke field
                     fill_kpj_js = f"""
                     function() {{
                         try {{
-                            var field = document.querySelector('{field.id ? '#' + field.id : 'input[name="' + field.name + '"]'}');
+                            var field = document.querySelector('{field_selector}');
                             if(field) {{
                                 // Isi value
                                 field.value = '{kpj}';
@@ -227,11 +523,11 @@ class WebAutomator:
                     """
                     
                     self.execute_javascript(fill_kpj_js, 
-                        lambda s, d: handle_kpj_filled(s, d, kpj, callback))
+                        lambda s, d: self.handle_kpj_filled(s, d, kpj, callback))
                 else:
                     callback(False, "No KPJ fields found")
             else:
-                callback(False, data.get('error', 'Field detection failed'))
+                callback(False, _error_message(data, 'Field detection failed'))
         
         self.execute_javascript(find_kpj_field_js, handle_field_found)
     
@@ -240,9 +536,6 @@ class WebAutomator:
         if success:
             log_info(f"✅ KPJ {kpj} berhasil diisi")
             
-            # Tunggu sebentar
-            time.sleep(1)
-            
             # Step 3: Cari tombol search/cari
             find_search_btn_js = """
             function() {
@@ -305,44 +598,51 @@ class WebAutomator:
                         btn = buttons[0]
                         
                         # Step 4: Klik tombol
-                        click_button_js = """
-                        function() {
-                            try {
-                                var button = arguments[0];
+                        if btn.get('id'):
+                            button_selector = f"#{btn['id']}"
+                        else:
+                            button_selector = 'button, input[type="submit"]'
+                        
+                        click_button_js = f"""
+                        function() {{
+                            try {{
+                                var button = document.querySelector('{button_selector}');
+                                // Tandai hasil lama agar hasil baru bisa dikenali
+                                var old = document.querySelectorAll('{RESULT_ELEMENT_SELECTOR}');
+                                for(var i = 0; i < old.length; i++) {{
+                                    old[i].setAttribute('data-bpjs-stale', '1');
+                                }}
                                 button.click();
-                                return {
+                                return {{
                                     success: true,
                                     clicked: true,
                                     buttonText: button.textContent || button.value
-                                };
-                            } catch(e) {
-                                return {success: false, error: e.message};
-                            }
-                        }
+                                }};
+                            }} catch(e) {{
+                                return {{success: false, error: e.message}};
+                            }}
+                        }}
                         """
                         
                         # Execute click
                         self.execute_javascript(
-                            f"({click_button_js})(document.querySelector('{btn.id ? '#' + btn.id : 'button, input[type=\"submit\"]'}'))",
-                            lambda s, d: handle_search_clicked(s, d, kpj, callback)
+                            click_button_js,
+                            lambda s, d: self.handle_search_clicked(s, d, kpj, callback)
                         )
                     else:
                         callback(False, "No buttons to click")
                 else:
-                    callback(False, data.get('error', 'Button not found'))
+                    callback(False, _error_message(data, 'Button not found'))
             
             self.execute_javascript(find_search_btn_js, handle_button_found)
         else:
-            callback(False, data.get('error', 'Failed to fill KPJ'))
+            callback(False, _error_message(data, 'Failed to fill KPJ'))
     
     def handle_search_clicked(self, success, data, kpj, callback):
         """Handle setelah search diklik"""
         if success:
             log_info(f"🔍 Search clicked for KPJ: {kpj}")
             
-            # Tunggu hasil loading (3-5 detik)
-            time.sleep(3)
-            
             # Step 5: Ambil data hasil
             extract_data_js = """
             function() {
@@ -426,10 +726,29 @@ class WebAutomator:
             }
             """
             
-            self.execute_javascript(extract_data_js, 
-                lambda s, d: callback(s, d))
+            def extract(ready_future):
+                # Timeout tetap diekstrak: halaman tanpa hasil = data kosong
+                if ready_future.exception() is not None:
+                    log_warning(f"⏱️ Hasil KPJ {kpj} belum siap dalam {RESULT_READY_TIMEOUT} detik")
+                else:
+                    log_info(f"⏱️ Hasil KPJ {kpj} siap dalam {ready_future.result():.2f} detik")
+                
+                self.execute_javascript(extract_data_js, 
+                    lambda s, d: self.handle_extraction_result(s, d, kpj, callback))
+            
+            # Tunggu hasil baru muncul (bukan sleep tetap), lalu ekstrak
+            self.wait_until(RESULT_READY_PREDICATE_JS).add_done_callback(extract)
         else:
-            callback(False, data.get('error', 'Button click failed'))
+            callback(False, _error_message(data, 'Button click failed'))
+
+    def handle_extraction_result(self, success, data, kpj, callback):
+        """Cek penanda sesi habis sebelum hasil diteruskan ke engine"""
+        if success and self.session.check_extraction_result(data):
+            log_warning(f"🔐 Sesi habis saat ekstraksi KPJ: {kpj}")
+            callback(False, SESSION_EXPIRED_ERROR)
+            return
+        
+        callback(success, data)
 
 # JavaScript Interface untuk callback dari WebView
 class JSCallbackInterface(PythonJavaClass):
@@ -442,6 +761,10 @@ class JSCallbackInterface(PythonJavaClass):
     @java_method('(Ljava/lang/String;Ljava/lang/String;Ljava/lang/String;)V')
     def jsResult(self, callback_id, status, result):
         self.automator.handle_js_result(callback_id, status, result)
+    
+    @java_method('(Ljava/lang/String;ILjava/lang/String;)V')
+    def jsChunk(self, callback_id, seq, fragment):
+        self.automator.handle_js_chunk(callback_id, seq, fragment)
 
 # Custom WebViewClient
 class AutomatorWebViewClient(WebViewClient):
@@ -449,6 +772,9 @@ class AutomatorWebViewClient(WebViewClient):
         super().__init__()
         self.automator = automator
     
+    def shouldInterceptRequest(self, view, request):
+        return self.automator.intercept_request(request)
+    
     def onPageStarted(self, view, url, favicon):
         log_info(f"📄 Page loading: {url}")
     
@@ -456,11 +782,30 @@ class AutomatorWebViewClient(WebViewClient):
         log_info(f"✅ Page loaded: {url}")
         self.automator.current_url = url
         
+        # Redirect ke halaman login = sesi portal ini habis
+        self.automator.session.on_page_finished(url)
+        
         # Inject monitoring script
         view.evaluateJavascript("""
             console.log('BPJS Automation: Page ready for automation');
             window.bpjsAutomationReady = true;
         """, None)
+        
+        # Selesaikan Future navigasi yang menunggu
+        self.automator.on_page_finished(url)
 
 # Global instance
-web_automator = WebAutomator()
\ No newline at end of file
+web_automator = WebAutomator()
+
+# Automator per portal untuk pipeline (WebView sendiri per portal)
+portal_automators = {"sipp": web_automator}
+
+def get_portal_automator(portal):
+    """WebAutomator untuk portal, dibuat saat pertama dipakai"""
+    if portal not in portal_automators:
+        portal_automators[portal] = WebAutomator(portal)
+    return portal_automators[portal]
+
+def get_all_load_stats():
+    """Statistik waktu muat halaman semua portal yang punya WebView"""
+    return {portal: automator.get_load_stats() for portal, automator in portal_automators.items()}
@@ -0,0 +1,483 @@
+"""
+BPJS AUTOMATION - WORKER SERVICE
+Engine otomasi di proses terpisah (Android service / subprocess di Linux),
+dikendalikan lewat socket lokal: submit batch, stream progress/hasil, cancel
+
+Protokol: satu objek JSON per baris (UTF-8) di 127.0.0.1:WORKER_PORT
+    client -> worker: {"cmd": "hello", "token", "since"} lalu
+                      {"cmd": "submit", "kpjs": [...] | "file": path, "batch_id"?,
+                       "cookies"?: {host: header Cookie login dari WebView app}}
+                      {"cmd": "cancel"} | {"cmd": "status"} | {"cmd": "shutdown"}
+    worker -> client: event {"type", "seq", ...}: status, ack, progress, result,
+                      stats, batch_done, error
+Event terakhir disimpan (WORKER_EVENT_BACKLOG), client yang tersambung ulang
+mengirim "since" = seq terakhir yang diterima untuk mengejar ketertinggalan
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import secrets
+import threading
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlsplit
+from config import (
+    CSV_FOLDER, WORKER_HOST, WORKER_PORT, WORKER_TOKEN_FILE,
+    WORKER_EVENT_BACKLOG, WORKER_CLIENT_QUEUE_SIZE, WORKER_CONNECT_TIMEOUT,
+    LIVE_STATS_INTERVAL
+)
+from logger import log_info, log_warning, log_error
+
+# Nama service di buildozer.spec (services = Worker:worker_service.py:foreground)
+ANDROID_SERVICE_CLASS = "com.bpjs.bpjsautomation.ServiceWorker"
+
+def send_message(sock, message):
+    sock.sendall((json.dumps(message, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+
+def get_worker_token(path=WORKER_TOKEN_FILE):
+    """Token bersama app <-> worker (file privat, dibuat sekali)"""
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    
+    token = secrets.token_hex(16)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    return token
+
+def worker_lookup_ready():
+    """
+    WebView tidak bisa jalan di worker (service/subprocess tanpa Activity),
+    jadi worker hanya bisa mencari KPJ lewat fast path HTTP
+    """
+    from http_fast_path import http_fast_path
+    return http_fast_path.supports("sipp")
+
+def collect_session_cookies():
+    """
+    Sisi app: cookie login WebView untuk host fast path HTTP (worker tidak punya WebView)
+    Returns: {host: header Cookie}
+    """
+    from http_fast_path import http_fast_path
+    try:
+        from web_automator import web_automator
+    except ImportError:
+        return {}
+    
+    cookies = {}
+    for form in http_fast_path.forms.values():
+        url = form.get("search_url")
+        if url:
+            header = web_automator.get_cookies(url)
+            if header:
+                cookies[urlsplit(url).hostname] = header
+    return cookies
+
+def _compact_result(result):
+    """Ringkasan hasil untuk client (hasil lengkap tetap di worker)"""
+    return {key: result.get(key) for key in ("kpj", "status", "error", "tab", "cache_hit", "sequence")}
+
+class ClientChannel:
+    """Satu client worker: antrian kirim terbatas + thread penulis sendiri"""
+    
+    def __init__(self, sock, on_broken, queue_size=WORKER_CLIENT_QUEUE_SIZE):
+        """on_broken(channel) dipanggil jika pengiriman gagal"""
+        self.sock = sock
+        self.on_broken = on_broken
+        self.outbox = queue.Queue(maxsize=queue_size)
+        self.closed = False
+        threading.Thread(target=self._write, name="worker-client-writer", daemon=True).start()
+    
+    def send(self, message):
+        """
+        Antrikan pesan tanpa menunggu socket
+        Returns: False jika antrian penuh (client terlalu lambat)
+        """
+        try:
+            self.outbox.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+    
+    def _write(self):
+        while True:
+            message = self.outbox.get()
+            if message is None or self.closed:
+                return
+            try:
+                send_message(self.sock, message)
+            except OSError:
+                self.on_broken(self)
+                return
+    
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.outbox.put_nowait(None)
+        except queue.Full:
+            pass  # penulis berhenti karena socket ditutup di bawah
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # lepaskan sendall yang sedang blok
+        except OSError:
+            pass
+        self.sock.close()
+
+class WorkerServer:
+    """Proses worker: jalankan batch berurutan, siarkan event ke semua client"""
+    
+    def __init__(self, host=WORKER_HOST, port=WORKER_PORT, token=None):
+        self.host = host
+        self.port = port
+        self.token = token or get_worker_token()
+        self.batches = queue.Queue()
+        self.events = deque(maxlen=WORKER_EVENT_BACKLOG)
+        self.clients = set()
+        self.seq = 0
+        self.current_batch = None
+        self.cancel_event = threading.Event()
+        self.running = True
+        self._lock = threading.Lock()
+        self._last_stats = 0.0
+        self._socket = None
+    
+    # ---------------------------------------------
+    # Event
+    # ---------------------------------------------
+    
+    def emit(self, event_type, **payload):
+        """
+        Simpan event ke backlog dan antrikan ke semua client
+        (tidak pernah menunggu socket; client yang antriannya penuh diputus)
+        """
+        with self._lock:
+            self.seq += 1
+            event = dict(payload, type=event_type, seq=self.seq)
+            self.events.append(event)
+            slow = [channel for channel in self.clients if not channel.send(event)]
+        
+        for channel in slow:
+            log_warning("Client worker terlalu lambat (antrian kirim penuh), diputus")
+            self._drop_client(channel)
+    
+    def _send(self, channel, message):
+        if not channel.send(message):
+            log_warning("Client worker terlalu lambat (antrian kirim penuh), diputus")
+            self._drop_client(channel)
+    
+    def _drop_client(self, channel):
+        with self._lock:
+            self.clients.discard(channel)
+        try:
+            channel.close()
+        except OSError:
+            pass
+    
+    def status(self):
+        return {
+            "batch_id": self.current_batch,
+            "state": "running" if self.current_batch else "idle",
+            "queued": self.batches.qsize(),
+            "seq": self.seq,
+            "lookup_ready": worker_lookup_ready()
+        }
+    
+    # ---------------------------------------------
+    # Socket
+    # ---------------------------------------------
+    
+    def serve_forever(self):
+        threading.Thread(target=self._run_batches, name="worker-batches", daemon=True).start()
+        
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen()
+        log_info(f"🛠️ Worker siap di {self.host}:{self.port} (pid {os.getpid()})")
+        
+        while self.running:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve_client, args=(client,), name="worker-client", daemon=True).start()
+        
+        log_info("🛠️ Worker berhenti")
+    
+    def _serve_client(self, client):
+        channel = None
+        try:
+            lines = client.makefile("r", encoding="utf-8")
+            hello = json.loads(lines.readline() or "{}")
+            if hello.get("cmd") != "hello" or not secrets.compare_digest(str(hello.get("token", "")), self.token):
+                send_message(client, {"type": "error", "error": "unauthorized"})
+                client.close()
+                return
+            
+            # Antrikan event yang terlewat, lalu daftarkan sebagai pendengar
+            # (di bawah lock yang sama dengan emit: urutan seq tetap terjaga)
+            channel = ClientChannel(client, self._drop_client)
+            since = hello.get("since") or 0
+            with self._lock:
+                for event in self.events:
+                    if event["seq"] > since:
+                        channel.send(event)
+                self.clients.add(channel)
+            self._send(channel, dict(self.status(), type="status"))
+            
+            for line in lines:
+                if line.strip():
+                    self._handle_command(channel, json.loads(line))
+        except (OSError, ValueError) as e:
+            log_warning(f"Client worker terputus: {str(e)}")
+        finally:
+            if channel is not None:
+                self._drop_client(channel)
+            else:
+                client.close()
+    
+    def _handle_command(self, channel, message):
+        cmd = message.get("cmd")
+        
+        if cmd == "submit":
+            batch_id = message.get("batch_id") or datetime.now().strftime("%Y%m%d_%H%M%S")
+            if not worker_lookup_ready():
+                self._send(channel, {"type": "error", "batch_id": batch_id,
+                                     "error": "Worker butuh fast path HTTP (WebView tidak jalan di worker)"})
+                return
+            self.batches.put(dict(message, batch_id=batch_id))
+            self._send(channel, {"type": "ack", "batch_id": batch_id, "queued": self.batches.qsize()})
+        elif cmd == "cancel":
+            if self.current_batch:
+                self.cancel_event.set()
+            self._send(channel, {"type": "ack", "cancel": self.current_batch})
+        elif cmd == "status":
+            self._send(channel, dict(self.status(), type="status"))
+        elif cmd == "shutdown":
+            self.stop()
+        else:
+            self._send(channel, {"type": "error", "error": f"perintah tidak dikenal: {cmd}"})
+    
+    def stop(self):
+        self.running = False
+        self.cancel_event.set()
+        self.batches.put(None)
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+    
+    # ---------------------------------------------
+    # Batch
+    # ---------------------------------------------
+    
+    def _run_batches(self):
+        while self.running:
+            batch = self.batches.get()
+            if batch is None:
+                return
+            self.current_batch = batch["batch_id"]
+            self.cancel_event.clear()
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                log_error(f"Batch worker {batch['batch_id']} error: {str(e)}")
+                self.emit("error", batch_id=batch["batch_id"], error=str(e))
+            finally:
+                self.current_batch = None
+    
+    def _open_source(self, batch):
+        if batch.get("file"):
+            from kpj_importer import open_kpj_file
+            return open_kpj_file(batch["file"])
+        kpjs = batch.get("kpjs") or []
+        return kpjs, len(kpjs)
+    
+    def _run_batch(self, batch):
+        from automation import process_kpj_stream, get_engine_stats
+        from csv_handler import get_csv_handler
+        from autosave import IncrementalAutosaver
+        from http_fast_path import http_fast_path
+        
+        batch_id = batch["batch_id"]
+        
+        # Sesi login milik WebView app: fast path worker memakai cookie yang dikirim saat submit
+        cookies = batch.get("cookies") or {}
+        if cookies:
+            http_fast_path.cookie_provider = lambda url: cookies.get(urlsplit(url).hostname)
+            log_info(f"🍪 Cookie sesi dari app untuk {len(cookies)} host")
+        else:
+            log_warning(f"Batch worker {batch_id} tanpa cookie sesi, fast path kemungkinan diarahkan ke login")
+
+        source, size_hint = self._open_source(batch)
+        handler = get_csv_handler()
+        handler.clear_data()
+        autosaver = IncrementalAutosaver(handler)
+        log_info(f"🛠️ Batch worker {batch_id} dimulai ({size_hint or '?'} KPJ)")
+        
+        def progress_callback(progress):
+            progress = dict(progress)
+            if "result" in progress:
+                progress["result"] = _compact_result(progress["result"])
+            self.emit("progress", batch_id=batch_id, progress=progress)
+            
+            now = time.monotonic()
+            if now - self._last_stats >= LIVE_STATS_INTERVAL:
+                self._last_stats = now
+                self.emit("stats", batch_id=batch_id, stats=get_engine_stats())
+        
+        processed = 0
+        success_count = 0
+        cancelled = False
+        stream = process_kpj_stream(source, size_hint, progress_callback)
+        try:
+            for result in stream:
+                handler.add_record(result)
+                processed += 1
+                if result.get("status") in ["success", "completed"]:
+                    success_count += 1
+                self.emit("result", batch_id=batch_id, result=_compact_result(result))
+                
+                if self.cancel_event.is_set():
+                    cancelled = True
+                    break
+        finally:
+            stream.close()
+            autosaver.save_increment()
+        
+        filepath = None
+        if handler.has_data():
+            filepath = os.path.join(CSV_FOLDER, f"hasil_real_{batch_id}.csv")
+            handler.export(filepath)
+        
+        self.emit("stats", batch_id=batch_id, stats=get_engine_stats())
+        self.emit("batch_done", batch_id=batch_id, processed=processed, successful=success_count,
+                  cancelled=cancelled, file=filepath)
+        log_info(f"🛠️ Batch worker {batch_id} selesai: {processed} KPJ{' (dibatalkan)' if cancelled else ''}")
+
+class WorkerClient:
+    """Sisi app: kirim perintah ke worker, terima event di thread pembaca"""
+    
+    def __init__(self, on_event, host=WORKER_HOST, port=WORKER_PORT):
+        """on_event(event) dipanggil dari thread pembaca (pakai @mainthread di UI)"""
+        self.on_event = on_event
+        self.host = host
+        self.port = port
+        self.last_seq = 0
+        self._socket = None
+        self._lock = threading.Lock()
+    
+    def connect(self, timeout=WORKER_CONNECT_TIMEOUT):
+        """Sambung (dengan retry sampai timeout), Returns: True jika tersambung"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=2)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.2)
+        
+        sock.settimeout(None)
+        send_message(sock, {"cmd": "hello", "token": get_worker_token(), "since": self.last_seq})
+        self._socket = sock
+        threading.Thread(target=self._read_events, args=(sock,), name="worker-events", daemon=True).start()
+        return True
+    
+    def is_connected(self):
+        return self._socket is not None
+    
+    def _read_events(self, sock):
+        try:
+            for line in sock.makefile("r", encoding="utf-8"):
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                self.last_seq = max(self.last_seq, event.get("seq") or 0)
+                self.on_event(event)
+        except (OSError, ValueError) as e:
+            log_warning(f"Koneksi worker terputus: {str(e)}")
+        finally:
+            if self._socket is sock:
+                self._socket = None
+            self.on_event({"type": "disconnected"})
+    
+    def send(self, cmd, **payload):
+        with self._lock:
+            if self._socket is None:
+                raise ConnectionError("Worker tidak tersambung")
+            send_message(self._socket, dict(payload, cmd=cmd))
+    
+    def submit(self, kpjs=None, filepath=None, batch_id=None, cookies=None):
+        """cookies: {host: header Cookie}, default cookie login WebView app saat ini"""
+        if cookies is None:
+            cookies = collect_session_cookies()
+        if filepath:
+            self.send("submit", file=filepath, batch_id=batch_id, cookies=cookies)
+        else:
+            self.send("submit", kpjs=list(kpjs), batch_id=batch_id, cookies=cookies)
+    
+    def cancel(self):
+        self.send("cancel")
+    
+    def request_status(self):
+        self.send("status")
+    
+    def close(self):
+        """Putus dari worker (worker dan batch-nya tetap berjalan)"""
+        sock, self._socket = self._socket, None
+        if sock is not None:
+            sock.close()
+
+def start_worker_process():
+    """Jalankan worker: Android service di perangkat, subprocess terpisah di Linux"""
+    get_worker_token()  # pastikan token ada sebelum worker membacanya
+    
+    try:
+        from jnius import autoclass
+        activity = autoclass("org.kivy.android.PythonActivity").mActivity
+        autoclass(ANDROID_SERVICE_CLASS).start(activity, "")
+        log_info("🛠️ Android service worker dijalankan")
+        return True
+    except ImportError:
+        pass
+    
+    import subprocess
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        start_new_session=True  # tetap hidup walau app ditutup
+    )
+    log_info("🛠️ Subprocess worker dijalankan")
+    return True
+
+def connect_worker(on_event):
+    """Sambung ke worker yang sudah jalan, atau jalankan dulu. Returns: WorkerClient / None"""
+    client = WorkerClient(on_event)
+    if client.connect(timeout=0.5):
+        return client
+    start_worker_process()
+    if client.connect():
+        return client
+    log_error("❌ Worker tidak bisa dihubungi")
+    return None
+
+def main():
+    try:
+        WorkerServer().serve_forever()
+    except OSError as e:
+        log_error(f"❌ Worker gagal dijalankan: {str(e)}")
+
+if __name__ == "__main__":
+    main()